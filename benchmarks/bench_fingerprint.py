@@ -0,0 +1,55 @@
+"""
+request_fingerprint 的微基准：与逐请求构造 dict 再 json.dumps 的旧实现对比。
+
+    python -m benchmarks.bench_fingerprint
+"""
+import hashlib
+import json
+import sys
+import timeit
+
+from scrapy import Request
+from scrapy.utils.python import to_unicode
+from w3lib.url import canonicalize_url
+
+from scrapy_redis import fingerprint
+from scrapy_redis.fingerprint import request_fingerprint
+
+
+def legacy_fingerprint(request):
+    fingerprint_data = {
+        "method": to_unicode(request.method),
+        "url": canonicalize_url(request.url),
+        "body": (request.body or b"").hex(),
+    }
+    fingerprint_json = json.dumps(fingerprint_data, sort_keys=True)
+    return hashlib.sha1(fingerprint_json.encode()).hexdigest()
+
+
+def main():
+    requests = [Request(f"https://www.homely.com.au/homes/{i}-some-street-suburb-vic-3000/{10000000 + i}?b=2&a=1")
+                for i in range(10000)]
+    requests += [Request("https://www.homely.com.au/search", method="POST", body=f'{{"page": {i}}}')
+                 for i in range(1000)]
+    fingerprint._digests.clear()
+
+    def run(fn):
+        for r in requests:
+            fn(r)
+
+    rounds = 5
+    legacy = min(timeit.repeat(lambda: run(legacy_fingerprint), number=1, repeat=rounds))
+    first = timeit.timeit(lambda: run(request_fingerprint), number=1)
+    cached = min(timeit.repeat(lambda: run(request_fingerprint), number=1, repeat=rounds))
+    n = len(requests)
+    print(f"{n} requests (GET + POST)")
+    print(f"legacy:        {legacy / n * 1e6:6.2f} us/request")
+    print(f"first call:    {first / n * 1e6:6.2f} us/request")
+    print(f"memoized:      {cached / n * 1e6:6.2f} us/request")
+    hex_size = sys.getsizeof(request_fingerprint(requests[0]))
+    bin_size = sys.getsizeof(request_fingerprint(requests[0], 16))
+    print(f"fingerprint object: {hex_size} bytes hex, {bin_size} bytes with 16-byte digests")
+
+
+if __name__ == "__main__":
+    main()
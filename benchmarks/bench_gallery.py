@@ -0,0 +1,51 @@
+"""
+gallery 分类基准：逐图片 ``preceding::h2`` 与 ``extract_gallery`` 单次文档顺序遍历在大 gallery 上的耗时。
+
+    python -m benchmarks.bench_gallery
+"""
+import timeit
+
+from lxml import html
+
+from realestate_scrapy.extractors.gallery import GALLERY_XPATH, extract_gallery
+
+
+def fixture(photos, floor_plans, filler):
+    parts = ["<html><body>"]
+    # 模拟详情页中 gallery 之前的大量内容
+    parts.extend(f"<div><p>filler {i}</p><span>x</span></div>" for i in range(filler))
+    parts.append('<div aria-label="Vertical image gallery"><h2>Photos</h2>')
+    parts.extend(f'<div><img src="https://img/{i}.jpg" srcset="https://img/{i}-640.jpg 640w, '
+                 f'https://img/{i}-1280.jpg 1280w"></div>' for i in range(photos))
+    parts.append("<h2>Floor plan</h2>")
+    parts.extend(f'<div><img src="https://img/fp{i}.jpg"></div>' for i in range(floor_plans))
+    parts.append("</div></body></html>")
+    return html.document_fromstring("".join(parts))
+
+
+def preceding_h2(root):
+    images, floorplan = [], []
+    for img in root.xpath(GALLERY_XPATH + "//img"):
+        h2s = img.xpath("preceding::h2")
+        if h2s:
+            text = h2s[-1].text_content()
+            if "Floor plan" in text:
+                floorplan.append(img.get("src"))
+            elif "Photo" in text:
+                images.append(img.get("src"))
+    return images, floorplan
+
+
+def main():
+    for photos, floor_plans, filler in ((20, 2, 500), (60, 10, 2000), (150, 20, 5000)):
+        root = fixture(photos, floor_plans, filler)
+        walked = extract_gallery(root)
+        assert [e["src"] for e in walked["photo"]] == preceding_h2(root)[0]
+        old = min(timeit.repeat(lambda: preceding_h2(root), number=5, repeat=3)) / 5
+        new = min(timeit.repeat(lambda: extract_gallery(root), number=5, repeat=3)) / 5
+        print(f"photos={photos:4d} floor_plans={floor_plans:3d} filler={filler:5d}  "
+              f"preceding::h2 {old * 1000:8.2f} ms  single walk {new * 1000:7.2f} ms  x{old / new:6.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,32 +1,43 @@
 import os.path
 import sys
-import redis
-import json
 from scrapy.cmdline import execute
 
-def push_to_redis():
-    # 连接到 Redis，使用 db=2（与 redis-cli -n 2 对应）
-    r = redis.Redis(host='localhost', port=6379, db=2, decode_responses=True)
-
-    # 构造要推送的数据（将其转换为 JSON 格式字符串）
-    data = {
-        "url": "https://www.homely.com.au/homes/24-26-darling-street-east-melbourne-vic-3002/10486605",
-        "meta": {
-            "job-id": "123xsd",
-            "start-date": "dd/mm/yy",
-            "schedule": "priority_url"
-        }
+from realestate_scrapy.cache.url_queue import RedisUrlQueue
+from realestate_scrapy.commands.seed import Seeder, iter_jsonl
+from realestate_scrapy.settings import REDIS_URL, URL_QUEUE_DEDUPE, URL_QUEUE_DEDUPE_TTL
+
+# 未指定任务文件时推送的示例任务
+DEFAULT_TASKS = [{
+    "url": "https://www.homely.com.au/homes/24-26-darling-street-east-melbourne-vic-3002/10486605",
+    "meta": {
+        "job-id": "123xsd",
+        "start-date": "dd/mm/yy",
+        "schedule": "priority_url"
     }
-    data_json = json.dumps(data)
+}]
+
+
+def push_to_redis(paths=()):
+    """
+    把任务推入 homelyspider:start_urls，然后启动爬虫：
+
+        python homely.py [tasks.jsonl ...]
+
+    大批量推送请直接使用 ``scrapy seed``（支持标准输入、suburb 网格、ZSET 优先级与限速）。
+    """
+    def tasks():
+        if not paths:
+            yield from DEFAULT_TASKS
+        for path in paths:
+            with open(path, encoding="utf-8") as f:
+                yield from iter_jsonl(f)
 
-    # 指定要 push 到的队列 key
-    key = 'homelyspider:start_urls'
+    queue = RedisUrlQueue("homely", REDIS_URL, dedupe=URL_QUEUE_DEDUPE, dedupe_ttl=URL_QUEUE_DEDUPE_TTL)
+    counts = Seeder(queue, ["homely.com.au"]).run(tasks())
+    print(f"Pushed {counts['pushed']} tasks ({counts['duplicate']} duplicate, {counts['invalid']} invalid)")
 
-    # 使用 LPUSH 命令将数据推入队列
-    result = r.lpush(key, data_json)
-    print(f"Pushed data to Redis list '{key}'. List length is now: {result}")
 
 if __name__ == "__main__":
-    push_to_redis()
+    push_to_redis(sys.argv[1:])
     sys.path.append(os.path.dirname(os.path.abspath(__file__)))
     execute(['scrapy', 'crawl', 'homely'])
@@ -0,0 +1,8 @@
+"""浏览器渲染子系统：Chrome 实例的创建、池化管理、页面就绪等待，以及可供多个爬虫共享的渲染服务。"""
+from .driver import create_driver  # NOQA
+from .pool import BrowserPool, PoolExhausted  # NOQA
+from .readiness import ReadinessWaiter  # NOQA
+from .renderer import Renderer, create_renderer, job_from_request  # NOQA
+from .tabs import TabbedRenderer  # NOQA
+from .service import RenderClient, RenderService, RenderServiceError  # NOQA
+from .middleware import BrowserRenderMiddleware  # NOQA
@@ -0,0 +1,80 @@
+import logging
+
+from selenium.webdriver.support.wait import WebDriverWait
+from selenium.webdriver.common.by import By
+import selenium.webdriver.support.expected_conditions as EC
+
+from realestate_scrapy.extractors.gallery import gallery_from_payloads
+
+from .network import capture_json_responses
+
+logger = logging.getLogger('browser')
+
+GALLERY_BUTTON_SELECTOR = "div[aria-label='Gallery button bar'] button:first-of-type"
+GALLERY_SELECTOR = "div[aria-label='Vertical image gallery']"
+
+
+def open_gallery(ctx):
+    """
+    模拟点击 Gallery 按钮，等待 AJAX 加载出图片并滚动到底部。成功返回 True。
+    """
+    driver, readiness = ctx.driver, ctx.readiness
+    try:
+        # 定位 Gallery 按钮（假设选择第一个按钮即可）
+        gallery_button = WebDriverWait(driver, 20).until(
+            EC.element_to_be_clickable((By.CSS_SELECTOR, GALLERY_BUTTON_SELECTOR))
+        )
+        # 滚动使按钮可见后点击（先尝试常规点击，失败后使用 JavaScript 点击）
+        driver.execute_script("arguments[0].scrollIntoView(true);", gallery_button)
+        try:
+            gallery_button.click()
+            logger.info("Clicked Gallery button successfully.")
+        except Exception as click_exception:
+            logger.warning("Standard click failed, using JavaScript click. Error: %s", click_exception)
+            driver.execute_script("arguments[0].click();", gallery_button)
+            logger.info("JavaScript click on Gallery button succeeded.")
+        # 等待页面 AJAX 加载出图片展示区域，并保证数据加载完全
+        if not readiness.wait(driver, "gallery", selector=GALLERY_SELECTOR):
+            raise TimeoutError("vertical image gallery did not load")
+    except Exception as e:
+        logger.error("Error clicking or loading gallery: %s", e)
+        return False
+
+    # 滚动到页面底部确保图片全部加载
+    readiness.wait(driver, "gallery_scroll", scroll=True, image_scope=GALLERY_SELECTOR)
+    return True
+
+
+def gallery_page_source(ctx):
+    """打开 gallery 并返回加载后的页面 HTML，打开失败时返回 None。"""
+    if not open_gallery(ctx):
+        return None
+    return ctx.driver.page_source
+
+
+def capture_gallery(ctx):
+    """
+    从页面加载时的 XHR/fetch JSON 中直接构造 gallery，省去点击、等待与滚动。
+    加载时的请求里没有图片时，才点击 Gallery 按钮并从它触发的请求中再取一次；
+    此时 gallery 已在 DOM 中打开，浏览器内抽取脚本也能读到。
+
+    返回 {"gallery": {分类: [...]}, "payloads": [payload, ...], "opened": bool}。
+    """
+    payloads = [p for _, p in capture_json_responses(ctx.driver, ctx.drain(), ctx.capture_pattern)]
+    gallery = gallery_from_payloads(payloads)
+    opened = False
+    if not gallery["photo"]:
+        opened = open_gallery(ctx)
+        more = [p for _, p in capture_json_responses(ctx.driver, ctx.drain(), ctx.capture_pattern)]
+        payloads.extend(more)
+        gallery = gallery_from_payloads(payloads)
+    return {"gallery": gallery, "payloads": payloads, "opened": opened}
+
+
+# 渲染请求可通过 meta["render_actions"] 按名称引用的页面动作。
+# 每个动作签名为 action(ctx)（ctx 为 network.RenderContext），返回值写入 meta["render_data"][name]。
+ACTIONS = {
+    "open_gallery": open_gallery,
+    "gallery": gallery_page_source,
+    "capture_gallery": capture_gallery,
+}
@@ -0,0 +1,106 @@
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from .resources import ResourcePolicy
+
+logger = logging.getLogger('browser')
+
+# 配置 Chrome 和 Chromedriver 的路径（根据具体平台修改）
+# macOS: "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome", "/usr/local/bin/chromedriver"
+DEFAULT_CHROME_PATH = "/usr/bin/google-chrome"
+DEFAULT_CHROMEDRIVER_PATH = "/usr/local/bin/chromedriver"
+DEFAULT_CHROMEDRIVER_CACHE_DIR = os.path.join("~", ".cache", "realestate_scrapy", "chromedriver")
+
+_patched_lock = threading.Lock()
+_patched = {}  # 原始 chromedriver 路径 -> 缓存中已打补丁的副本
+
+
+def patched_chromedriver(source, cache_dir=None):
+    """
+    返回 source 打过 undetected_chromedriver 补丁的副本路径。
+
+    副本按 chromedriver 内容与 undetected_chromedriver 版本寻址，缓存在 cache_dir 中跨运行复用，
+    因此每次启动浏览器都不必再复制、打补丁；原始文件保持不变（可以是只读的系统路径）。
+    打补丁失败时返回 source，由 uc.Chrome 自行处理。
+    """
+    with _patched_lock:
+        if source in _patched:
+            return _patched[source]
+        import undetected_chromedriver as uc
+        from undetected_chromedriver.patcher import Patcher
+
+        cache_dir = os.path.expanduser(cache_dir or DEFAULT_CHROMEDRIVER_CACHE_DIR)
+        try:
+            digest = hashlib.sha1(getattr(uc, "__version__", "").encode())
+            with open(source, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(chunk)
+            target = os.path.join(cache_dir, f"chromedriver-{digest.hexdigest()[:16]}")
+            if not os.path.exists(target):
+                os.makedirs(cache_dir, exist_ok=True)
+                # 在临时文件上打补丁后原子替换，多个进程同时启动也不会读到半成品
+                fd, tmp = tempfile.mkstemp(dir=cache_dir, prefix=".chromedriver-")
+                os.close(fd)
+                try:
+                    shutil.copyfile(source, tmp)
+                    os.chmod(tmp, 0o755)
+                    patcher = Patcher(executable_path=tmp)
+                    patcher.patch_exe()
+                    if not patcher.is_binary_patched(tmp):
+                        raise RuntimeError("patched binary not recognised")
+                    os.replace(tmp, target)
+                finally:
+                    if os.path.exists(tmp):
+                        os.remove(tmp)
+                logger.info("Cached patched chromedriver at %s", target)
+        except Exception as e:
+            logger.warning("Cannot cache patched chromedriver %s: %s", source, e)
+            target = source
+        _patched[source] = target
+        return target
+
+
+def create_driver(settings):
+    """
+    根据 settings 启动一个 undetected Chrome 实例。
+
+    使用的配置项：CHROME_PATH、CHROMEDRIVER_PATH、CHROMEDRIVER_CACHE_DIR、CHROME_HEADLESS、BROWSER_TABS；
+    RESOURCE_BLOCK_ENABLED 为 True 时按 ResourcePolicy 拦截图片、字体、视频与第三方统计。
+    selenium / undetected_chromedriver 在这里才导入，不渲染的进程（scrapy list、纯 HTTP 抓取）不必加载。
+    """
+    from selenium.webdriver.chrome.options import Options
+    import undetected_chromedriver as uc
+
+    started = time.monotonic()
+    chrome_path = settings.get("CHROME_PATH", DEFAULT_CHROME_PATH)
+    chromedriver_path = patched_chromedriver(settings.get("CHROMEDRIVER_PATH", DEFAULT_CHROMEDRIVER_PATH),
+                                             settings.get("CHROMEDRIVER_CACHE_DIR"))
+
+    options = Options()
+    options.headless = settings.getbool("CHROME_HEADLESS", True)  # 调试时可设置为 False
+    options.add_argument("--log-level=3")
+    options.add_argument("--silent")
+    # 开启 performance 日志，用于统计每页流量与被拦截的资源
+    options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    if settings.getint("BROWSER_TABS", 1) > 1:
+        # 多标签页流水线渲染：导航不阻塞 WebDriver 调用（就绪由 ReadinessWaiter 判断），
+        # 后台标签页不降速，切走的标签页继续加载
+        options.page_load_strategy = "none"
+        options.add_argument("--disable-background-timer-throttling")
+        options.add_argument("--disable-backgrounding-occluded-windows")
+        options.add_argument("--disable-renderer-backgrounding")
+    driver = uc.Chrome(
+        options=options,
+        driver_executable_path=chromedriver_path,
+        browser_executable_path=chrome_path,
+        use_subprocess=False
+    )
+    if settings.getbool("RESOURCE_BLOCK_ENABLED", True):
+        ResourcePolicy.from_settings(settings).apply(driver)
+    logger.info("Started Chrome (pid=%s) in %.1fs", getattr(driver, "browser_pid", None), time.monotonic() - started)
+    return driver
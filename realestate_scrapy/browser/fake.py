@@ -0,0 +1,104 @@
+import itertools
+import logging
+import time
+
+from .readiness import NAVIGATE_SCRIPT, NEW_DOCUMENT_SCRIPT, PROBE_SCRIPT
+
+logger = logging.getLogger('browser')
+
+DEFAULT_HTML = "<html><head><title>{url}</title></head><body><h1>{url}</h1></body></html>"
+
+
+class _FakeSwitchTo:
+    def __init__(self, driver):
+        self._driver = driver
+
+    def window(self, handle):
+        if handle not in self._driver.tabs:
+            raise LookupError(f"no such window: {handle}")
+        self._driver.current_window_handle = handle
+
+    def new_window(self, type_hint=None):
+        self._driver.current_window_handle = self._driver._open_tab()
+
+
+class FakeDriver:
+    """
+    不启动 Chrome 的 driver 替身，用于测试渲染链路（中间件、多标签页渲染、渲染服务与客户端）：
+
+    - ``get(url)`` 休眠 ``latency`` 秒模拟加载，页面取自 ``pages``（url -> HTML），缺省返回占位页；
+      非阻塞导航（多标签页模式）立即返回，加载耗时计入之后的就绪探测；
+    - 就绪探测脚本在页面加载完成后报告就绪，其他脚本返回 ``scripts`` 中的预设结果（脚本 -> 返回值）；
+    - 支持标签页切换与新建，没有网络日志与 cookie，查找元素一律失败（页面动作按失败处理）。
+    """
+
+    def __init__(self, pages=None, scripts=None, latency=0):
+        self.pages = pages or {}
+        self.scripts = scripts or {}
+        self.latency = latency
+        self.tabs = {}
+        self._handles = itertools.count(1)
+        self.current_window_handle = self._open_tab()
+        self.switch_to = _FakeSwitchTo(self)
+        self.quit_called = False
+
+    def _open_tab(self):
+        handle = f"FAKE-TAB-{next(self._handles)}"
+        self.tabs[handle] = {"url": "about:blank", "source": "", "loaded_at": 0}
+        return handle
+
+    @property
+    def window_handles(self):
+        return list(self.tabs)
+
+    @property
+    def current_url(self):
+        return self.tabs[self.current_window_handle]["url"]
+
+    @property
+    def page_source(self):
+        return self.tabs[self.current_window_handle]["source"]
+
+    def _navigate(self, url):
+        tab = self.tabs[self.current_window_handle]
+        tab["url"] = url
+        tab["source"] = self.pages.get(url) or DEFAULT_HTML.format(url=url)
+        tab["loaded_at"] = time.monotonic() + self.latency
+
+    def get(self, url):
+        self._navigate(url)
+        if self.latency:
+            time.sleep(self.latency)
+
+    def execute_script(self, script, *args):
+        tab = self.tabs[self.current_window_handle]
+        if script == NAVIGATE_SCRIPT:
+            self._navigate(args[0])
+            return None
+        if script == NEW_DOCUMENT_SCRIPT:
+            return True
+        if script == PROBE_SCRIPT:
+            loaded = time.monotonic() >= tab["loaded_at"]
+            return {"loaded": loaded, "network_quiet_ms": 10 ** 6 if loaded else 0, "dom_quiet_ms": 10 ** 6,
+                    "selector": loaded, "pending_images": 0}
+        return self.scripts.get(script)
+
+    def execute_cdp_cmd(self, cmd, params):
+        return {}
+
+    def get_log(self, log_type):
+        return []
+
+    def get_cookies(self):
+        return []
+
+    def find_element(self, *args, **kwargs):
+        raise LookupError("FakeDriver has no elements")
+
+    def quit(self):
+        self.quit_called = True
+
+
+def create_fake_driver(settings):
+    """BROWSER_DRIVER_FACTORY 可选的 driver 工厂，页面延迟由 FAKE_BROWSER_LATENCY（秒）控制。"""
+    return FakeDriver(latency=settings.getfloat("FAKE_BROWSER_LATENCY", 0))
@@ -0,0 +1,123 @@
+import logging
+import time
+
+from scrapy import signals
+from scrapy.http import HtmlResponse
+from scrapy.utils.misc import load_object
+from twisted.internet.error import TimeoutError
+from twisted.internet.threads import deferToThreadPool
+from twisted.python.threadpool import ThreadPool
+
+from .pool import PoolExhausted
+from .renderer import create_renderer, job_from_request
+from .service import RenderClient
+
+logger = logging.getLogger('browser')
+
+
+class BrowserRenderMiddleware:
+    """
+    由浏览器下载标记为渲染的请求，返回包含渲染后 DOM 的 HtmlResponse。
+
+    请求通过 meta 控制渲染：
+
+    - ``render``：为 True 时由浏览器抓取，否则交给 Scrapy 正常下载；
+    - ``render_wait_for``：等待出现的 CSS 选择器；
+    - ``render_scroll``：读取 DOM 前滚动到底部并等待懒加载稳定；
+    - ``render_label``：就绪统计的分组名（默认 "page"）；
+    - ``render_actions``：读取 DOM 之后依次执行的页面动作名（见 ``actions.ACTIONS``），
+      结果写入 ``meta["render_data"]``；
+    - ``render_extract``：动作执行完后运行的浏览器内抽取脚本名（见 ``scripts.EXTRACT_SCRIPTS``），
+      返回的 JSON 写入 ``meta["render_data"]["extract"]``；
+    - ``render_body``：为 False 时不传输 page_source，响应 body 为空（配合 render_extract 使用）。
+
+    每页的流量汇总（传输字节数、被拦截的请求与图片 URL）写入 ``meta["render_data"]["resources"]``，
+    浏览器会话的 cookie 写入 ``meta["browser_cookies"]``。浏览器故障会转换为
+    ``TimeoutError``，从而由 RetryMiddleware 重试。
+
+    Selenium 调用全部在专用线程池（``render_threads`` 个线程）中执行，``process_request``
+    立即返回 Deferred，渲染期间 reactor 继续调度请求、下载图片、写入 item。
+
+    ``RENDER_SERVICE_ENABLED`` 为 True 时本进程不启动浏览器，渲染任务经 Redis 交给独立的
+    渲染服务（``scrapy render_service``，见 ``service.RenderService``），多个爬虫进程共享同一组浏览器。
+    """
+
+    def __init__(self, renderer, stats=None, render_threads=None):
+        self.renderer = renderer
+        self.stats = stats
+        # 线程数默认与渲染并发（浏览器池大小或渲染服务的等待上限）一致，
+        # 多余的渲染请求在线程池队列中排队，不占用 checkout 超时
+        self.threadpool = ThreadPool(minthreads=0, maxthreads=render_threads or renderer.concurrency,
+                                     name="browser-render")
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if settings.getbool("RENDER_SERVICE_ENABLED"):
+            renderer = RenderClient.from_settings(settings)
+        else:
+            factory = load_object(settings.get("BROWSER_DRIVER_FACTORY",
+                                               "realestate_scrapy.browser.driver.create_driver"))
+            renderer = create_renderer(settings, factory=lambda: factory(settings), stats=crawler.stats)
+        middleware = cls(renderer, stats=crawler.stats, render_threads=settings.getint("BROWSER_RENDER_THREADS", 0))
+        crawler.signals.connect(middleware.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(middleware.spider_closed, signal=signals.spider_closed)
+        return middleware
+
+    def spider_opened(self, spider):
+        self.threadpool.start()
+        self.renderer.start()
+
+    def spider_closed(self, spider):
+        # 保证退出时关闭所有浏览器；正在渲染的线程随之失败返回，随后停止线程池
+        self.renderer.close()
+        self.threadpool.stop()
+
+    def process_request(self, request, spider):
+        if not request.meta.get("render"):
+            return None
+        # reactor 在使用时才导入：模块可能在安装 reactor 之前（例如 scrapy launch 预加载时）被导入
+        from twisted.internet import reactor
+
+        started = time.monotonic()
+        d = deferToThreadPool(reactor, self.threadpool, self.render, request)
+        # 回调在 reactor 线程中执行，统计与异常转换不需要加锁
+        d.addCallbacks(self._rendered, self._render_failed,
+                       callbackArgs=(spider, started), errbackArgs=(request, spider))
+        return d
+
+    def _rendered(self, response, spider, started):
+        if self.stats is not None:
+            self.stats.inc_value("browser/render/count", spider=spider)
+            self.stats.inc_value("browser/render/total_ms", int((time.monotonic() - started) * 1000), spider=spider)
+        return response
+
+    def _render_failed(self, failure, request, spider):
+        e = failure.value
+        if isinstance(e, PoolExhausted):
+            raise TimeoutError(f"No browser available for {request.url}: {e}")
+        logger.error("Browser render failed for %s: %s", request.url, e)
+        if self.stats is not None:
+            self.stats.inc_value("browser/render/failed", spider=spider)
+        raise TimeoutError(f"Browser render failed for {request.url}: {e}")
+
+    def render(self, request):
+        """在渲染线程中执行：由本地浏览器池或渲染服务完成渲染，构造响应。"""
+        result = self.renderer.render(job_from_request(request))
+        data = result["data"]
+        self.record_traffic(data.get("resources"))
+        request.meta["render_data"] = data
+        request.meta["browser_cookies"] = result["cookies"]
+        return HtmlResponse(result["url"], body=result["body"], encoding="utf-8", request=request)
+
+    def record_traffic(self, traffic):
+        if not traffic:
+            return
+        if self.stats is not None:
+            self.stats.inc_value("browser/resources/bytes", traffic["bytes"])
+            self.stats.inc_value("browser/resources/requests", traffic["requests"])
+            self.stats.inc_value("browser/resources/blocked", traffic["blocked"])
+            for resource_type, count in traffic["blocked_by_type"].items():
+                self.stats.inc_value(f"browser/resources/blocked/{resource_type}", count)
+        logger.debug("Page traffic: %d bytes, %d requests, %d blocked",
+                     traffic["bytes"], traffic["requests"], traffic["blocked"])
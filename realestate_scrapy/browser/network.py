@@ -0,0 +1,110 @@
+import json
+import logging
+
+logger = logging.getLogger('browser')
+
+
+def _read_performance_log(driver):
+    """读取并清空 performance 日志，逐条返回 (webview, method, params)，只保留 Network.* 事件。"""
+    try:
+        entries = driver.get_log("performance")
+    except Exception as e:
+        logger.debug("Performance log unavailable: %s", e)
+        return
+    for entry in entries:
+        try:
+            record = json.loads(entry["message"])
+            message = record["message"]
+        except (KeyError, TypeError, ValueError):
+            continue
+        if message.get("method", "").startswith("Network."):
+            yield record.get("webview"), message["method"], message.get("params", {})
+
+
+def drain_network_events(driver):
+    """
+    读取并清空 Chrome performance 日志中的 Network.* 事件，返回 [(method, params)]。
+    需要在创建 driver 时开启 goog:loggingPrefs = {"performance": "ALL"}。
+    """
+    return [(method, params) for _, method, params in _read_performance_log(driver)]
+
+
+def drain_network_events_by_target(driver):
+    """
+    同 ``drain_network_events``，但按产生事件的标签页分组：{webview: [(method, params)]}。
+    chromedriver 的窗口句柄即 DevTools target id，与日志中的 webview 相同。
+    """
+    grouped = {}
+    for webview, method, params in _read_performance_log(driver):
+        grouped.setdefault(webview, []).append((method, params))
+    return grouped
+
+
+def capture_json_responses(driver, events, url_pattern=None):
+    """
+    取出 XHR/fetch 返回的 JSON 响应体（CDP Network.getResponseBody），返回 [(url, payload)]。
+    url_pattern 为编译后的正则，只保留 URL 匹配的响应。
+    """
+    payloads = []
+    for method, params in events:
+        if method != "Network.responseReceived" or params.get("type") not in ("XHR", "Fetch"):
+            continue
+        response = params.get("response", {})
+        url = response.get("url", "")
+        if "json" not in response.get("mimeType", "") or (url_pattern and not url_pattern.search(url)):
+            continue
+        try:
+            body = driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": params["requestId"]})
+            payloads.append((url, json.loads(body.get("body", ""))))
+        except Exception as e:
+            # 响应体可能已被 Chrome 回收，或不是合法 JSON
+            logger.debug("Cannot read response body of %s: %s", url, e)
+    return payloads
+
+
+class RenderContext:
+    """
+    一次渲染的上下文，传给页面动作：driver、就绪等待器，以及本次渲染累计的网络事件。
+    动作通过 ``drain()`` 读取新的网络事件，事件同时保留下来用于统计整页流量。
+    """
+
+    def __init__(self, driver, readiness, capture_pattern=None, source=None):
+        self.driver = driver
+        self.readiness = readiness
+        self.capture_pattern = capture_pattern
+        # 读取新网络事件的函数，默认读取整个浏览器的 performance 日志（多标签页时只读本标签页的事件）
+        self.source = source or (lambda: drain_network_events(driver))
+        self.events = []
+
+    def drain(self):
+        events = self.source()
+        self.events.extend(events)
+        return events
+
+
+def summarize_traffic(events):
+    """
+    汇总一个页面的网络流量：
+
+    - bytes：实际传输的字节数（Network.loadingFinished.encodedDataLength 之和）；
+    - requests：发出的请求数；
+    - blocked：被拦截的请求数，以及按资源类型的细分 blocked_by_type；
+    - blocked_images：被拦截图片的 URL（仍可写入 origin_images 交给图片 pipeline 下载）。
+    """
+    requests = {}
+    summary = {"bytes": 0, "requests": 0, "blocked": 0, "blocked_by_type": {}, "blocked_images": []}
+    for method, params in events:
+        request_id = params.get("requestId")
+        if method == "Network.requestWillBeSent":
+            requests[request_id] = (params.get("type", "Other"), params.get("request", {}).get("url"))
+            summary["requests"] += 1
+        elif method == "Network.loadingFinished":
+            summary["bytes"] += int(params.get("encodedDataLength") or 0)
+        elif method == "Network.loadingFailed" and params.get("blockedReason"):
+            resource_type, url = requests.get(request_id, (params.get("type", "Other"), None))
+            summary["blocked"] += 1
+            by_type = summary["blocked_by_type"]
+            by_type[resource_type] = by_type.get(resource_type, 0) + 1
+            if resource_type == "Image" and url:
+                summary["blocked_images"].append(url)
+    return summary
@@ -0,0 +1,393 @@
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import psutil
+except ImportError:  # psutil 为可选依赖，缺失时退化为读取 /proc
+    psutil = None
+
+logger = logging.getLogger('browser')
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+class PoolExhausted(Exception):
+    """在 checkout_timeout 内没有可用的浏览器。"""
+
+
+def _proc_rss(pid):
+    """读取 /proc/<pid>/statm 中的常驻内存（字节），读取失败返回 0。"""
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return 0
+
+
+class PooledBrowser:
+    """
+    池中的一个浏览器：包装 driver，并记录渲染页数、创建时间和签出时间。
+    """
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.pages = 0
+        self.created_at = time.monotonic()
+        self.checked_out_at = None
+        self.broken = False
+
+    @property
+    def pids(self):
+        """chromedriver 与 Chrome 主进程的 pid。"""
+        pids = []
+        service = getattr(self.driver, "service", None)
+        process = getattr(service, "process", None)
+        if process is not None and process.pid:
+            pids.append(process.pid)
+        browser_pid = getattr(self.driver, "browser_pid", None)
+        if browser_pid:
+            pids.append(browser_pid)
+        return pids
+
+    def rss(self):
+        """chromedriver + Chrome（包含所有子进程：renderer、GPU 等）的常驻内存总和，单位字节。"""
+        total = 0
+        for pid in self.pids:
+            if psutil is None:
+                total += _proc_rss(pid)
+                continue
+            try:
+                proc = psutil.Process(pid)
+                total += proc.memory_info().rss
+                for child in proc.children(recursive=True):
+                    total += child.memory_info().rss
+            except psutil.Error:
+                continue
+        return total
+
+    def is_alive(self):
+        service = getattr(self.driver, "service", None)
+        process = getattr(service, "process", None)
+        if process is not None and process.poll() is not None:
+            return False
+        return not self.broken
+
+    def quit(self):
+        try:
+            self.driver.quit()
+        except Exception as e:
+            logger.warning("Error quitting browser %s: %s", self.pids, e)
+
+
+class BrowserPool:
+    """
+    Chrome 实例池。
+
+    每次渲染通过 ``checkout()`` 借出一个浏览器，用完归还：
+
+        with pool.checkout() as driver:
+            driver.get(url)
+
+    - 浏览器渲染 ``max_pages`` 页或常驻内存超过 ``max_rss_mb`` 后被回收重建；
+    - 浏览器在首次签出时才启动；``prewarm`` 个浏览器在 ``start()`` 时于后台预热（爬虫读取
+      第一批 Redis 任务的同时完成启动），为 0 时完全惰性，不渲染的运行不会启动 Chrome；
+    - ``warm_spare`` 为 True 时首次签出后后台始终预热一个备用浏览器，回收时直接替换；
+    - 签出超过 ``hang_timeout`` 秒的浏览器视为挂死，由巡检线程强制结束；
+    - 巡检线程同时回收僵尸 chromedriver/Chrome 进程（需要 psutil）。
+
+    启动耗时写入 ``browser_pool/startup/total_ms`` 与 ``max_ms``（次数为 ``browser_pool/started``），签出时因浏览器
+    尚未就绪而等待的时间写入 ``browser_pool/cold_start/*``。
+    """
+
+    def __init__(self, factory, size=1, max_pages=50, max_rss_mb=1024, warm_spare=True, prewarm=1,
+                 checkout_timeout=120, hang_timeout=300, reap_interval=30, stats=None):
+        if size < 1:
+            raise ValueError("browser pool size must be >= 1")
+        self.factory = factory
+        self.size = size
+        self.max_pages = max_pages
+        self.max_rss = max_rss_mb * 1024 * 1024 if max_rss_mb else 0
+        self.warm_spare = warm_spare
+        self.prewarm = min(prewarm, size)
+        self.checkout_timeout = checkout_timeout
+        self.hang_timeout = hang_timeout
+        self.reap_interval = reap_interval
+        self.stats = stats
+
+        self._cond = threading.Condition()
+        self._idle = []
+        self._busy = set()
+        self._spare = None
+        self._spawning_spare = False
+        self._starting = 0
+        self._closed = False
+        self._reaper = None
+
+    @classmethod
+    def from_settings(cls, settings, factory, stats=None):
+        return cls(
+            factory,
+            size=settings.getint("BROWSER_POOL_SIZE", 1),
+            max_pages=settings.getint("BROWSER_MAX_PAGES", 50),
+            max_rss_mb=settings.getint("BROWSER_MAX_RSS_MB", 1024),
+            warm_spare=settings.getbool("BROWSER_WARM_SPARE", True),
+            prewarm=settings.getint("BROWSER_PREWARM", 1),
+            checkout_timeout=settings.getfloat("BROWSER_CHECKOUT_TIMEOUT", 120),
+            hang_timeout=settings.getfloat("BROWSER_HANG_TIMEOUT", 300),
+            reap_interval=settings.getfloat("BROWSER_REAP_INTERVAL", 30),
+            stats=stats,
+        )
+
+    def _inc_stat(self, key, count=1):
+        if self.stats is not None:
+            self.stats.inc_value(f"browser_pool/{key}", count)
+
+    @property
+    def total(self):
+        return len(self._idle) + len(self._busy) + self._starting
+
+    def start(self):
+        """启动巡检线程，并在后台预热 ``prewarm`` 个浏览器，不阻塞调用方。"""
+        if self._reaper is None:
+            self._reaper = threading.Thread(target=self._reap_loop, name="browser-pool-reaper", daemon=True)
+            self._reaper.start()
+        for _ in range(self.prewarm):
+            with self._cond:
+                if self._closed or self.total >= self.size:
+                    return
+                self._starting += 1
+            threading.Thread(target=self._prewarm_one, name="browser-pool-prewarm", daemon=True).start()
+
+    def _prewarm_one(self):
+        browser = None
+        try:
+            browser = self._spawn()
+        except Exception as e:
+            logger.error("Failed to prewarm browser: %s", e)
+        with self._cond:
+            self._starting -= 1
+            if browser is not None and not self._closed:
+                self._idle.append(browser)
+                browser = None
+            self._cond.notify()
+        if browser is not None:
+            browser.quit()
+
+    @contextmanager
+    def checkout(self):
+        """借出一个 driver；with 块内抛出异常时该浏览器会被视为损坏并回收。"""
+        browser = self.acquire()
+        try:
+            yield browser.driver
+        except Exception:
+            browser.broken = True
+            raise
+        finally:
+            self.release(browser)
+
+    def acquire(self):
+        """借出一个 PooledBrowser，需配对调用 ``release()``；一般使用 ``checkout()``。"""
+        deadline = time.monotonic() + self.checkout_timeout
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise PoolExhausted("browser pool is closed")
+                if self._idle:
+                    browser = self._idle.pop()
+                    break
+                if self.total < self.size:
+                    self._starting += 1
+                    browser = None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolExhausted(f"no browser available after {self.checkout_timeout}s")
+                self._cond.wait(remaining)
+
+        if browser is None:
+            started = time.monotonic()
+            try:
+                browser = self._take_spare() or self._spawn()
+            finally:
+                with self._cond:
+                    self._starting -= 1
+                    if browser is None:
+                        # 启动失败：空出的名额交给下一个等待者
+                        self._cond.notify()
+            waited_ms = int((time.monotonic() - started) * 1000)
+            self._inc_stat("cold_start/count")
+            self._inc_stat("cold_start/total_ms", waited_ms)
+
+        with self._cond:
+            browser.checked_out_at = time.monotonic()
+            self._busy.add(browser)
+        self._inc_stat("checkout")
+        # 备用浏览器在第一次签出后才开始预热
+        self._ensure_spare()
+        return browser
+
+    def release(self, browser, pages=1):
+        """归还浏览器，pages 为本次签出期间渲染的页数（多标签页时一次签出渲染多页）。"""
+        browser.pages += pages
+        browser.checked_out_at = None
+        reason = self._recycle_reason(browser)
+        with self._cond:
+            self._busy.discard(browser)
+            if reason is None and not self._closed:
+                self._idle.append(browser)
+                self._cond.notify()
+                return
+        if reason:
+            logger.info("Recycling browser %s after %d pages: %s", browser.pids, browser.pages, reason)
+            self._inc_stat(f"recycled/{reason}")
+        browser.quit()
+        self._replace()
+
+    def _recycle_reason(self, browser):
+        if not browser.is_alive():
+            return "broken"
+        if self.max_pages and browser.pages >= self.max_pages:
+            return "max_pages"
+        if self.max_rss and browser.rss() > self.max_rss:
+            return "max_rss"
+        return None
+
+    def _replace(self):
+        """回收后用备用浏览器补位，保持池中可用数量。"""
+        with self._cond:
+            if self._closed:
+                return
+            spare = self._spare
+            self._spare = None
+            if spare is not None:
+                self._idle.append(spare)
+            self._cond.notify()
+        self._ensure_spare()
+
+    def _spawn(self):
+        started = time.monotonic()
+        browser = PooledBrowser(self.factory())
+        elapsed_ms = int((time.monotonic() - started) * 1000)
+        self._inc_stat("started")
+        self._inc_stat("startup/total_ms", elapsed_ms)
+        if self.stats is not None:
+            self.stats.max_value("browser_pool/startup/max_ms", elapsed_ms)
+        return browser
+
+    def _take_spare(self):
+        with self._cond:
+            spare, self._spare = self._spare, None
+        if spare is not None:
+            self._inc_stat("spare_used")
+            self._ensure_spare()
+        return spare
+
+    def _ensure_spare(self):
+        if not self.warm_spare:
+            return
+        with self._cond:
+            if self._closed or self._spare is not None or self._spawning_spare:
+                return
+            self._spawning_spare = True
+        threading.Thread(target=self._spawn_spare, name="browser-pool-spare", daemon=True).start()
+
+    def _spawn_spare(self):
+        browser = None
+        try:
+            browser = self._spawn()
+        except Exception as e:
+            logger.error("Failed to warm spare browser: %s", e)
+        with self._cond:
+            self._spawning_spare = False
+            if browser is not None and not self._closed:
+                self._spare = browser
+                browser = None
+        if browser is not None:
+            browser.quit()
+
+    def _reap_loop(self):
+        while True:
+            with self._cond:
+                if self._closed:
+                    return
+                self._cond.wait(self.reap_interval)
+                if self._closed:
+                    return
+            try:
+                self.reap()
+            except Exception as e:
+                logger.error("Browser reaper failed: %s", e)
+
+    def reap(self):
+        """结束挂死的浏览器，并回收僵尸/孤儿 chromedriver、Chrome 进程。"""
+        now = time.monotonic()
+        with self._cond:
+            busy = list(self._busy)
+            idle = list(self._idle)
+        for browser in busy:
+            if self.hang_timeout and browser.checked_out_at and now - browser.checked_out_at > self.hang_timeout:
+                # quit 会让签出方当前的 WebDriver 调用失败，归还时按 broken 回收
+                logger.warning("Browser %s hung for %.0fs, killing it", browser.pids, now - browser.checked_out_at)
+                browser.broken = True
+                self._kill(browser)
+                self._inc_stat("reaped/hung")
+        for browser in idle:
+            if not browser.is_alive():
+                with self._cond:
+                    if browser not in self._idle:
+                        continue
+                    self._idle.remove(browser)
+                browser.quit()
+                self._inc_stat("reaped/dead")
+                self._replace()
+        self._reap_zombies()
+
+    def _kill(self, browser):
+        if psutil is None:
+            browser.quit()
+            return
+        for pid in browser.pids:
+            try:
+                proc = psutil.Process(pid)
+                for child in proc.children(recursive=True):
+                    child.kill()
+                proc.kill()
+            except psutil.Error:
+                continue
+
+    def _reap_zombies(self):
+        if psutil is None:
+            return
+        with self._cond:
+            known = {pid for b in list(self._idle) + list(self._busy) for pid in b.pids}
+            if self._spare is not None:
+                known.update(self._spare.pids)
+        for proc in psutil.Process().children(recursive=False):
+            try:
+                if proc.status() == psutil.STATUS_ZOMBIE:
+                    proc.wait(timeout=0)
+                    self._inc_stat("reaped/zombie")
+                elif "chromedriver" in proc.name() and proc.pid not in known \
+                        and not self._starting and not self._spawning_spare:
+                    # 不属于池中任何浏览器的 chromedriver 即为孤儿进程
+                    for child in proc.children(recursive=True):
+                        child.kill()
+                    proc.kill()
+                    self._inc_stat("reaped/orphan")
+            except psutil.Error:
+                continue
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            browsers = list(self._idle) + list(self._busy)
+            if self._spare is not None:
+                browsers.append(self._spare)
+            self._idle, self._busy, self._spare = [], set(), None
+            self._cond.notify_all()
+        for browser in browsers:
+            browser.quit()
+        logger.info("Browser pool closed (%d browsers)", len(browsers))
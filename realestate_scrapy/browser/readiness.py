@@ -0,0 +1,157 @@
+import logging
+import time
+
+logger = logging.getLogger('browser')
+
+# 直方图桶上限（毫秒），最后一个桶收集所有更慢的样本
+HISTOGRAM_BUCKETS_MS = (250, 500, 1000, 2000, 5000, 10000, 20000)
+
+# 一次 execute_script 同时探测所有就绪信号，避免每个信号一次 WebDriver 往返。
+# MutationObserver 在首次探测时安装，之后记录最后一次 DOM 变化的时间。
+PROBE_SCRIPT = """
+var selector = arguments[0], imageScope = arguments[1];
+if (!window.__rsReady) {
+  window.__rsReady = {lastMutation: performance.now()};
+  new MutationObserver(function () { window.__rsReady.lastMutation = performance.now(); })
+    .observe(document.documentElement, {childList: true, subtree: true, attributes: true, characterData: true});
+}
+var now = performance.now();
+var lastResponse = 0;
+var entries = performance.getEntriesByType('resource');
+for (var i = 0; i < entries.length; i++) {
+  if (entries[i].responseEnd > lastResponse) { lastResponse = entries[i].responseEnd; }
+}
+var pendingImages = 0;
+var root = imageScope ? document.querySelector(imageScope) : document;
+if (root) {
+  var images = root.querySelectorAll('img');
+  var horizon = window.innerHeight * 2;
+  for (var j = 0; j < images.length; j++) {
+    var img = images[j];
+    if (!img.complete && img.getBoundingClientRect().top < horizon) { pendingImages++; }
+  }
+}
+return {
+  loaded: document.readyState === 'complete',
+  network_quiet_ms: now - lastResponse,
+  dom_quiet_ms: now - window.__rsReady.lastMutation,
+  selector: selector ? document.querySelector(selector) !== null : true,
+  pending_images: root ? pendingImages : 0
+};
+"""
+
+SCROLL_SCRIPT = "window.scrollTo(0, document.body.scrollHeight)"
+
+# 多标签页渲染的非阻塞导航：在旧文档上打标记后跳转，标记消失即新文档已提交，
+# 避免就绪探测读到上一页的状态
+NAVIGATE_SCRIPT = "window.__rsStale = true; window.location.href = arguments[0];"
+NEW_DOCUMENT_SCRIPT = "return !window.__rsStale;"
+
+
+class ReadinessWaiter:
+    """
+    基于事件的页面就绪等待，取代固定的 time.sleep。
+
+    ``wait()`` 轮询页面，直到请求的全部信号满足：
+
+    - network：document.readyState 为 complete 且 ``network_idle_ms`` 内没有资源完成加载；
+    - dom：``dom_quiet_ms`` 内没有 DOM 变化（MutationObserver）；
+    - selector：目标选择器出现，可通过 ``selector_timeouts`` 为每个选择器单独设置超时；
+    - images：滚动后 ``image_scope`` 内视口附近的图片全部加载完成（懒加载稳定）。
+
+    每个信号的就绪耗时以直方图形式写入 crawl stats：
+    ``readiness/<label>/<signal>/le_<ms>``，另有 count、total_ms、max_ms 与 timeout 计数。
+    """
+
+    SIGNALS = ("network", "dom", "selector", "images")
+
+    def __init__(self, stats=None, timeout=20, poll_interval=0.1, network_idle_ms=500,
+                 dom_quiet_ms=500, selector_timeouts=None):
+        self.stats = stats
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.network_idle_ms = network_idle_ms
+        self.dom_quiet_ms = dom_quiet_ms
+        self.selector_timeouts = selector_timeouts or {}
+
+    @classmethod
+    def from_settings(cls, settings, stats=None):
+        return cls(
+            stats=stats,
+            timeout=settings.getfloat("READINESS_TIMEOUT", 20),
+            poll_interval=settings.getfloat("READINESS_POLL_INTERVAL", 0.1),
+            network_idle_ms=settings.getint("READINESS_NETWORK_IDLE_MS", 500),
+            dom_quiet_ms=settings.getint("READINESS_DOM_QUIET_MS", 500),
+            selector_timeouts=settings.getdict("READINESS_SELECTOR_TIMEOUTS"),
+        )
+
+    def wait(self, driver, label, selector=None, scroll=False, image_scope=None, timeout=None):
+        """
+        等待页面就绪，返回 True 表示全部信号在超时前满足。
+
+        :param label: 统计分组名，例如 "property"、"gallery"。
+        :param selector: 需要出现的 CSS 选择器（可选）。
+        :param scroll: 为 True 时先滚动到底部触发懒加载，并等待图片稳定。
+        :param image_scope: 只统计该选择器范围内的图片（默认整个文档）。
+        """
+        if timeout is None:
+            timeout = self.selector_timeouts.get(selector, self.timeout) if selector else self.timeout
+        if scroll:
+            driver.execute_script(SCROLL_SCRIPT)
+
+        pending = {"network", "dom"}
+        if selector:
+            pending.add("selector")
+        if scroll:
+            pending.add("images")
+
+        started = time.monotonic()
+        deadline = started + timeout
+        while True:
+            try:
+                state = driver.execute_script(PROBE_SCRIPT, selector, image_scope)
+            except Exception as e:
+                # 导航过程中脚本可能失败，下一轮重试
+                logger.debug("Readiness probe failed: %s", e)
+                state = None
+            elapsed_ms = int((time.monotonic() - started) * 1000)
+            if state:
+                for signal in list(pending):
+                    if self._signal_met(signal, state):
+                        pending.discard(signal)
+                        self._record(label, signal, elapsed_ms)
+            if not pending:
+                self._record(label, "ready", elapsed_ms)
+                return True
+            if time.monotonic() >= deadline:
+                for signal in pending:
+                    self._inc(f"readiness/{label}/timeout/{signal}")
+                logger.warning("Page not ready after %.1fs (%s), waiting for: %s",
+                               timeout, label, ", ".join(sorted(pending)))
+                return False
+            time.sleep(self.poll_interval)
+
+    def _signal_met(self, signal, state):
+        if signal == "network":
+            return state.get("loaded") and state.get("network_quiet_ms", 0) >= self.network_idle_ms
+        if signal == "dom":
+            return state.get("dom_quiet_ms", 0) >= self.dom_quiet_ms
+        if signal == "selector":
+            return bool(state.get("selector"))
+        if signal == "images":
+            return state.get("pending_images", 1) == 0
+        return True
+
+    def _inc(self, key, count=1):
+        if self.stats is not None:
+            self.stats.inc_value(key, count)
+
+    def _record(self, label, signal, elapsed_ms):
+        if self.stats is None:
+            return
+        prefix = f"readiness/{label}/{signal}"
+        bucket = next((b for b in HISTOGRAM_BUCKETS_MS if elapsed_ms <= b), None)
+        self.stats.inc_value(f"{prefix}/le_{bucket}" if bucket else f"{prefix}/le_inf")
+        self.stats.inc_value(f"{prefix}/count")
+        self.stats.inc_value(f"{prefix}/total_ms", elapsed_ms)
+        self.stats.max_value(f"{prefix}/max_ms", elapsed_ms)
@@ -0,0 +1,90 @@
+import logging
+import re
+
+from .actions import ACTIONS
+from .network import RenderContext, summarize_traffic
+from .pool import BrowserPool
+from .readiness import ReadinessWaiter
+from .resources import ResourcePolicy
+from .scripts import EXTRACT_SCRIPTS
+from .tabs import TabbedRenderer
+
+logger = logging.getLogger('browser')
+
+
+def create_renderer(settings, factory, stats=None):
+    """按 BROWSER_TABS 选择渲染器：1 为每个浏览器串行渲染，大于 1 为多标签页流水线渲染。"""
+    pattern = settings.get("NETWORK_CAPTURE_URL_PATTERN")
+    pool = BrowserPool.from_settings(settings, factory=factory, stats=stats)
+    readiness = ReadinessWaiter.from_settings(settings, stats=stats)
+    capture_pattern = re.compile(pattern) if pattern else None
+    tabs = settings.getint("BROWSER_TABS", 1)
+    if tabs > 1:
+        policy = ResourcePolicy.from_settings(settings) if settings.getbool("RESOURCE_BLOCK_ENABLED", True) else None
+        return TabbedRenderer(pool, readiness, capture_pattern=capture_pattern, tabs=tabs, resource_policy=policy)
+    return Renderer(pool, readiness, capture_pattern=capture_pattern)
+
+
+def job_from_request(request):
+    """把渲染请求的 meta 转换为可序列化的渲染任务（本地渲染与渲染服务共用）。"""
+    meta = request.meta
+    return {
+        "url": request.url,
+        "label": meta.get("render_label", "page"),
+        "wait_for": meta.get("render_wait_for"),
+        "scroll": bool(meta.get("render_scroll")),
+        "actions": list(meta.get("render_actions", ())),
+        "extract": meta.get("render_extract"),
+        "body": meta.get("render_body", True),
+    }
+
+
+class Renderer:
+    """
+    用本地浏览器池执行渲染任务。
+
+    ``render(job)`` 借出浏览器、加载页面、等待就绪、执行动作与抽取脚本，返回
+    ``{"url", "body", "data", "cookies"}``，其中 data 即 ``meta["render_data"]``
+    （含每页流量汇总 ``data["resources"]``）。结果只包含 JSON 类型，可直接经渲染服务传回。
+    """
+
+    def __init__(self, pool, readiness, capture_pattern=None):
+        self.pool = pool
+        self.readiness = readiness
+        self.capture_pattern = capture_pattern
+
+    @property
+    def concurrency(self):
+        return self.pool.size
+
+    def start(self):
+        self.pool.start()
+
+    def close(self):
+        self.pool.close()
+
+    def render(self, job):
+        label = job.get("label") or "page"
+        with self.pool.checkout() as driver:
+            ctx = RenderContext(driver, self.readiness, self.capture_pattern)
+            # 丢弃上一个页面残留的网络事件
+            ctx.drain()
+            ctx.events = []
+            driver.get(job["url"])
+            if not self.readiness.wait(driver, label, selector=job.get("wait_for")):
+                logger.error("Page not ready: %s", job["url"])
+            if job.get("scroll"):
+                self.readiness.wait(driver, f"{label}_scroll", scroll=True)
+
+            url = driver.current_url
+            body = driver.page_source if job.get("body", True) else ""
+            data = {}
+            for name in job.get("actions") or ():
+                data[name] = ACTIONS[name](ctx)
+            if job.get("extract"):
+                script, args = EXTRACT_SCRIPTS[job["extract"]]
+                data["extract"] = driver.execute_script(script, *args)
+            ctx.drain()
+            data["resources"] = summarize_traffic(ctx.events)
+            cookies = {c["name"]: c["value"] for c in driver.get_cookies()}
+        return {"url": url, "body": body, "data": data, "cookies": cookies}
@@ -0,0 +1,9 @@
+from realestate_scrapy.extractors import homely
+
+from .actions import GALLERY_SELECTOR
+
+# 渲染请求可通过 meta["render_extract"] 按名称引用的浏览器内抽取脚本：
+# 名称 -> (脚本, 传给脚本的参数)
+EXTRACT_SCRIPTS = {
+    "homely": (homely.EXTRACT_SCRIPT, (GALLERY_SELECTOR,)),
+}
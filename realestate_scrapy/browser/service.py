@@ -0,0 +1,194 @@
+import json
+import logging
+import math
+import os
+import socket
+import threading
+import time
+import uuid
+
+import redis
+
+from .pool import PoolExhausted
+
+logger = logging.getLogger('render_service')
+
+
+class RenderServiceError(Exception):
+    """渲染服务返回错误，或在超时前没有返回结果。"""
+
+
+class ServiceStats:
+    """线程安全的内存统计，接口与 Scrapy StatsCollector 的 inc_value/max_value 一致，供浏览器池与就绪等待使用。"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def inc_value(self, key, count=1, start=0, spider=None):
+        with self._lock:
+            self._stats[key] = self._stats.get(key, start) + count
+
+    def max_value(self, key, value, spider=None):
+        with self._lock:
+            self._stats[key] = max(self._stats.get(key, value), value)
+
+    def get_stats(self):
+        with self._lock:
+            return dict(self._stats)
+
+
+class RenderService:
+    """
+    独立的渲染服务：一组浏览器 worker 从 Redis 列表 ``queue_key`` 取渲染任务，
+    用 ``renderer``（``renderer.Renderer``）执行后把结果推回任务指定的 reply 列表。
+
+    任务是 ``renderer.job_from_request`` 生成的 JSON，另带 ``id``、``reply_to`` 与 ``deadline``
+    （epoch 秒，过期未处理的任务直接丢弃，客户端早已超时）。结果为 Renderer 的返回值加 ``id``，
+    失败时为 ``{"id", "error", "error_type"}``。
+
+    任意数量的爬虫进程通过 ``RenderClient`` 共享同一个服务，浏览器容量与爬虫容量分别伸缩；
+    服务统计每隔 ``stats_interval`` 秒写入 Redis 哈希 ``<queue_key>:stats:<host>-<pid>``。
+    """
+
+    def __init__(self, renderer, server, queue_key="render:jobs", workers=None, result_ttl=300,
+                 stats=None, stats_interval=30):
+        self.renderer = renderer
+        self.server = server
+        self.queue_key = queue_key
+        self.workers = workers or renderer.concurrency
+        self.result_ttl = result_ttl
+        self.stats = stats if stats is not None else ServiceStats()
+        self.stats_interval = stats_interval
+        self.stats_key = f"{queue_key}:stats:{socket.gethostname()}-{os.getpid()}"
+        self._stopping = threading.Event()
+        self._threads = []
+
+    @classmethod
+    def from_settings(cls, settings, renderer, stats=None, workers=None):
+        return cls(
+            renderer,
+            redis.Redis.from_url(settings.get("REDIS_URL")),
+            queue_key=settings.get("RENDER_SERVICE_QUEUE", "render:jobs"),
+            workers=workers,
+            result_ttl=settings.getint("RENDER_SERVICE_RESULT_TTL", 300),
+            stats=stats,
+        )
+
+    def run(self):
+        """启动 worker 线程并阻塞到 ``stop()`` 被调用。"""
+        self.renderer.start()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"render-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info("Render service listening on %s with %d workers", self.queue_key, self.workers)
+        try:
+            while not self._stopping.wait(self.stats_interval):
+                self.flush_stats()
+        finally:
+            for thread in self._threads:
+                thread.join()
+            self.renderer.close()
+            self.flush_stats()
+            logger.info("Render service stopped")
+
+    def stop(self):
+        self._stopping.set()
+
+    def flush_stats(self):
+        stats = self.stats.get_stats()
+        if stats:
+            pipe = self.server.pipeline(transaction=False)
+            pipe.hset(self.stats_key, mapping=stats)
+            pipe.expire(self.stats_key, max(int(self.stats_interval * 10), 300))
+            pipe.execute()
+
+    def _work(self):
+        while not self._stopping.is_set():
+            # 带超时的阻塞读取，便于及时响应 stop()
+            popped = self.server.brpop(self.queue_key, timeout=1)
+            if popped is None:
+                continue
+            try:
+                job = json.loads(popped[1])
+            except ValueError:
+                logger.error("Discarding malformed render job: %r", popped[1][:200])
+                self.stats.inc_value("render_service/malformed")
+                continue
+            if job.get("deadline") and time.time() > job["deadline"]:
+                self.stats.inc_value("render_service/expired")
+                continue
+            self._reply(job, self.handle(job))
+
+    def handle(self, job):
+        started = time.monotonic()
+        try:
+            result = self.renderer.render(job)
+        except Exception as e:
+            logger.error("Render failed for %s: %s", job.get("url"), e)
+            self.stats.inc_value("render_service/failed")
+            return {"id": job.get("id"), "error": str(e), "error_type": type(e).__name__}
+        elapsed_ms = int((time.monotonic() - started) * 1000)
+        self.stats.inc_value("render_service/rendered")
+        self.stats.inc_value("render_service/total_ms", elapsed_ms)
+        self.stats.max_value("render_service/max_ms", elapsed_ms)
+        result["id"] = job.get("id")
+        return result
+
+    def _reply(self, job, result):
+        reply_to = job.get("reply_to")
+        if not reply_to:
+            return
+        pipe = self.server.pipeline(transaction=False)
+        pipe.lpush(reply_to, json.dumps(result))
+        # 客户端已超时离开时，结果不会永久残留
+        pipe.expire(reply_to, self.result_ttl)
+        pipe.execute()
+
+
+class RenderClient:
+    """
+    渲染服务的客户端，接口与 ``renderer.Renderer`` 相同，可直接替换本地浏览器池：
+
+        result = client.render(job_from_request(request))
+
+    ``render`` 阻塞到结果返回或 ``timeout`` 秒超时（抛出 ``RenderServiceError``），
+    由调用方在线程中执行；``concurrency`` 为同时等待中的任务上限。
+    """
+
+    def __init__(self, server, queue_key="render:jobs", timeout=180, concurrency=16):
+        self.server = server
+        self.queue_key = queue_key
+        self.timeout = timeout
+        self.concurrency = concurrency
+
+    @classmethod
+    def from_settings(cls, settings):
+        return cls(
+            redis.Redis.from_url(settings.get("REDIS_URL")),
+            queue_key=settings.get("RENDER_SERVICE_QUEUE", "render:jobs"),
+            timeout=settings.getfloat("RENDER_SERVICE_TIMEOUT", 180),
+            concurrency=settings.getint("RENDER_SERVICE_CONCURRENCY", 16),
+        )
+
+    def start(self):
+        pass
+
+    def close(self):
+        pass
+
+    def render(self, job):
+        job_id = uuid.uuid4().hex
+        reply_to = f"{self.queue_key}:reply:{job_id}"
+        job = dict(job, id=job_id, reply_to=reply_to, deadline=time.time() + self.timeout)
+        self.server.lpush(self.queue_key, json.dumps(job))
+        popped = self.server.brpop(reply_to, timeout=max(1, math.ceil(self.timeout)))
+        if popped is None:
+            raise RenderServiceError(f"render service did not answer within {self.timeout}s")
+        result = json.loads(popped[1])
+        if "error" in result:
+            if result.get("error_type") == PoolExhausted.__name__:
+                raise PoolExhausted(result["error"])
+            raise RenderServiceError(f"{result.get('error_type')}: {result['error']}")
+        return result
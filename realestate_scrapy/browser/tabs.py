@@ -0,0 +1,256 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from selenium.webdriver.remote.webelement import WebElement
+
+from .actions import ACTIONS
+from .network import RenderContext, drain_network_events_by_target, summarize_traffic
+from .pool import PoolExhausted
+from .readiness import NAVIGATE_SCRIPT, NEW_DOCUMENT_SCRIPT
+from .scripts import EXTRACT_SCRIPTS
+
+logger = logging.getLogger('browser')
+
+
+class TabLane:
+    """
+    一个签出的 Chrome 及其标签页。WebDriver 同一时刻只能操作一个窗口，每个命令都经
+    ``use(handle)`` 串行化并切换到目标标签页；切走的标签页在 Chrome 中继续加载。
+    """
+
+    def __init__(self, browser, handles):
+        self.browser = browser
+        self.driver = browser.driver
+        self.handles = list(handles)
+        self.free = list(handles)
+        self.active = self.driver.current_window_handle
+        # 只在单个 WebDriver 命令（及 drain）期间持有
+        self.lock = threading.Lock()
+        self.busy = 0
+        self.pages = 0
+        self.retiring = False
+        self._events = {}
+
+    @contextmanager
+    def use(self, handle):
+        with self.lock:
+            if self.active != handle:
+                self.driver.switch_to.window(handle)
+                self.active = handle
+            yield self.driver
+
+    def drain(self, handle):
+        """读取整个浏览器的网络事件并按标签页分发，返回本标签页的新事件。"""
+        with self.lock:
+            for webview, events in drain_network_events_by_target(self.driver).items():
+                self._events.setdefault(webview, []).extend(events)
+            return self._events.pop(handle, [])
+
+
+class TabDriver:
+    """
+    某个标签页上的 WebDriver 视图，交给就绪等待与页面动作使用：每个 WebDriver 命令（方法调用，
+    以及 page_source、current_url 等会发命令的属性）单独持锁并先切换到该标签页。命令之间
+    （WebDriverWait 的轮询间隔、就绪等待）不持锁，一个标签页的慢动作不会阻塞同一浏览器的其他标签页。
+    ``find_element(s)`` 返回的元素同样按命令加锁（TabElement）。
+    """
+
+    def __init__(self, lane, handle):
+        self.lane = lane
+        self.handle = handle
+
+    def _wrap(self, value):
+        if isinstance(value, WebElement):
+            return TabElement(self, value)
+        if isinstance(value, list):
+            return [self._wrap(v) for v in value]
+        return value
+
+    def _locked(self, target, name):
+        with self.lane.use(self.handle):
+            value = getattr(target, name)
+        if not callable(value):
+            return self._wrap(value)
+
+        def command(*args, **kwargs):
+            # 作为脚本参数传回时还原为原始元素，selenium 才能序列化
+            args = [a.element if isinstance(a, TabElement) else a for a in args]
+            with self.lane.use(self.handle):
+                return self._wrap(value(*args, **kwargs))
+        return command
+
+    def __getattr__(self, name):
+        return self._locked(self.lane.driver, name)
+
+
+class TabElement:
+    """标签页中的元素，每个命令单独持锁并先切换到所属标签页。"""
+
+    def __init__(self, tab, element):
+        self.tab = tab
+        self.element = element
+
+    def __getattr__(self, name):
+        return self.tab._locked(self.element, name)
+
+
+class TabbedRenderer:
+    """
+    多标签页流水线渲染，接口与 ``renderer.Renderer`` 相同。
+
+    每个 Chrome 开 ``tabs`` 个标签页，``concurrency`` = 浏览器数 × tabs 个渲染线程同时工作：
+    一个标签页在执行动作、抽取时（只在每个 WebDriver 命令期间持有该浏览器的锁），其他标签页已经在导航并加载
+    调度器下发的后续页面，前瞻深度即 tabs。标签页共享一个 Chrome 进程，内存开销远小于多开浏览器。
+
+    浏览器以"车道"（TabLane）为单位长期签出，渲染 ``pool.max_pages`` 页或出错后整体归还，
+    由 BrowserPool 按页数、内存与损坏状态回收。需要 driver 使用 page_load_strategy "none"
+    （``driver.create_driver`` 在 BROWSER_TABS > 1 时设置）。
+    """
+
+    def __init__(self, pool, readiness, capture_pattern=None, tabs=2, resource_policy=None):
+        if tabs < 1:
+            raise ValueError("tabs per browser must be >= 1")
+        self.pool = pool
+        self.readiness = readiness
+        self.capture_pattern = capture_pattern
+        self.tabs = tabs
+        # 新标签页是新的 DevTools target，create_driver 在第一个标签页上设置的拦截规则对它不生效
+        self.resource_policy = resource_policy
+        self._cond = threading.Condition()
+        self._lanes = []
+        self._opening = 0
+        self._closed = False
+
+    @property
+    def concurrency(self):
+        return self.pool.size * self.tabs
+
+    def start(self):
+        self.pool.start()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._lanes = []
+            self._cond.notify_all()
+        self.pool.close()
+
+    def render(self, job):
+        lane, handle = self._take_tab()
+        try:
+            return self._render_in_tab(lane, handle, job)
+        except Exception:
+            lane.retiring = True
+            lane.browser.broken = True
+            raise
+        finally:
+            self._give_tab(lane, handle)
+
+    def _render_in_tab(self, lane, handle, job):
+        url = job["url"]
+        label = job.get("label") or "page"
+        lane.drain(handle)
+        tab = TabDriver(lane, handle)
+        tab.execute_script(NAVIGATE_SCRIPT, url)
+        # 导航期间不持锁，同一浏览器的其他标签页继续工作
+        self._wait_new_document(tab, url)
+        if not self.readiness.wait(tab, label, selector=job.get("wait_for")):
+            logger.error("Page not ready: %s", url)
+        if job.get("scroll"):
+            self.readiness.wait(tab, f"{label}_scroll", scroll=True)
+
+        ctx = RenderContext(tab, self.readiness, self.capture_pattern, source=lambda: lane.drain(handle))
+        # 导航期间（其他标签页读取日志时）分发给本标签页的事件
+        ctx.drain()
+        body = tab.page_source if job.get("body", True) else ""
+        current_url = tab.current_url
+        data = {}
+        for name in job.get("actions") or ():
+            data[name] = ACTIONS[name](ctx)
+        if job.get("extract"):
+            script, args = EXTRACT_SCRIPTS[job["extract"]]
+            data["extract"] = tab.execute_script(script, *args)
+        cookies = {c["name"]: c["value"] for c in tab.get_cookies()}
+        ctx.drain()
+        data["resources"] = summarize_traffic(ctx.events)
+        return {"url": current_url, "body": body, "data": data, "cookies": cookies}
+
+    def _wait_new_document(self, tab, url):
+        deadline = time.monotonic() + self.readiness.timeout
+        while time.monotonic() < deadline:
+            try:
+                if tab.execute_script(NEW_DOCUMENT_SCRIPT):
+                    return
+            except Exception as e:
+                # 新文档提交的瞬间脚本可能失败，下一轮重试
+                logger.debug("New document probe failed for %s: %s", url, e)
+            time.sleep(self.readiness.poll_interval)
+        logger.warning("Navigation to %s not committed after %.1fs", url, self.readiness.timeout)
+
+    def _take_tab(self):
+        deadline = time.monotonic() + self.pool.checkout_timeout
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise PoolExhausted("browser pool is closed")
+                for lane in self._lanes:
+                    if lane.free and not lane.retiring:
+                        lane.busy += 1
+                        return lane, lane.free.pop()
+                if len(self._lanes) + self._opening < self.pool.size:
+                    self._opening += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolExhausted(f"no browser tab available after {self.pool.checkout_timeout}s")
+                self._cond.wait(remaining)
+
+        try:
+            lane = self._open_lane()
+        except Exception:
+            with self._cond:
+                self._opening -= 1
+                self._cond.notify_all()
+            raise
+        with self._cond:
+            self._opening -= 1
+            self._lanes.append(lane)
+            lane.busy += 1
+            handle = lane.free.pop()
+            self._cond.notify_all()
+        return lane, handle
+
+    def _open_lane(self):
+        browser = self.pool.acquire()
+        try:
+            driver = browser.driver
+            handles = [driver.current_window_handle]
+            for _ in range(self.tabs - 1):
+                driver.switch_to.new_window("tab")
+                if self.resource_policy is not None:
+                    self.resource_policy.apply(driver)
+                handles.append(driver.current_window_handle)
+        except Exception:
+            browser.broken = True
+            self.pool.release(browser, pages=0)
+            raise
+        logger.info("Opened %d tabs in browser %s", len(handles), browser.pids)
+        return TabLane(browser, handles)
+
+    def _give_tab(self, lane, handle):
+        with self._cond:
+            lane.busy -= 1
+            lane.pages += 1
+            lane.free.append(handle)
+            # 车道长期签出：刷新签出时间，避免被巡检线程当作挂死
+            lane.browser.checked_out_at = time.monotonic()
+            if self.pool.max_pages and lane.pages >= self.pool.max_pages:
+                lane.retiring = True
+            retire = lane.retiring and lane.busy == 0 and lane in self._lanes
+            if retire:
+                self._lanes.remove(lane)
+            self._cond.notify_all()
+        if retire:
+            self.pool.release(lane.browser, pages=lane.pages)
@@ -0,0 +1,85 @@
+import hashlib
+import json
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# 参与签名的列表页卡片字段：任何一个变化都说明详情页需要重新抓取
+SIGNATURE_FIELDS = ("price_text", "bedrooms", "bathrooms", "car_spaces", "photos")
+
+
+def card_signature(card):
+    """由列表页卡片字段计算变化签名（16 位十六进制）。"""
+    raw = "|".join("" if card.get(field) is None else str(card[field]).strip() for field in SIGNATURE_FIELDS)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+class ListingSignatures:
+    """
+    Redis 中每个房源的列表页签名与最近一次出现时间，用于增量抓取：
+
+    - ``<spider>:listing:signature``：hash，external_id -> 最近一次成功入库时的签名；
+    - ``<spider>:listing:last_seen``：hash，external_id -> 最近一次在列表页出现的时间戳。
+
+    签名只在 item 成功写入后更新（见 ``SignaturePipeline``），渲染或入库失败的房源下次仍会被抓取。
+    """
+
+    def __init__(self, server, spider_name):
+        self.server = server
+        self.signature_key = f"{spider_name}:listing:signature"
+        self.last_seen_key = f"{spider_name}:listing:last_seen"
+
+    def diff(self, signatures):
+        """
+        signatures 为 {external_id: 签名}，返回 (新出现的 external_id, 签名变化的 external_id)，
+        并在同一次往返中记录全部房源的 last_seen。
+        """
+        if not signatures:
+            return [], []
+        ids = list(signatures)
+        pipe = self.server.pipeline(transaction=False)
+        pipe.hmget(self.signature_key, ids)
+        pipe.hset(self.last_seen_key, mapping={external_id: int(time.time()) for external_id in ids})
+        stored = pipe.execute()[0]
+        new, changed = [], []
+        for external_id, old in zip(ids, stored):
+            if old is None:
+                new.append(external_id)
+            elif (old.decode("utf-8") if isinstance(old, bytes) else old) != signatures[external_id]:
+                changed.append(external_id)
+        return new, changed
+
+    def store(self, external_id, signature):
+        self.server.hset(self.signature_key, external_id, signature)
+
+    def forget(self, external_id):
+        """删除签名，强制下次重新抓取该房源。"""
+        self.server.hdel(self.signature_key, external_id)
+
+
+class ListingCheckpoints:
+    """
+    列表页分页抓取的检查点：Redis hash ``<spider>:listing:checkpoints``，
+    搜索 URL -> {"page": 已完成的页码, "newest_id": 见过的最大 external_id, "done": 是否翻到最后一页}。
+
+    中断后重新推入同一搜索 URL 时从下一页继续；上一轮已完成的搜索从第一页重新开始。
+    """
+
+    def __init__(self, server, spider_name):
+        self.server = server
+        self.key = f"{spider_name}:listing:checkpoints"
+
+    def get(self, search_url):
+        raw = self.server.hget(self.key, search_url)
+        if raw is None:
+            return None
+        try:
+            return json.loads(raw)
+        except ValueError:
+            return None
+
+    def save(self, search_url, page, newest_id=None, done=False):
+        checkpoint = {"page": page, "newest_id": newest_id, "done": done, "updated": int(time.time())}
+        self.server.hset(self.key, search_url, json.dumps(checkpoint))
+        return checkpoint
@@ -1,51 +1,158 @@
 import redis
 import json
 import logging
+import time
+
+from w3lib.url import canonicalize_url
+
+from realestate_scrapy.utils.common import extract_external_id
 
 logger = logging.getLogger(__name__)
 
+# Enqueue a batch in one round trip, skipping tasks whose dedupe key was
+# enqueued within the last ``ttl`` seconds (by any process).
+#
+# KEYS[1] queue, KEYS[2] dedupe zset (member: dedupe key, score: enqueue time)
+# ARGV[1] mode ("list" | "zset" | "list_nodedupe" | "zset_nodedupe"), ARGV[2] now, ARGV[3] ttl
+# ARGV[4..] repeated (dedupe key, payload, score) triples
+# Returns one flag per task: 1 if enqueued, 0 if it was a duplicate.
+PUSH_SCRIPT = """
+local mode, now, ttl = ARGV[1], tonumber(ARGV[2]), tonumber(ARGV[3])
+local dedupe = mode == "list" or mode == "zset"
+local as_zset = mode == "zset" or mode == "zset_nodedupe"
+if dedupe and ttl > 0 then
+  redis.call("ZREMRANGEBYSCORE", KEYS[2], "-inf", now - ttl)
+end
+local pushed = {}
+for i = 4, #ARGV, 3 do
+  local fresh = true
+  if dedupe then
+    fresh = redis.call("ZADD", KEYS[2], "NX", now, ARGV[i]) == 1
+  end
+  if fresh then
+    if as_zset then
+      redis.call("ZADD", KEYS[1], tonumber(ARGV[i + 2]), ARGV[i + 1])
+    else
+      redis.call("LPUSH", KEYS[1], ARGV[i + 1])
+    end
+  end
+  pushed[#pushed + 1] = fresh and 1 or 0
+end
+return pushed
+"""
+
+
+def dedupe_key(url):
+    """Listings dedupe by external id, anything else by canonical URL."""
+    external_id = extract_external_id(url)
+    return f"id:{external_id}" if external_id else f"url:{canonicalize_url(url)}"
+
+
 class RedisUrlQueue:
-    def __init__(self, spider_name, redis_url="redis://localhost:6379/2"):
+    def __init__(self, spider_name, redis_url="redis://localhost:6379/2", zset=False, dedupe=False,
+                 dedupe_ttl=86400):
         """
         Initialize Redis connection and queue.
 
         :param spider_name: The name of the spider (used as Redis queue key).
         :param redis_url: Redis connection URL.
+        :param zset: Back the queue with a sorted set scored by task priority
+            (priority lanes); the spider must run with ``REDIS_START_URLS_AS_ZSET = True``
+            and pops the highest score first.
+        :param dedupe: Skip tasks whose listing (external id) or canonical URL was
+            enqueued by any process within ``dedupe_ttl`` seconds.
+        :param dedupe_ttl: Dedupe window in seconds (0: forever).
         """
         self.redis_client = redis.Redis.from_url(redis_url, decode_responses=True)
         self.queue_key = f"{spider_name}spider:start_urls"  # Default scrapy_redis queue
+        self.dedupe_set_key = f"{spider_name}spider:enqueued"
+        self.zset = zset
+        self.dedupe = dedupe
+        self.dedupe_ttl = dedupe_ttl
+        self._push_script = self.redis_client.register_script(PUSH_SCRIPT)
 
-    def push(self, url, meta=None):
+    def push(self, url, meta=None, priority=None):
         """
         Push a new URL into the Redis queue as a JSON object.
 
         :param url: The URL to be added.
         :param meta: Additional metadata (default: None).
-        :param url_cookie_key: Unique cookie/session key (default: None).
+        :param priority: Score in a sorted-set queue (default: 0).
+        :return: True if the task was enqueued, False if it was a duplicate.
+        """
+        pushed = self.push_many([{"url": url, "meta": meta, "priority": priority}])
+        logger.debug(f"✅ Task added to queue: {url}" if pushed else f"Duplicate task skipped: {url}")
+        return bool(pushed)
+
+    def push_many(self, tasks, batch_size=1000):
+        """
+        Push many tasks, one server-side script call (one round trip) per batch.
+        Deduplication happens inside the script, so concurrent seeders cannot
+        enqueue the same listing twice.
+
+        :param tasks: Iterable of ``{"url": ..., "meta": {...}, "priority": ...}`` dictionaries.
+        :param batch_size: Number of tasks sent per round trip.
+        :return: The number of tasks actually enqueued.
+        """
+        pushed = sum(self.push_each(tasks, batch_size))
+        logger.debug(f"✅ {pushed} tasks added to queue {self.queue_key}")
+        return pushed
+
+    def push_each(self, tasks, batch_size=1000):
+        """
+        Like ``push_many``, but report the outcome of every task.
+
+        :return: A list of booleans in task order, True if the task was
+            enqueued, False if the dedupe window rejected it.
         """
-        task = {
-            "url": url,
-            "meta": meta if meta else {},  # Ensure meta is always a dictionary
-        }
+        queued = []
+        batch = []
+        for task in tasks:
+            batch.append(task)
+            if len(batch) >= batch_size:
+                queued += self._push_batch(batch)
+                batch = []
+        if batch:
+            queued += self._push_batch(batch)
+        return queued
 
-        json_task = json.dumps(task)  # Convert task to JSON
-        self.redis_client.lpush(self.queue_key, json_task)  # Push to Redis queue
-        logger.info(f"✅ Task added to queue: {json_task}")
+    def _push_batch(self, batch):
+        mode = ("zset" if self.zset else "list") + ("" if self.dedupe else "_nodedupe")
+        args = [mode, int(time.time()), self.dedupe_ttl]
+        for task in batch:
+            payload = json.dumps({"url": task["url"], "meta": task.get("meta") or {}})
+            args.extend((dedupe_key(task["url"]) if self.dedupe else "", payload, task.get("priority") or 0))
+        return [flag == 1 for flag in self._push_script(keys=[self.queue_key, self.dedupe_set_key], args=args)]
 
     def pop(self):
         """
-        Pop a URL task from the queue (FIFO).
+        Pop a URL task from the queue (FIFO, or highest priority first for a sorted set).
+
+        :return: A dictionary with `url` and `meta`, or None if empty.
+        """
+        tasks = self.pop_many(1)
+        if tasks:
+            logger.debug(f"🚀 Task popped from queue: {tasks[0]['url']}")
+            return tasks[0]
+        logger.warning("⚠️ Queue is empty")
+        return None
+
+    def pop_many(self, count):
+        """
+        Pop up to ``count`` tasks in one round trip: ZPOPMAX for a sorted set,
+        otherwise LRANGE + LTRIM in a MULTI transaction.
 
-        :return: A dictionary with `url`, `meta`, and `url_cookie_key`, or None if empty.
+        :return: A list of task dictionaries, oldest (or highest priority) first.
         """
-        task_json = self.redis_client.rpop(self.queue_key)  # Fetch from Redis
-        if task_json:
-            task = json.loads(task_json)  # Convert JSON back to dictionary
-            logger.info(f"🚀 Task popped from queue: {task}")
-            return task
+        if self.zset:
+            payloads = [member for member, _ in self.redis_client.zpopmax(self.queue_key, count)]
         else:
-            logger.warning("⚠️ Queue is empty")
-            return None
+            pipe = self.redis_client.pipeline(transaction=True)
+            pipe.lrange(self.queue_key, -count, -1)
+            pipe.ltrim(self.queue_key, 0, -count - 1)
+            payloads, _ = pipe.execute()
+            payloads.reverse()
+        return [json.loads(payload) for payload in payloads]
 
     def size(self):
         """
@@ -53,13 +160,13 @@ class RedisUrlQueue:
 
         :return: The number of tasks in the queue.
         """
-        count = self.redis_client.llen(self.queue_key)
+        count = self.redis_client.zcard(self.queue_key) if self.zset else self.redis_client.llen(self.queue_key)
         logger.info(f"📊 Queue size: {count}")
         return count
 
     def clear(self):
         """
-        Clear all tasks from the queue.
+        Clear all tasks from the queue, and the dedupe window with them.
         """
-        self.redis_client.delete(self.queue_key)
-        logger.info(f"🗑️ Task queue {self.queue_key} has been cleared!")
\ No newline at end of file
+        self.redis_client.delete(self.queue_key, self.dedupe_set_key)
+        logger.info(f"🗑️ Task queue {self.queue_key} has been cleared!")
@@ -0,0 +1,68 @@
+import re
+import time
+
+from scrapy.commands import ScrapyCommand
+from scrapy.exceptions import UsageError
+
+
+class Command(ScrapyCommand):
+    """
+    管理 Redis 去重数据（DUPEFILTER_CLASS = "scrapy_redis.dupefilter.BitmapDupeFilter"）：
+
+        scrapy dupefilter bootstrap     从 MySQL home_listings 流式读取 external_id，预先写入位图
+        scrapy dupefilter stats         位图与指纹集合的数量与内存占用
+    """
+
+    requires_project = True
+
+    def syntax(self):
+        return "bootstrap|stats [options]"
+
+    def short_desc(self):
+        return "Bootstrap the listing-id dupefilter bitmap from MySQL or show its size"
+
+    def add_options(self, parser):
+        super().add_options(parser)
+        parser.add_argument("--spider", default="homely", help="spider whose dupefilter is used")
+        parser.add_argument("--batch-size", type=int, default=10000, help="rows fetched and bits set per round trip")
+
+    def run(self, args, opts):
+        from scrapy_redis import defaults
+        from scrapy_redis.connection import get_redis_from_settings
+        from scrapy_redis.dupefilter import BitmapDupeFilter
+
+        key = self.settings.get("SCHEDULER_DUPEFILTER_KEY", defaults.SCHEDULER_DUPEFILTER_KEY) % {"spider": opts.spider}
+        df = BitmapDupeFilter(get_redis_from_settings(self.settings), key,
+                              id_pattern=self.settings.get("DUPEFILTER_ID_PATTERN", defaults.DUPEFILTER_ID_PATTERN),
+                              max_id=self.settings.getint("DUPEFILTER_MAX_ID", defaults.DUPEFILTER_MAX_ID))
+        action = args[0] if args else "stats"
+        if action == "bootstrap":
+            started = time.monotonic()
+            marked, new = df.mark_ids(self.iter_external_ids(opts.batch_size), batch_size=opts.batch_size)
+            print(f"marked {marked} listing ids in {df.bits_key} ({new} new) in {time.monotonic() - started:.1f}s")
+        elif action == "stats":
+            server = df.server
+            print(f"{df.bits_key}: {server.bitcount(df.bits_key)} ids, "
+                  f"{(server.memory_usage(df.bits_key) or 0) / 1024 / 1024:.1f} MB")
+            print(f"{df.key}: {server.scard(df.key)} fingerprints, "
+                  f"{(server.memory_usage(df.key) or 0) / 1024 / 1024:.1f} MB")
+        else:
+            raise UsageError(f"unknown action: {action}")
+
+    def iter_external_ids(self, batch_size):
+        """
+        服务端游标（stream_results）逐批读取 external_id，不把整张表载入内存；非数字 id 跳过，
+        超出 DUPEFILTER_MAX_ID 的 id 由 mark_ids 跳过（这些房源仍按指纹去重）。
+        """
+        from sqlalchemy import select
+
+        from realestate_scrapy.db import engine
+        from realestate_scrapy.db.models import HomeListing
+
+        with engine.connect() as conn:
+            result = conn.execution_options(stream_results=True, max_row_buffer=batch_size) \
+                .execute(select(HomeListing.external_id))
+            for rows in result.partitions(batch_size):
+                for (external_id,) in rows:
+                    if external_id and re.fullmatch(r"\d+", external_id):
+                        yield int(external_id)
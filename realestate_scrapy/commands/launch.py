@@ -0,0 +1,234 @@
+import glob
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import time
+from multiprocessing.connection import wait
+
+from scrapy.commands import ScrapyCommand
+from scrapy.exceptions import UsageError
+from scrapy.settings import SETTINGS_PRIORITIES
+from scrapy.utils.misc import load_object
+
+logger = logging.getLogger('launch')
+
+# 各 worker 统计中按最大值合并的键（其余数值键求和）
+MAX_STAT_SUFFIXES = ("max_ms",)
+
+
+def aggregate_stats(all_stats):
+    """合并各 worker 的统计：数值求和（*max_ms 取最大值），其余取第一个 worker 的值。"""
+    merged = {}
+    for stats in all_stats:
+        for key, value in stats.items():
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                merged.setdefault(key, value)
+            elif key.endswith(MAX_STAT_SUFFIXES):
+                merged[key] = max(merged.get(key, value), value)
+            else:
+                merged[key] = merged.get(key, 0) + value
+    return merged
+
+
+def write_json(path, data):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, default=str, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def run_worker(spider_name, overrides, slot, browsers, stats_path, stats_interval):
+    """
+    子进程入口（spawn 出的全新解释器）：加载项目设置并叠加父进程的命令行设置，
+    用新的 CrawlerProcess 运行一个爬虫，定期把统计写入 stats_path。
+    所有 worker 消费同一个 Redis 起始 URL 队列（scrapy_redis 调度器与 RedisSpider 天然共享）。
+    """
+    from scrapy import signals
+    from scrapy.crawler import CrawlerProcess
+    from scrapy.utils.project import get_project_settings
+
+    settings = get_project_settings()
+    settings.setdict(overrides, priority="cmdline")
+    # 每个 worker 独占 browsers 个浏览器槽位
+    settings.set("BROWSER_POOL_SIZE", browsers, priority="cmdline")
+    settings.set("LAUNCH_WORKER_SLOT", slot, priority="cmdline")
+    process = CrawlerProcess(settings, install_root_handler=True)
+    crawler = process.create_crawler(spider_name)
+    loops = []
+
+    def dump():
+        write_json(stats_path, crawler.stats.get_stats())
+
+    def opened(spider):
+        from twisted.internet import task
+        loop = task.LoopingCall(dump)
+        loop.start(stats_interval, now=False)
+        loops.append(loop)
+
+    def closed(spider):
+        for loop in loops:
+            if loop.running:
+                loop.stop()
+        dump()
+
+    crawler.signals.connect(opened, signal=signals.spider_opened)
+    crawler.signals.connect(closed, signal=signals.spider_closed)
+    process.crawl(crawler)
+    process.start()
+
+
+class Command(ScrapyCommand):
+    """
+    单条命令在一台渲染节点上运行多个爬虫进程：
+
+        scrapy launch homely -w 4 --browsers-per-worker 2
+
+    父进程以 spawn 方式启动 N 个 worker，每个 worker 是全新的解释器，自行加载项目设置
+    （叠加父进程的 -s 等命令行设置）并创建自己的 CrawlerProcess 与 reactor，
+    拥有自己的浏览器槽位（BROWSER_POOL_SIZE = --browsers-per-worker），
+    共同消费 Redis 中的 homelyspider:start_urls。父进程负责监督：异常退出的 worker
+    按退避时间安排重启（不阻塞对其他 worker 的监督），并定期合并各 worker 的统计写入
+    <stats-dir>/aggregate.json。启动时清除 stats-dir 中上一次运行留下的统计文件。
+    """
+
+    requires_project = True
+    # 父进程不创建 CrawlerProcess（也就不安装 reactor），由每个 worker 自行创建
+    requires_crawler_process = False
+
+    def syntax(self):
+        return "[options] <spider>"
+
+    def short_desc(self):
+        return "Start and supervise several crawler processes sharing the Redis frontier"
+
+    def add_options(self, parser):
+        super().add_options(parser)
+        parser.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1, help="worker processes")
+        parser.add_argument("--browsers-per-worker", type=int, default=1, help="Chrome instances per worker")
+        parser.add_argument("--stats-dir", default="launch-stats", help="directory for worker and aggregate stats")
+        parser.add_argument("--stats-interval", type=float, default=30, help="seconds between stats dumps")
+        parser.add_argument("--max-restarts", type=int, default=10,
+                            help="give up on a slot after this many restarts within an hour")
+
+    def run(self, args, opts):
+        if len(args) != 1:
+            raise UsageError("exactly one spider name is required")
+        if opts.workers < 1:
+            raise UsageError("--workers must be >= 1")
+
+        # 在父进程中校验爬虫名，worker 按名字重新加载
+        spider_loader = load_object(self.settings["SPIDER_LOADER_CLASS"]).from_settings(self.settings.frozencopy())
+        spider_loader.load(args[0])
+        os.makedirs(opts.stats_dir, exist_ok=True)
+        self.clear_stats(opts.stats_dir)
+
+        self.opts = opts
+        self.spider_name = args[0]
+        # 只把命令行（-s、-L 等）设置传给 worker，其余由 worker 从项目设置加载
+        cmdline = SETTINGS_PRIORITIES["cmdline"]
+        self.overrides = {name: self.settings[name] for name in self.settings
+                          if self.settings.getpriority(name) == cmdline}
+        self.context = multiprocessing.get_context("spawn")
+        self.children = {}        # slot -> Process
+        self.pending = {}         # slot -> 计划重启的时间（monotonic）
+        self.restarts = {}        # slot -> [重启时间]
+        self.stopping = False
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGTERM, self.stop)
+
+        for slot in range(opts.workers):
+            self.spawn(slot)
+        self.supervise()
+
+    @staticmethod
+    def clear_stats(stats_dir):
+        """删除上一次运行留下的 worker / aggregate 统计，避免被合并进本次运行。"""
+        for path in glob.glob(os.path.join(stats_dir, "worker-*.json*")) + \
+                glob.glob(os.path.join(stats_dir, "aggregate.json*")):
+            os.remove(path)
+
+    def stats_path(self, slot):
+        return os.path.join(self.opts.stats_dir, f"worker-{slot}.json")
+
+    def spawn(self, slot):
+        process = self.context.Process(
+            target=run_worker, name=f"worker-{slot}",
+            args=(self.spider_name, self.overrides, slot, self.opts.browsers_per_worker,
+                  self.stats_path(slot), self.opts.stats_interval))
+        process.start()
+        self.children[slot] = process
+        logger.info("Started worker %d (pid %d)", slot, process.pid)
+
+    def supervise(self):
+        next_report = time.monotonic() + self.opts.stats_interval
+        while self.children or self.pending:
+            now = time.monotonic()
+            deadlines = [next_report] + list(self.pending.values())
+            timeout = max(0, min(deadlines) - now)
+            # 任一 worker 退出、到达重启时间或统计时间时醒来
+            wait([process.sentinel for process in self.children.values()], timeout)
+            for slot, process in list(self.children.items()):
+                if not process.is_alive():
+                    self.reap(slot, process)
+            now = time.monotonic()
+            for slot, deadline in list(self.pending.items()):
+                if now >= deadline and not self.stopping:
+                    del self.pending[slot]
+                    self.spawn(slot)
+            if now >= next_report:
+                self.report()
+                next_report = now + self.opts.stats_interval
+        self.report()
+
+    def reap(self, slot, process):
+        del self.children[slot]
+        process.join()
+        code = process.exitcode
+        process.close()
+        if self.stopping or code == 0:
+            # 正常退出（例如 MAX_IDLE_TIME 到期）不重启，只重启崩溃的 worker
+            logger.info("Worker %d stopped", slot)
+            return
+        now = time.monotonic()
+        recent = [t for t in self.restarts.get(slot, []) if now - t < 3600]
+        if len(recent) >= self.opts.max_restarts:
+            logger.error("Worker %d exited with %s, restarted %d times in the last hour; giving up",
+                         slot, code, len(recent))
+            return
+        backoff = min(2 ** len(recent), 60)
+        logger.warning("Worker %d exited with %s, restarting in %ds", slot, code, backoff)
+        self.restarts[slot] = recent + [now]
+        self.pending[slot] = now + backoff
+
+    def stop(self, signum, frame):
+        # 尚未到期的重启全部取消
+        self.pending.clear()
+        if self.stopping:
+            # 第二次信号：强制结束
+            for process in self.children.values():
+                process.kill()
+            return
+        self.stopping = True
+        logger.info("Stopping %d workers", len(self.children))
+        for process in self.children.values():
+            process.terminate()
+
+    def report(self):
+        all_stats = []
+        for slot in range(self.opts.workers):
+            try:
+                with open(self.stats_path(slot), encoding="utf-8") as f:
+                    all_stats.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        if not all_stats:
+            return
+        merged = aggregate_stats(all_stats)
+        merged["launch/workers"] = len(self.children)
+        merged["launch/restarts"] = sum(len(times) for times in self.restarts.values())
+        write_json(os.path.join(self.opts.stats_dir, "aggregate.json"), merged)
+        logger.info("%d workers: %s items, %s responses, %s renders", len(all_stats),
+                    merged.get("item_scraped_count", 0), merged.get("response_received_count", 0),
+                    merged.get("browser/render/count", 0))
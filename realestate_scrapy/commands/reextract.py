@@ -0,0 +1,148 @@
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from scrapy.commands import ScrapyCommand
+from scrapy.exceptions import UsageError
+
+logger = logging.getLogger('snapshots')
+
+# 可由页面重新抽取并回填的 HomeListing 列（图片、文档由 Pipeline 下载，不在此列）
+REEXTRACT_COLUMNS = (
+    "address", "title", "suburb", "state", "postcode", "price_text", "lower_price", "upper_price",
+    "property_type", "bedrooms", "bathrooms", "car_spaces", "land_area", "description",
+    "council_rates", "latitude", "longitude",
+)
+
+# 子进程中的抽取器，由 _init_worker 在每个进程中构造一次
+_worker = {}
+
+
+def _init_worker(settings):
+    from scrapy.settings import Settings
+
+    from realestate_scrapy.extractors import homely as homely_fields
+    from realestate_scrapy.extractors.engine import ExtractionEngine
+    from realestate_scrapy.snapshots import SnapshotStore
+
+    _worker["store"] = SnapshotStore.from_settings(Settings(settings))
+    _worker["engine"] = ExtractionEngine("homely", homely_fields.FIELDS)
+
+
+def _reextract(record):
+    """
+    在子进程中：解压归档页面，用与爬虫相同的抽取流程（FIELDS + 内嵌 JSON 补全）重新抽取，
+    返回 (external_id, 列值, 错误信息)。列值只包含页面上实际抽取到的列，
+    未抽取到的列不会用默认值（0、None）覆盖数据库中已有的数据。
+    """
+    from scrapy.http import HtmlResponse
+
+    from realestate_scrapy.extractors.homely import extract_listing
+    from realestate_scrapy.extractors.hybrid import is_bot_challenge
+
+    try:
+        response = HtmlResponse(record["url"], body=_worker["store"].load(record["sha256"]), encoding="utf-8")
+        if is_bot_challenge(response):
+            return record["external_id"], None, "bot challenge page"
+        item = extract_listing(response, _worker["engine"])
+    except Exception as e:
+        return record.get("external_id"), None, f"{type(e).__name__}: {e}"
+    if not item.get("address"):
+        return record["external_id"], None, "no address extracted"
+    values = {column: item[column] for column in REEXTRACT_COLUMNS if item.get(column) not in (None, "")}
+    return record["external_id"], values, None
+
+
+class Command(ScrapyCommand):
+    """
+    用当前的字段声明重新抽取归档页面，批量更新 HomeListing，无需重新渲染：
+
+        scrapy reextract --since 2025-03-01 --fields bedrooms,bathrooms --workers 8
+
+    每个房源按 --kind 的顺序选一条归档（默认优先渲染后的 DOM，没有时用 HTTP 原始页面），
+    只更新页面上实际抽取到的列。
+    """
+
+    requires_project = True
+
+    def syntax(self):
+        return "[options]"
+
+    def short_desc(self):
+        return "Re-run field extraction over archived page snapshots and update listings"
+
+    def add_options(self, parser):
+        super().add_options(parser)
+        parser.add_argument("--since", metavar="YYYY-MM-DD", help="only use snapshots archived on or after this date")
+        parser.add_argument("--fields", help="comma separated columns to update (default: all re-extractable)")
+        parser.add_argument("--kind", default="rendered,http",
+                            help="snapshot kinds to use, in order of preference (default: rendered,http)")
+        parser.add_argument("--workers", type=int, default=0, help="extraction processes (default: CPU count)")
+        parser.add_argument("--batch-size", type=int, default=500, help="rows per bulk update")
+        parser.add_argument("--dry-run", action="store_true", help="extract and report, do not write")
+
+    def run(self, args, opts):
+        columns = REEXTRACT_COLUMNS
+        if opts.fields:
+            columns = tuple(c.strip() for c in opts.fields.split(",") if c.strip())
+            unknown = set(columns) - set(REEXTRACT_COLUMNS)
+            if unknown:
+                raise UsageError(f"cannot re-extract: {', '.join(sorted(unknown))}")
+
+        from realestate_scrapy.snapshots import SnapshotStore
+
+        kinds = tuple(k.strip() for k in opts.kind.split(",") if k.strip())
+        if not kinds or set(kinds) - {"rendered", "http"}:
+            raise UsageError(f"unknown snapshot kind in {opts.kind!r} (use rendered, http)")
+        records = list(SnapshotStore.from_settings(self.settings).latest(opts.since, kinds).values())
+        print(f"{len(records)} listings with snapshots")
+        if not records:
+            return
+
+        started = time.monotonic()
+        updated = failed = empty = 0
+        batch = []
+        with ProcessPoolExecutor(max_workers=opts.workers or None, initializer=_init_worker,
+                                 initargs=(self.settings.copy_to_dict(),)) as pool:
+            for external_id, values, error in pool.map(_reextract, records, chunksize=32):
+                if values is None:
+                    failed += 1
+                    logger.warning("Re-extraction failed for %s: %s", external_id, error)
+                    continue
+                values = {c: values[c] for c in columns if c in values}
+                if not values:
+                    empty += 1
+                    continue
+                batch.append((external_id, values))
+                if len(batch) >= opts.batch_size:
+                    updated += self.update(batch, opts.dry_run)
+                    batch = []
+        if batch:
+            updated += self.update(batch, opts.dry_run)
+
+        elapsed = time.monotonic() - started
+        print(f"re-extracted {len(records) - failed} pages ({failed} failed, {empty} without the requested fields), "
+              f"{'would update' if opts.dry_run else 'updated'} {updated} listings in {elapsed:.1f}s")
+
+    def update(self, batch, dry_run=False):
+        """
+        按 external_id 找到 HomeListing 主键，一次 bulk_update_mappings 更新整批。
+        每行只包含抽取到的列，列集合不同的行由 SQLAlchemy 分组执行。
+        """
+        from sqlalchemy.orm import sessionmaker
+
+        from realestate_scrapy.db import engine
+        from realestate_scrapy.db.models import HomeListing
+
+        values = dict(batch)
+        session = sessionmaker(bind=engine)()
+        try:
+            rows = session.query(HomeListing.id, HomeListing.external_id) \
+                .filter(HomeListing.external_id.in_(list(values))).all()
+            mappings = [dict(values[external_id], id=listing_id) for listing_id, external_id in rows]
+            if mappings and not dry_run:
+                session.bulk_update_mappings(HomeListing, mappings)
+                session.commit()
+            return len(mappings)
+        finally:
+            session.close()
@@ -0,0 +1,52 @@
+import signal
+
+from scrapy.commands import ScrapyCommand
+from scrapy.utils.misc import load_object
+
+
+class Command(ScrapyCommand):
+    """
+    运行独立的渲染服务，供多个爬虫进程（RENDER_SERVICE_ENABLED = True）共享：
+
+        scrapy render_service --browsers 8
+        scrapy render_service --fake --latency 0.5     不启动 Chrome，用 FakeDriver 测试渲染链路
+    """
+
+    requires_project = True
+
+    def syntax(self):
+        return "[options]"
+
+    def short_desc(self):
+        return "Serve browser render jobs from the Redis render queue"
+
+    def add_options(self, parser):
+        super().add_options(parser)
+        parser.add_argument("--browsers", type=int, default=0,
+                            help="browser pool size and worker threads (default: BROWSER_POOL_SIZE)")
+        parser.add_argument("--queue", help="render job queue key (default: RENDER_SERVICE_QUEUE)")
+        parser.add_argument("--fake", action="store_true", help="use FakeDriver instead of Chrome")
+        parser.add_argument("--latency", type=float, default=0, help="simulated page load seconds with --fake")
+
+    def run(self, args, opts):
+        from realestate_scrapy.browser.renderer import create_renderer
+        from realestate_scrapy.browser.service import RenderService, ServiceStats
+
+        settings = self.settings
+        if opts.browsers:
+            settings.set("BROWSER_POOL_SIZE", opts.browsers, priority="cmdline")
+        if opts.queue:
+            settings.set("RENDER_SERVICE_QUEUE", opts.queue, priority="cmdline")
+        if opts.fake:
+            settings.set("BROWSER_DRIVER_FACTORY", "realestate_scrapy.browser.fake.create_fake_driver",
+                         priority="cmdline")
+            settings.set("FAKE_BROWSER_LATENCY", opts.latency, priority="cmdline")
+
+        factory = load_object(settings.get("BROWSER_DRIVER_FACTORY",
+                                           "realestate_scrapy.browser.driver.create_driver"))
+        stats = ServiceStats()
+        renderer = create_renderer(settings, factory=lambda: factory(settings), stats=stats)
+        service = RenderService.from_settings(settings, renderer, stats=stats)
+        signal.signal(signal.SIGINT, lambda signum, frame: service.stop())
+        signal.signal(signal.SIGTERM, lambda signum, frame: service.stop())
+        service.run()
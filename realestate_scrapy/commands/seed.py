@@ -0,0 +1,197 @@
+import csv
+import hashlib
+import json
+import re
+import sys
+import time
+from urllib.parse import urlparse
+
+from scrapy.commands import ScrapyCommand
+from scrapy.exceptions import UsageError
+from w3lib.url import canonicalize_url
+
+# 由 postcode/suburb 网格生成的搜索 URL
+DEFAULT_GRID_TEMPLATE = "https://www.homely.com.au/for-sale/{suburb}-{state}-{postcode}/real-estate"
+
+
+def iter_jsonl(stream):
+    """逐行读取任务：每行是 {"url": ..., "meta": {...}, "priority": ...} 或一个裸 URL，空行与 # 注释跳过。"""
+    for line in stream:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if line.startswith("{"):
+            try:
+                yield json.loads(line)
+            except ValueError:
+                yield {"invalid": line}
+        else:
+            yield {"url": line}
+
+
+def slugify(value):
+    return re.sub(r"[^a-z0-9]+", "-", value.strip().lower()).strip("-")
+
+
+def iter_grid(stream, template=DEFAULT_GRID_TEMPLATE):
+    """由 suburb,state,postcode 的 CSV（可带表头）生成搜索任务。"""
+    for row in csv.reader(stream):
+        if len(row) < 3 or row[0].strip().lower() == "suburb":
+            continue
+        suburb, state, postcode = (cell.strip() for cell in row[:3])
+        yield {
+            "url": template.format(suburb=slugify(suburb), state=slugify(state), postcode=postcode),
+            "meta": {"source": "grid"},
+        }
+
+
+def validate(task, allowed_domains):
+    """规范化并校验任务，不合法时返回 None。"""
+    url = task.get("url") if isinstance(task, dict) else None
+    if not isinstance(url, str):
+        return None
+    parsed = urlparse(url.strip())
+    host = parsed.hostname or ""
+    if parsed.scheme not in ("http", "https") or not any(
+            host == domain or host.endswith("." + domain) for domain in allowed_domains):
+        return None
+    meta = task.get("meta") or {}
+    if not isinstance(meta, dict):
+        return None
+    priority = task.get("priority")
+    if priority is not None and not isinstance(priority, (int, float)):
+        return None
+    return {"url": url.strip(), "meta": meta, "priority": priority}
+
+
+class Seeder:
+    """
+    把任务流推入起始 URL 队列：校验、按规范化 URL 去重、按批推送，可限速，并统计吞吐。
+    队列开启 dedupe 时，其他进程近期已推送过的房源在 Redis 端被跳过。
+
+    限速时每批最多 rate 条（约一秒的量），推送均匀而不是整批突发后长时间休眠。
+    本地去重只记住最近 2 × seen_limit 个 URL 的 8 字节摘要，内存有上限；
+    更早的重复由队列端去重过滤。
+    """
+
+    def __init__(self, queue, allowed_domains, batch_size=5000, rate=0, report=None, seen_limit=500000):
+        self.queue = queue
+        self.allowed_domains = allowed_domains
+        self.batch_size = min(batch_size, max(1, int(rate))) if rate else batch_size
+        self.rate = rate
+        self.report = report
+        self.seen_limit = seen_limit
+        self.counts = {"read": 0, "pushed": 0, "invalid": 0, "duplicate": 0}
+        # 两代集合：当前一代写满后成为上一代，再早的被丢弃
+        self._seen = set()
+        self._seen_previous = set()
+
+    def seen(self, url):
+        """规范化 URL 最近是否出现过，没有则记下。"""
+        key = hashlib.blake2b(canonicalize_url(url).encode("utf-8"), digest_size=8).digest()
+        if key in self._seen or key in self._seen_previous:
+            return True
+        if len(self._seen) >= self.seen_limit:
+            self._seen_previous, self._seen = self._seen, set()
+        self._seen.add(key)
+        return False
+
+    def run(self, tasks):
+        started = time.monotonic()
+        batch = []
+        for task in tasks:
+            self.counts["read"] += 1
+            task = validate(task, self.allowed_domains)
+            if task is None:
+                self.counts["invalid"] += 1
+                continue
+            if self.seen(task["url"]):
+                self.counts["duplicate"] += 1
+                continue
+            batch.append(task)
+            if len(batch) >= self.batch_size:
+                self._flush(batch, started)
+                batch = []
+        if batch:
+            self._flush(batch, started)
+        self.counts["seconds"] = time.monotonic() - started
+        return self.counts
+
+    def _flush(self, batch, started):
+        pushed = self.queue.push_many(batch, batch_size=len(batch))
+        # 队列端去重（其他进程已推送过的房源）同样计为重复
+        self.counts["duplicate"] += len(batch) - pushed
+        self.counts["pushed"] += pushed
+        elapsed = time.monotonic() - started
+        if self.rate:
+            # 限速：按目标速率计算已推送数量应耗费的时间，提前的部分休眠
+            ahead = self.counts["pushed"] / self.rate - elapsed
+            if ahead > 0:
+                time.sleep(ahead)
+                elapsed += ahead
+        if self.report:
+            self.report(self.counts["pushed"], elapsed)
+
+
+class Command(ScrapyCommand):
+    """
+    批量推送起始任务到 homelyspider:start_urls：
+
+        scrapy seed tasks.jsonl                      JSONL 文件（每行 {"url", "meta", "priority"} 或 URL）
+        cat tasks.jsonl | scrapy seed -              标准输入
+        scrapy seed --grid vic_suburbs.csv           suburb,state,postcode 网格生成的搜索页
+        scrapy seed tasks.jsonl --zset --rate 2000   按 priority 写入 ZSET，每秒最多 2000 条
+    """
+
+    requires_project = True
+
+    def syntax(self):
+        return "[FILE|- ...] [options]"
+
+    def short_desc(self):
+        return "Push start tasks from JSONL files, stdin or a suburb grid into the spider queue"
+
+    def add_options(self, parser):
+        super().add_options(parser)
+        parser.add_argument("--grid", action="append", default=[], metavar="CSV",
+                            help="generate search URLs from a suburb,state,postcode CSV")
+        parser.add_argument("--template", default=DEFAULT_GRID_TEMPLATE, help="search URL template for --grid")
+        parser.add_argument("--spider", default="homely", help="spider whose start queue is seeded")
+        parser.add_argument("--batch-size", type=int, default=5000, help="tasks per round trip")
+        parser.add_argument("--rate", type=float, default=0, help="max tasks per second (0: unlimited)")
+        parser.add_argument("--zset", action="store_true",
+                            help="add to a sorted set scored by priority (needs REDIS_START_URLS_AS_ZSET)")
+        parser.add_argument("--no-dedupe", action="store_true",
+                            help="push even if another seeder enqueued the listing recently")
+        parser.add_argument("--domain", action="append", default=[], help="allowed domain (default: homely.com.au)")
+
+    def run(self, args, opts):
+        if not args and not opts.grid:
+            raise UsageError("no task source given", print_help=True)
+
+        from realestate_scrapy.cache.url_queue import RedisUrlQueue
+
+        queue = RedisUrlQueue(opts.spider, self.settings.get("REDIS_URL"), zset=opts.zset,
+                              dedupe=not opts.no_dedupe and self.settings.getbool("URL_QUEUE_DEDUPE", True),
+                              dedupe_ttl=self.settings.getint("URL_QUEUE_DEDUPE_TTL", 86400))
+        seeder = Seeder(queue, opts.domain or ["homely.com.au"], batch_size=opts.batch_size,
+                        rate=opts.rate, report=self.report)
+        counts = seeder.run(self.tasks(args, opts))
+        seconds = counts["seconds"]
+        print(f"pushed {counts['pushed']} of {counts['read']} tasks to {queue.queue_key} "
+              f"({counts['duplicate']} duplicate, {counts['invalid']} invalid) in {seconds:.2f}s, "
+              f"{counts['pushed'] / seconds if seconds else 0:.0f} tasks/s")
+
+    def tasks(self, args, opts):
+        for path in args:
+            if path == "-":
+                yield from iter_jsonl(sys.stdin)
+                continue
+            with open(path, encoding="utf-8") as f:
+                yield from iter_jsonl(f)
+        for path in opts.grid:
+            with open(path, encoding="utf-8", newline="") as f:
+                yield from iter_grid(f, opts.template)
+
+    def report(self, pushed, elapsed):
+        print(f"  {pushed} pushed, {pushed / elapsed if elapsed else 0:.0f} tasks/s", file=sys.stderr)
@@ -0,0 +1,47 @@
+import os
+
+from scrapy.commands import ScrapyCommand
+from scrapy.exceptions import UsageError
+
+
+class Command(ScrapyCommand):
+    """
+    管理页面归档：
+
+        scrapy snapshots stats                  归档数量与压缩率
+        scrapy snapshots train [--samples N]    用已归档页面训练 zstd 字典
+    """
+
+    requires_project = True
+
+    def syntax(self):
+        return "stats|train [options]"
+
+    def short_desc(self):
+        return "Show page snapshot statistics or train the compression dictionary"
+
+    def add_options(self, parser):
+        super().add_options(parser)
+        parser.add_argument("--samples", type=int, default=2000, help="pages used to train the dictionary")
+        parser.add_argument("--dict-size", type=int, default=112640, help="dictionary size in bytes")
+
+    def run(self, args, opts):
+        from realestate_scrapy.snapshots import SnapshotStore
+
+        store = SnapshotStore.from_settings(self.settings)
+        action = args[0] if args else "stats"
+        if action == "train":
+            dict_id = store.train_dictionary(samples=opts.samples, dict_size=opts.dict_size)
+            print(f"trained dictionary {dict_id}, new snapshots will use it")
+        elif action == "stats":
+            records = sum(1 for _ in store.records())
+            listings = len(store.latest())
+            objects = stored = 0
+            for dirpath, _, filenames in os.walk(os.path.join(store.root, "objects")):
+                for name in filenames:
+                    objects += 1
+                    stored += os.path.getsize(os.path.join(dirpath, name))
+            print(f"{records} snapshots of {listings} listings, {objects} unique pages, "
+                  f"{stored / 1024 / 1024:.1f} MB on disk")
+        else:
+            raise UsageError(f"unknown action: {action}")
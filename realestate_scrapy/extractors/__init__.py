@@ -0,0 +1 @@
+"""房源字段抽取：从原始 HTTP 响应或渲染后的 DOM 中抽取 item 字段。"""
@@ -0,0 +1,203 @@
+import json
+import logging
+import re
+
+logger = logging.getLogger('extractors')
+
+# window.__INITIAL_STATE__ = {...}; / window.__APOLLO_STATE__ = {...}; 这类内联状态的赋值起点，
+# 对象本身从 "=" 之后用 JSON 解码器读取（raw_decode 在对象结束处停止，不受后续脚本影响）
+WINDOW_STATE_RE = re.compile(r'window\.(__[A-Z_]+__)\s*=\s*(?=\{)')
+_decoder = json.JSONDecoder()
+
+# schema.org 中表示房产的类型
+LISTING_LD_TYPES = {
+    "Residence", "House", "SingleFamilyResidence", "Apartment", "Accommodation",
+    "Place", "Product", "RealEstateListing", "Offer",
+}
+
+
+def extract_embedded_state(sel):
+    """
+    从页面中收集所有内嵌的 JSON 数据：
+      1. <script type="application/ld+json"> 结构化数据；
+      2. Next.js 的 <script id="__NEXT_DATA__">；
+      3. window.__XXX_STATE__ = {...} 形式的内联状态。
+
+    返回 (json_ld 列表, state 列表)，解析失败的片段会被忽略。
+    """
+    json_ld = []
+    for text in sel.xpath('//script[@type="application/ld+json"]/text()').getall():
+        data = _loads(text)
+        if isinstance(data, list):
+            json_ld.extend(data)
+        elif isinstance(data, dict):
+            # @graph 中可能包含多个实体
+            json_ld.extend(data.get("@graph", [data]))
+
+    states = []
+    next_data = sel.xpath('//script[@id="__NEXT_DATA__"]/text()').get()
+    if next_data:
+        data = _loads(next_data)
+        if data is not None:
+            states.append(data)
+    for text in sel.xpath('//script[not(@src) and contains(text(), "window.__")]/text()').getall():
+        states.extend(_window_states(text))
+    return json_ld, states
+
+
+def _window_states(text):
+    for match in WINDOW_STATE_RE.finditer(text):
+        try:
+            data, _ = _decoder.raw_decode(text, match.end())
+        except ValueError:
+            continue
+        yield data
+
+
+def _loads(text):
+    try:
+        return json.loads(text)
+    except (TypeError, ValueError):
+        return None
+
+
+def _ld_types(obj):
+    t = obj.get("@type")
+    return set(t) if isinstance(t, list) else {t}
+
+
+def listing_from_json_ld(json_ld):
+    """
+    将 schema.org 结构化数据映射为 item 字段（只返回能取到的字段）。
+    """
+    fields = {}
+    for obj in json_ld:
+        if not isinstance(obj, dict) or not (_ld_types(obj) & LISTING_LD_TYPES):
+            continue
+        # Offer/Product 可能把房产放在 itemOffered 中
+        place = obj.get("itemOffered") if isinstance(obj.get("itemOffered"), dict) else obj
+
+        address = place.get("address")
+        if isinstance(address, dict):
+            street = address.get("streetAddress")
+            locality = " ".join(filter(None, [address.get("addressLocality"),
+                                              address.get("addressRegion"),
+                                              address.get("postalCode")]))
+            if street and locality:
+                fields.setdefault("address", f"{street.strip()} {locality}")
+            if locality:
+                fields.setdefault("suburb", locality)
+            if address.get("postalCode"):
+                fields.setdefault("postcode", str(address["postalCode"]))
+        elif isinstance(address, str):
+            fields.setdefault("address", address.strip())
+
+        geo = place.get("geo")
+        if isinstance(geo, dict) and geo.get("latitude") and geo.get("longitude"):
+            fields.setdefault("latitude", str(geo["latitude"]))
+            fields.setdefault("longitude", str(geo["longitude"]))
+
+        for key, field in (("numberOfBedrooms", "bedrooms"),
+                           ("numberOfBathroomsTotal", "bathrooms")):
+            value = _to_int(place.get(key))
+            if value is not None:
+                fields.setdefault(field, value)
+
+        floor_size = place.get("floorSize")
+        if isinstance(floor_size, dict):
+            value = _to_int(floor_size.get("value"))
+            if value is not None:
+                fields.setdefault("land_area", value)
+
+        if place.get("description"):
+            fields.setdefault("description", place["description"].strip())
+
+        images = place.get("image") or obj.get("image")
+        if isinstance(images, str):
+            images = [images]
+        if isinstance(images, list):
+            urls = [i if isinstance(i, str) else i.get("url") for i in images if i]
+            urls = [u for u in urls if u]
+            if urls:
+                fields.setdefault("origin_images", urls)
+
+        offers = obj.get("offers") if "offers" in obj else (obj if "Offer" in _ld_types(obj) else None)
+        if isinstance(offers, dict) and offers.get("price"):
+            # 统一成页面上的 "$1,460,000" 形式，便于复用 parse_price
+            price = _to_int(offers["price"])
+            fields.setdefault("price_text", f"${price:,}" if price is not None else str(offers["price"]))
+    return fields
+
+
+# 内联状态中常见的房源字段名 -> item 字段
+STATE_KEYS = {
+    "bedrooms": "bedrooms",
+    "bathrooms": "bathrooms",
+    "carSpaces": "car_spaces",
+    "parkingSpaces": "car_spaces",
+    "priceText": "price_text",
+    "displayPrice": "price_text",
+    "description": "description",
+    "latitude": "latitude",
+    "longitude": "longitude",
+}
+
+
+def listing_from_state(states, external_id):
+    """
+    在内联状态中查找 id/listingId 等于 external_id 的对象，并映射为 item 字段。
+    """
+    if not external_id:
+        return {}
+    node = None
+    for state in states:
+        node = _find_by_id(state, str(external_id))
+        if node is not None:
+            break
+    if node is None:
+        return {}
+
+    fields = {}
+    for key, field in STATE_KEYS.items():
+        value = node.get(key)
+        if value in (None, ""):
+            continue
+        if field in ("bedrooms", "bathrooms", "car_spaces"):
+            value = _to_int(value)
+            if value is None:
+                continue
+        fields.setdefault(field, value)
+    location = node.get("location") or node.get("geo")
+    if isinstance(location, dict):
+        for key in ("latitude", "longitude"):
+            if location.get(key) is not None:
+                fields.setdefault(key, str(location[key]))
+    return fields
+
+
+def _find_by_id(node, external_id, depth=0):
+    # 内联状态可能很深，限制递归深度避免病态数据
+    if depth > 12:
+        return None
+    if isinstance(node, dict):
+        for key in ("id", "listingId", "propertyId"):
+            if str(node.get(key, "")) == external_id and len(node) > 3:
+                return node
+        children = node.values()
+    elif isinstance(node, list):
+        children = node
+    else:
+        return None
+    for child in children:
+        if isinstance(child, (dict, list)):
+            found = _find_by_id(child, external_id, depth + 1)
+            if found is not None:
+                return found
+    return None
+
+
+def _to_int(value):
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,166 @@
+import logging
+import re
+import time
+
+from lxml import etree, html
+from lxml.cssselect import CSSSelector
+
+try:
+    from selectolax.parser import HTMLParser
+except ImportError:  # selectolax 为可选依赖，缺失时链接抽取退化为 lxml
+    HTMLParser = None
+
+logger = logging.getLogger('extractors')
+
+
+# ------------------------------------------------------------------ converters
+
+def text(value):
+    """去除首尾空白，空字符串返回 None。"""
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def to_int(value):
+    value = text(value)
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
+
+
+def first_int(value):
+    """取文本中的第一个整数，例如 "650 m²" -> 650。"""
+    match = re.search(r'\d+', value or '')
+    return int(match.group()) if match else None
+
+
+def tel(value):
+    """"tel:0400 000 000" -> "0400 000 000"。"""
+    value = text(value)
+    return text(value.replace("tel:", "")) if value else None
+
+
+# ------------------------------------------------------------------ fields
+
+class Field:
+    """
+    一个字段的声明：字段名、XPath（可给多个，按顺序取第一个有结果的）、转换函数与默认值。
+    """
+
+    def __init__(self, name, xpath, converter=text, default=None):
+        self.name = name
+        self.xpaths = [xpath] if isinstance(xpath, str) else list(xpath)
+        self.converter = converter
+        self.default = default
+        # 只在构造时编译一次，之后每个页面直接复用
+        self.compiled = [etree.XPath(x) for x in self.xpaths]
+
+    def extract(self, root, use_default=True):
+        for xpath in self.compiled:
+            value = _first(xpath(root))
+            if value is not None:
+                value = self.converter(value) if self.converter else value
+                if value is not None:
+                    return value
+        return self.default if use_default else None
+
+
+def _first(result):
+    """把 XPath 的结果（节点列表、字符串列表、字符串、数字）归一为第一个字符串。"""
+    if isinstance(result, list):
+        if not result:
+            return None
+        result = result[0]
+    if isinstance(result, etree._Element):
+        return result.text_content() if hasattr(result, "text_content") else "".join(result.itertext())
+    if isinstance(result, bool):
+        return None
+    if isinstance(result, float):
+        return None if result != result else str(result)  # NaN 表示无结果
+    return str(result) if result != "" else None
+
+
+class ExtractionEngine:
+    """
+    声明式字段抽取引擎：字段声明在构造时编译为 lxml XPath 对象，抽取时在同一棵已解析的树上执行。
+
+    ``extract(root)`` 返回 {字段名: 值}，并记录每个字段的抽取耗时；传入 stats 时写入
+    ``extract/<name>/<field>/us``（累计微秒）与 ``extract/<name>/pages``。
+    ``defaults=False`` 时未抽取到的字段为 None 而不是声明的默认值。
+    """
+
+    def __init__(self, name, fields, stats=None):
+        self.name = name
+        self.fields = list(fields)
+        self.stats = stats
+        self.timings = {field.name: 0 for field in self.fields}
+
+    def extract(self, root, defaults=True):
+        result = {}
+        for field in self.fields:
+            started = time.perf_counter_ns()
+            result[field.name] = field.extract(root, defaults)
+            elapsed_us = (time.perf_counter_ns() - started) // 1000
+            self.timings[field.name] += elapsed_us
+            if self.stats is not None:
+                self.stats.inc_value(f"extract/{self.name}/{field.name}/us", elapsed_us)
+        if self.stats is not None:
+            self.stats.inc_value(f"extract/{self.name}/pages")
+        return result
+
+
+def tree_of(page):
+    """
+    取得页面的 lxml 根节点：Scrapy Response / Selector 直接复用其已解析的树，
+    str / bytes 则用 lxml 解析。
+    """
+    selector = getattr(page, "selector", page)
+    root = getattr(selector, "root", None)
+    if root is not None:
+        return root
+    return parse_html(page)
+
+
+# ------------------------------------------------------------------ parser backends
+
+def parse_html(body):
+    return html.document_fromstring(body)
+
+
+class LxmlLinkBackend:
+    def __init__(self, css):
+        self.selector = CSSSelector(css)
+
+    def links(self, body, attr):
+        return [el.get(attr) for el in self.selector(parse_html(body)) if el.get(attr)]
+
+
+class SelectolaxLinkBackend:
+    """只需要链接的列表页使用 selectolax（lexbor），解析速度比 lxml 快数倍。"""
+
+    def __init__(self, css):
+        self.css = css
+
+    def links(self, body, attr):
+        nodes = HTMLParser(body).css(self.css)
+        return [node.attributes[attr] for node in nodes if node.attributes.get(attr)]
+
+
+LINK_BACKENDS = {
+    "lxml": LxmlLinkBackend,
+    "selectolax": SelectolaxLinkBackend,
+}
+
+
+def link_extractor(css, backend="lxml"):
+    """
+    构造一个只抽取链接的解析器，backend 可选 "lxml"（默认）或 "selectolax"。
+    selectolax 未安装时回退到 lxml。
+    """
+    if backend == "selectolax" and HTMLParser is None:
+        logger.warning("selectolax is not installed, falling back to lxml link extraction")
+        backend = "lxml"
+    return LINK_BACKENDS[backend](css)
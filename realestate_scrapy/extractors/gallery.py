@@ -0,0 +1,170 @@
+import re
+
+from lxml import etree
+
+GALLERY_XPATH = '//div[@aria-label="Vertical image gallery"]'
+
+# gallery 标题关键字 -> 分类，按顺序匹配第一个。照片最先判断："Photos & Video" 这样的
+# 组合标题下是照片；关键字不区分大小写，且须从词首开始（"Photos" 匹配 "Photo"）
+CATEGORIES = (
+    ("photo", ("Photo",)),
+    ("floor_plan", ("Floor plan", "Floorplan")),
+    ("video", ("Video",)),
+    ("tour", ("3D", "Virtual tour", "Tour")),
+)
+
+_CATEGORY_RES = [
+    (category, re.compile(r"\b(?:%s)" % "|".join(re.escape(k) for k in keywords), re.I))
+    for category, keywords in CATEGORIES
+]
+
+# 可能携带媒体地址的标签
+MEDIA_TAGS = {"img", "video", "source", "iframe"}
+
+SRCSET_ITEM_RE = re.compile(r'\s*(\S+?)(?:\s+(\d+(?:\.\d+)?)([wx]))?\s*(?:,|$)')
+
+
+def classify_heading(heading):
+    """根据 gallery 标题判断分类，无法识别时返回 "other"。"""
+    for category, keyword_re in _CATEGORY_RES:
+        if keyword_re.search(heading):
+            return category
+    return "other"
+
+
+def parse_srcset(srcset):
+    """
+    解析 srcset，返回 [(url, 尺寸)]，尺寸为宽度描述符（w）或像素密度（x）的数值。
+    "a.jpg 640w, b.jpg 1280w" -> [("a.jpg", 640.0), ("b.jpg", 1280.0)]
+    """
+    if not srcset:
+        return []
+    candidates = []
+    for url, size, _ in SRCSET_ITEM_RE.findall(srcset):
+        if url:
+            candidates.append((url, float(size) if size else 1.0))
+    return candidates
+
+
+def largest_source(src, srcset):
+    """从 srcset 中挑选最大的版本，没有 srcset 时返回 src。"""
+    candidates = parse_srcset(srcset)
+    if not candidates:
+        return src
+    return max(candidates, key=lambda c: c[1])[0]
+
+
+def media_entry(src, srcset=None):
+    return {"src": src, "srcset": srcset, "largest": largest_source(src, srcset)}
+
+
+def extract_gallery(root, gallery_xpath=GALLERY_XPATH):
+    """
+    单次遍历：一条 XPath 并集按文档顺序同时取出所有 h2 与 gallery 容器中的媒体元素，
+    顺序扫描时记录当前所在的 h2 标题，把图片、视频、3D 看房归入对应分类。
+    复杂度与文档大小线性相关（取代每张图片一次 ``preceding::h2`` 的二次复杂度）。
+
+    返回 {分类: [{"src", "srcset", "largest"}]}，分类见 CATEGORIES，另有 "other"。
+    """
+    result = {category: [] for category, _ in CATEGORIES}
+    result["other"] = []
+
+    heading = None
+    for el in _walk_xpath(gallery_xpath)(root):
+        if el.tag == "h2":
+            heading = " ".join("".join(el.itertext()).split())
+        elif heading:
+            src = el.get("src")
+            if src:
+                result[classify_heading(heading)].append(media_entry(src, el.get("srcset")))
+    return result
+
+
+_WALK_XPATHS = {}
+
+
+def _walk_xpath(gallery_xpath):
+    # XPath 并集的结果总是按文档顺序排列，整个遍历在 libxml2 中一次完成
+    if gallery_xpath not in _WALK_XPATHS:
+        media = " | ".join(f"{gallery_xpath}//{tag}" for tag in sorted(MEDIA_TAGS))
+        _WALK_XPATHS[gallery_xpath] = etree.XPath(f"//h2 | {media}")
+    return _WALK_XPATHS[gallery_xpath]
+
+
+def group_by_heading(gallery):
+    """
+    浏览器内抽取脚本返回 {标题: [{"src", "srcset"}]}，按同样的规则归类。
+    """
+    result = {category: [] for category, _ in CATEGORIES}
+    result["other"] = []
+    for heading, entries in gallery.items():
+        category = classify_heading(heading)
+        result[category].extend(media_entry(e["src"], e.get("srcset")) for e in entries)
+    return result
+
+
+# JSON 中媒体列表所在的键名（小写）-> 分类
+PAYLOAD_KEYS = {
+    "photos": "photo", "images": "photo", "media": "photo", "gallery": "photo",
+    "floorplans": "floor_plan", "floor_plans": "floor_plan",
+    "videos": "video", "video": "video",
+    "tours": "tour", "virtualtours": "tour", "virtual_tours": "tour", "3dtours": "tour",
+}
+
+# 媒体对象中可能携带地址的键，按优先顺序
+PAYLOAD_URL_KEYS = ("url", "src", "uri", "href", "fullSize", "original", "large")
+PAYLOAD_SRCSET_KEYS = ("srcset", "srcSet")
+
+
+def _payload_url(value):
+    if isinstance(value, str):
+        return value if value.startswith(("http://", "https://", "//")) else None
+    if isinstance(value, dict):
+        for key in PAYLOAD_URL_KEYS:
+            url = _payload_url(value.get(key))
+            if url:
+                return url
+    return None
+
+
+def gallery_from_payloads(payloads):
+    """
+    从 gallery 背后的 XHR/fetch JSON 中直接构造 gallery，不依赖 DOM。
+
+    递归查找键名为 photos/images/floorPlans/videos/tours 等的列表，按键名归类；
+    列表元素可以是 URL 字符串，或带 url/src 等字段（以及可选 srcset）的对象。
+    媒体对象中带有 "type"/"category" 字段时（例如 "floorplan"），以其为准重新归类。
+    同一 URL 只保留第一次出现。返回结构与 extract_gallery 相同。
+    """
+    result = {category: [] for category, _ in CATEGORIES}
+    result["other"] = []
+    seen = set()
+
+    def add(category, item):
+        url = _payload_url(item)
+        if not url or url in seen:
+            return
+        seen.add(url)
+        srcset = None
+        if isinstance(item, dict):
+            srcset = next((item[k] for k in PAYLOAD_SRCSET_KEYS if isinstance(item.get(k), str)), None)
+            kind = item.get("type") or item.get("category")
+            if isinstance(kind, str):
+                kind = PAYLOAD_KEYS.get(kind.lower().replace(" ", "") + "s", PAYLOAD_KEYS.get(kind.lower()))
+                category = kind or category
+        result[category].append(media_entry(url, srcset))
+
+    stack = list(reversed(payloads))
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            for key, value in reversed(list(node.items())):
+                category = PAYLOAD_KEYS.get(key.lower())
+                if category and isinstance(value, list):
+                    for item in value:
+                        add(category, item)
+                elif isinstance(value, (dict, list)):
+                    stack.append(value)
+        elif isinstance(node, list):
+            stack.extend(reversed(node))
+    return result
@@ -0,0 +1,374 @@
+# homely 详情页的字段声明与浏览器内抽取脚本。
+#
+# 脚本在页面中一次性运行，返回一个紧凑的 JSON 对象，包含 item 需要的全部字段：
+# 头部信息、描述、代理人、地图坐标、文档链接，以及按标题分组的 gallery 图片。
+# 相比传输整个 page_source 再在 Python 端用 lxml 解析，WebDriver 传输量与 CPU 都大幅减少。
+# XPath 与下面的 FIELDS 保持一致，Python 端只需要校验与类型转换。
+# 文件末尾的 make_item / extract_listing 把字段转换为 item，爬虫与 scrapy reextract 共用。
+
+import logging
+import re
+from datetime import datetime
+
+from realestate_scrapy.utils.common import extract_external_id
+
+from .embedded import extract_embedded_state, listing_from_json_ld, listing_from_state
+from .engine import Field, first_int, tel, to_int, tree_of
+from .hybrid import merge_fields
+
+logger = logging.getLogger('extractors')
+
+SUMMARY = '//header//section[@aria-label="Summary"]'
+DESCRIPTION = '//section[@aria-label="Property description"]'
+AGENT = '//section[@aria-label="Contact the real estate agent"]'
+
+# 详情页字段声明：字段 -> XPath（可多个，依次回退）-> 转换函数。
+# 卧室/浴室/车位/面积优先在 header 内查找，找不到时才回退到全文档。
+FIELDS = [
+    # 地址、城市、价格等基本信息
+    Field("address", '//header//h1/text()'),
+    Field("city", '//header//span[@class="inline"]/text()'),
+    Field("price_text", SUMMARY + '//h2/text()', converter=None),
+    Field("bedrooms", ['//header//li[span[@aria-label="Bed"]]/text()[normalize-space()]',
+                       '//li[span[@aria-label="Bed"]]/text()[normalize-space()]'], converter=to_int),
+    Field("bathrooms", ['//header//li[span[@aria-label="Bath"]]/text()[normalize-space()]',
+                        '//li[span[@aria-label="Bath"]]/text()[normalize-space()]'], converter=to_int),
+    Field("car_spaces", ['//header//li[span[@aria-label="Car"]]/text()[normalize-space()]',
+                         '//li[span[@aria-label="Car"]]/text()[normalize-space()]'], converter=to_int),
+    # 面积：先取 header 中的 Area，没有时取描述区 Land details 中 "Area:" 后的 span
+    Field("area", ['//header//li[span[@aria-label="Area"]]/text()[normalize-space()]',
+                   '//li[span[@aria-label="Area"]]/text()[normalize-space()]',
+                   DESCRIPTION + '//div[contains(text(), "Area:")]/span/text()'], converter=first_int),
+    # 先查找 Summary 下 <h3> 内文本包含 “for sale” 的第一个 <span>，再截取出 “Apartment” 或 “House”
+    Field("property_type", 'substring-before((' + SUMMARY + '//h3/span[contains(text(),"for sale")])[1]/text(), " for sale")',
+          default='House'),
+    Field("description", DESCRIPTION + '//p//text()', converter=None, default=''),
+    Field("council_rates", DESCRIPTION + '//div[h3[contains(text(),"Council rates")]]/span/text()', default=''),
+    Field("document", DESCRIPTION + '//h3[text()="Documents"]/following-sibling::div[1]//a/@href'),
+    # 地图背景图 style 中 "center=" 与第一个 & 之间的部分，例如 "-37.7334201,144.7981836"
+    Field("center", 'substring-before(substring-after(//section[@aria-label="Property map"]'
+                    '//div[contains(@style, "background-image")]/@style, "center="), "&")'),
+    # 代理人：姓名（h3）、所属机构（h4）、个人主页（带 aria-label 的 <a>）、电话（任意 href 以 tel: 开头的元素）
+    Field("agent_name", AGENT + '//article//h3/text()'),
+    Field("agent_agency", AGENT + '//article//h4/text()'),
+    Field("agent_profile_url", AGENT + '//article//a[@aria-label][1]/@href'),
+    Field("agent_phone", AGENT + '//*[@href][starts-with(@href, "tel:")]/@href', converter=tel),
+]
+
+# 列表页中每个房源卡片的链接
+LISTING_LINK_CSS = 'article[aria-label="Property Listing"] a'
+
+# 列表页房源卡片，以及卡片上用于计算变化签名的字段（XPath 相对于卡片）
+LISTING_CARD_XPATH = '//article[@aria-label="Property Listing"]'
+CARD_FIELDS = [
+    Field("link", './/a/@href'),
+    Field("price_text", '(.//text()[contains(., "$")])[1]'),
+    Field("bedrooms", './/li[span[@aria-label="Bed"]]/text()[normalize-space()]', converter=to_int),
+    Field("bathrooms", './/li[span[@aria-label="Bath"]]/text()[normalize-space()]', converter=to_int),
+    Field("car_spaces", './/li[span[@aria-label="Car"]]/text()[normalize-space()]', converter=to_int),
+    # 照片数：优先取轮播上的 "1/24" 计数，没有时数卡片内的图片
+    Field("photos", ['substring-after((.//text()[contains(., "/")]'
+                     '[translate(normalize-space(.), "0123456789/", "") = ""])[1], "/")',
+                     'count(.//img)'], converter=first_int),
+]
+
+EXTRACT_SCRIPT = r"""
+var gallerySelector = arguments[0];
+
+function node(expr, ctx) {
+  return document.evaluate(expr, ctx || document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+}
+function str(expr, ctx) {
+  var value = document.evaluate(expr, ctx || document, null, XPathResult.STRING_TYPE, null).stringValue;
+  value = value ? value.trim() : '';
+  return value || null;
+}
+// 依次尝试多个 XPath（与 FIELDS 的回退顺序相同），返回第一个非空值
+function first(exprs) {
+  for (var i = 0; i < exprs.length; i++) {
+    var value = str('(' + exprs[i] + ')[1]');
+    if (value) return value;
+  }
+  return null;
+}
+function feature(label) {
+  return first(['//header//li[span[@aria-label="' + label + '"]]/text()[normalize-space()]',
+                '//li[span[@aria-label="' + label + '"]]/text()[normalize-space()]']);
+}
+
+var header = node('//header');
+var desc = '//section[@aria-label="Property description"]';
+var agent = '//section[@aria-label="Contact the real estate agent"]//article';
+
+var result = {
+  address: header ? str('(.//h1/text())[1]', header) : null,
+  city: header ? str('(.//span[@class="inline"]/text())[1]', header) : null,
+  price_text: header ? str('(.//section[@aria-label="Summary"]//h2/text())[1]', header) : null,
+  bedrooms: feature('Bed'),
+  bathrooms: feature('Bath'),
+  car_spaces: feature('Car'),
+  area: feature('Area') || first([desc + '//div[contains(text(), "Area:")]/span/text()']),
+  property_type: str('substring-before((//section[@aria-label="Summary"]//h3/span[contains(text(),"for sale")])[1]/text(), " for sale")'),
+  description: str('(' + desc + '//p//text())[1]'),
+  council_rates: str('(' + desc + '//div[h3[contains(text(),"Council rates")]]/span/text())[1]'),
+  document: str('(' + desc + '//h3[text()="Documents"]/following-sibling::div[1]//a/@href)[1]'),
+  center: str('substring-before(substring-after((//section[@aria-label="Property map"]//div[contains(@style, "background-image")]/@style)[1], "center="), "&")'),
+  agent_name: str('(' + agent + '//h3/text())[1]'),
+  agent_agency: str('(' + agent + '//h4/text())[1]'),
+  agent_profile_url: str('(' + agent + '//a[@aria-label][1]/@href)[1]'),
+  agent_phone: str('(//section[@aria-label="Contact the real estate agent"]//*[@href][starts-with(@href, "tel:")]/@href)[1]'),
+  gallery: {}
+};
+
+// gallery：按文档顺序遍历一次，记录最近的 h2 标题，把图库中的图片、视频、3D 看房归入该标题
+var container = document.querySelector(gallerySelector);
+if (container) {
+  var MEDIA_TAGS = {IMG: true, VIDEO: true, SOURCE: true, IFRAME: true};
+  var heading = null;
+  var walker = document.createTreeWalker(document.body, NodeFilter.SHOW_ELEMENT);
+  var el;
+  while ((el = walker.nextNode())) {
+    if (el.tagName === 'H2') {
+      heading = el.textContent.replace(/\s+/g, ' ').trim();
+    } else if (MEDIA_TAGS[el.tagName] && heading && container.contains(el)) {
+      var src = el.getAttribute('src');
+      if (!src) { continue; }
+      (result.gallery[heading] = result.gallery[heading] || []).push({src: src, srcset: el.getAttribute('srcset')});
+    }
+  }
+}
+return result;
+"""
+
+
+# ------------------------------------------------------------------ item
+
+# make_item 对未抽取到的字段填入的默认值。defaults=False 时这些字段保留 None，
+# 以便区分"页面上没有"与"抽取到的值"（补全内嵌 JSON、scrapy reextract 回填时需要）
+ITEM_DEFAULTS = {
+    "lower_price": 0,
+    "upper_price": 0,
+    "latitude": 0,
+    "longitude": 0,
+    "land_area": 0,
+    "property_type": "House",
+    "description": "",
+    "council_rates": "",
+}
+
+
+def apply_defaults(item):
+    """把 item 中仍为 None 的字段设为 ITEM_DEFAULTS 中的默认值。"""
+    for key, value in ITEM_DEFAULTS.items():
+        if item.get(key) is None:
+            item[key] = value
+    return item
+
+
+def make_item(fields, url, name="homely", defaults=True):
+    """
+    将原始文本字段转换为 item，对应数据库模型中的各字段。
+    fields 可以来自 FIELDS 的抽取结果，也可以来自浏览器内抽取脚本。
+    """
+    def clean(key):
+        value = fields.get(key)
+        return value.strip() if isinstance(value, str) and value.strip() else None
+
+    def as_int(key):
+        if isinstance(fields.get(key), int):
+            return fields[key]
+        try:
+            return int(clean(key)) if clean(key) else None
+        except ValueError:
+            return None
+
+    address, city = clean("address"), clean("city")
+    full_address = f"{address} {city}" if address and city else None
+    price_text = fields.get("price_text")
+    lower_price, upper_price = parse_price(price_text)
+
+    area = fields.get("area")
+    if isinstance(area, int):
+        area_number = area
+    else:
+        area_number = re.findall(r'\d+', area) if area else []
+        area_number = int(area_number[0]) if area_number else None
+    logger.debug("Area: %s", area)
+
+    # 如果成功提取到了坐标字符串，拆分为纬度和经度
+    latitude = longitude = None
+    center_coordinates = clean("center")
+    if center_coordinates and "," in center_coordinates:
+        latitude, longitude = center_coordinates.split(",", 1)
+    else:
+        logger.debug("未能提取坐标信息: %s", url)
+
+    agent_phone = clean("agent_phone")
+    agent_phone = agent_phone.replace("tel:", "").strip() if agent_phone else None
+
+    item = {
+        "name": name,
+        "url": url,
+        "external_id": extract_external_id(url),
+        "address": full_address,
+        "title": full_address,
+        "suburb": city,
+        "state": city, # TODO:
+        "postcode": parse_postcode(city),
+        "price_text": price_text,
+        "lower_price": lower_price,
+        "upper_price": upper_price,
+        "bedrooms": as_int("bedrooms"),
+        "bathrooms": as_int("bathrooms"),
+        "car_spaces": as_int("car_spaces"),
+        "property_type": clean("property_type"),
+        "description": fields.get("description"),
+        "council_rates": clean("council_rates"),
+        "land_area": area_number,
+        "pdf_document": [],
+        "origin_pdf_document": [clean("document")],
+        "latitude": latitude,
+        "longitude": longitude,
+        # 后续将 gallery 中获取的图片 URL 列表填入此字段，Pipeline 负责下载及映射构造
+        "images": [],
+        "origin_images": [],
+        "floor_plan": [],
+        "origin_floor_plan": [],
+        "publish_date": datetime.utcnow(),
+
+        # agent
+        "agent_name": clean("agent_name"),
+        "agent_phone": agent_phone,
+        "agent_agency": clean("agent_agency"),
+        "agent_profile_url": clean("agent_profile_url"),
+    }
+    return apply_defaults(item) if defaults else item
+
+
+def extract_listing(page, engine, name="homely"):
+    """
+    爬虫的 HTTP 抽取与 ``scrapy reextract`` 共用的抽取流程：先用 FIELDS 在页面（Scrapy Response，
+    原始 HTML 或渲染后的 DOM）上抽取，再用内嵌 JSON-LD / 内联状态补全缺失字段。
+
+    返回未填默认值的 item（未抽取到的字段为 None），由调用方决定是否 ``apply_defaults``。
+    """
+    item = make_item(engine.extract(tree_of(page), defaults=False), page.url, name=name, defaults=False)
+    json_ld, states = extract_embedded_state(page)
+    merge_fields(item, listing_from_json_ld(json_ld))
+    merge_fields(item, listing_from_state(states, item["external_id"]))
+    if item.get("lower_price") is None:
+        # 价格文本可能来自内嵌 JSON
+        item["lower_price"], item["upper_price"] = parse_price(item.get("price_text"))
+    item["title"] = item["title"] or item["address"]
+    return item
+
+
+def parse_price(price_text):
+    """
+    解析价格字符串，返回 (price_low, price_high) 元组。
+
+    支持的价格样式包括：
+      1. 区间价格，使用“-”作为分隔符：
+         "$1,460,000 - $1,600,000"
+      2. 区间价格，使用 "to" 作为分隔符：
+         "$770,000 to $820,000"
+      3. 单一价格（只有一个数值）：
+         "$249,500"
+      4. 带有状态前缀（例如“For Sale - $1,799,000”）：
+         "For Sale - $1,799,000"
+      5. 带有状态前缀，但无连接符：
+         "For Sale $1,800,000"
+      6. 带有额外描述和区间的：
+         "Expressions of Interest | $3,900,000 - $4,290,000"
+
+    对于单一价格，将 lower 与 upper 都设为相同数值；对于区间价格，
+    将两个数字分别赋值给 price_low 和 price_high。
+
+    测试：
+        # 示例测试各个价格样式
+        examples = [
+            "$1,460,000 - $1,600,000",  # 区间价格，用 - 分隔
+            "$770,000 to $820,000",  # 区间价格，用 "to" 分隔
+            "$249,500",  # 单一价格
+            "For Sale - $1,799,000",  # 带状态前缀和 - 的单一价格
+            "For Sale $1,800,000",  # 带状态前缀（无连接符）的单一价格
+            "Expressions of Interest | $3,900,000 - $4,290,000"  # 带描述和区间价格
+        ]
+
+        for example in examples:
+            low, high = parse_price(example)
+            print(f"原始字符串: {example}\n解析结果: price_low={low}, price_high={high}\n")
+    """
+
+
+    if not price_text:
+        return None, None
+
+    # 去除首尾空格
+    price_text = price_text.strip()
+
+    # 如果有额外的描述信息，例如：
+    #   "For Sale - $1,799,000" 或 "Expressions of Interest | $3,900,000 - $4,290,000"
+    # 则去除描述，保留美元符号开始的部分
+    # 这里查找第一个 "$" 出现的位置，从该位置截取子串
+    dollar_index = price_text.find('$')
+    if dollar_index != -1:
+        price_text = price_text[dollar_index:]
+
+    # 注：此时 price_text 可能是以下格式之一：
+    #   "$1,460,000 - $1,600,000"
+    #   "$770,000 to $820,000"
+    #   "$249,500"
+    #   "$1,799,000"
+    #   "$1,800,000"
+    #   "$3,900,000 - $4,290,000"
+
+    # 优先尝试匹配价格区间，支持 "-" 或 "to" 作为分隔符
+    range_pattern = re.compile(r'\$?([\d,]+)\s*(?:-|to)\s*\$?([\d,]+)', re.IGNORECASE)
+    range_match = range_pattern.search(price_text)
+    if range_match:
+        try:
+            lower_price = int(range_match.group(1).replace(',', '').strip())
+            upper_price = int(range_match.group(2).replace(',', '').strip())
+            return lower_price, upper_price
+        except ValueError as e:
+            print("价格转换错误:", e)
+            return None, None
+
+    # 如果未匹配到区间格式，则尝试匹配单一价格格式
+    single_pattern = re.compile(r'\$([\d,]+)')
+    single_match = single_pattern.search(price_text)
+    if single_match:
+        try:
+            price = int(single_match.group(1).replace(',', '').strip())
+            # 单一价格，下限和上限均为相同数值
+            return price, price
+        except ValueError as e:
+            print("价格转换错误:", e)
+            return None, None
+
+    # 若上述均不匹配，则返回 (None, None)
+    return None, None
+
+def parse_postcode(address_text):
+    """
+    解析地址中的 postcode（邮政编码）。
+
+    支持格式包括：
+      1. 地址文本中可能包含城市、州以及邮政编码，例如 "Abbotsford VIC 3067"
+      2. 邮政编码通常为 4 位数字（如 3067）
+
+    参数:
+      address_text (str): 从网页中提取的地址详情，例如 "Abbotsford VIC 3067"
+
+    返回:
+      str 或 None: 如果能匹配到 4 位数字，则返回该邮政编码；否则返回 None。
+    """
+    if not address_text:
+        return None
+
+    # 使用正则表达式匹配 4 位数字，\b 用于确保匹配边界
+    match = re.search(r'\b\d{4}\b', address_text)
+    if match:
+        return match.group()
+    return None
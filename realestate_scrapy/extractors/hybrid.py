@@ -0,0 +1,36 @@
+# 混合抓取模式：优先从 Scrapy 已下载的 HTTP 响应中抽取，缺少必填字段或遇到反爬验证时才用浏览器渲染。
+
+# 判定为反爬验证页的特征（Cloudflare、PerimeterX、Incapsula 等）
+CHALLENGE_MARKERS = (
+    "cf-challenge", "cf_chl_", "challenge-platform", "Just a moment...",
+    "px-captcha", "_pxCaptcha", "Incapsula incident", "Access Denied",
+    "Please verify you are a human",
+)
+CHALLENGE_STATUS = (403, 429, 503)
+
+
+def is_bot_challenge(response):
+    """根据状态码与页面特征判断是否为反爬验证页。"""
+    if response.status in CHALLENGE_STATUS:
+        return True
+    # 验证页一般很小，只检查前 64KB 即可
+    head = response.text[:65536]
+    return any(marker in head for marker in CHALLENGE_MARKERS)
+
+
+def is_missing(value):
+    """None、空字符串、空列表视为缺失；0 是合法值（例如 studio 的卧室数）。"""
+    return value is None or value == "" or value == []
+
+
+def missing_fields(item, required):
+    """返回 item 中缺失（None、空字符串、空列表）的必填字段。"""
+    return [field for field in required if is_missing(item.get(field))]
+
+
+def merge_fields(item, fields):
+    """用内嵌 JSON 中的字段补全 item 中缺失的值，已有值优先。"""
+    for key, value in fields.items():
+        if is_missing(item.get(key)):
+            item[key] = value
+    return item
@@ -0,0 +1,38 @@
+import gzip
+import io
+
+from lxml import etree
+
+SITEMAP_NS = "{http://www.sitemaps.org/schemas/sitemap/0.9}"
+GZIP_MAGIC = b"\x1f\x8b"
+
+
+def open_sitemap(body):
+    """
+    返回可流式读取的文件对象；gzip 压缩的 sitemap（.xml.gz）边读边解压，不在内存中展开整个文件。
+    """
+    stream = io.BytesIO(body)
+    if body[:2] == GZIP_MAGIC:
+        return gzip.GzipFile(fileobj=stream)
+    return stream
+
+
+def iter_sitemap(body):
+    """
+    增量解析 sitemap 或 sitemap 索引，逐条产出 (kind, loc, lastmod)，kind 为 "url" 或 "sitemap"。
+
+    使用 iterparse 只在 </url>、</sitemap> 结束时取出字段，随后清空并删除已处理的兄弟节点，
+    解析过程中的内存占用与 sitemap 的条目数无关。
+    """
+    tags = (SITEMAP_NS + "url", SITEMAP_NS + "sitemap", "url", "sitemap")
+    context = etree.iterparse(open_sitemap(body), events=("end",), tag=tags,
+                              resolve_entities=False, no_network=True, huge_tree=True)
+    for _, el in context:
+        loc = el.findtext(SITEMAP_NS + "loc") or el.findtext("loc")
+        lastmod = el.findtext(SITEMAP_NS + "lastmod") or el.findtext("lastmod")
+        kind = "sitemap" if etree.QName(el).localname == "sitemap" else "url"
+        el.clear()
+        while el.getprevious() is not None:
+            del el.getparent()[0]
+        if loc:
+            yield kind, loc.strip(), lastmod.strip() if lastmod else None
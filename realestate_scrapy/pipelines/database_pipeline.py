@@ -128,6 +128,8 @@ class DBRealEstatePipeline:
             listing.agent_id = agent.id  # 确保房源记录关联到当前代理人
 
         self.session.commit()
+        # 供之后的 pipeline（SignaturePipeline）确认房源已写入数据库
+        item['db_persisted'] = True
         return item
 
     def close_spider(self, spider):
@@ -0,0 +1,24 @@
+import logging
+
+logger = logging.getLogger('homely')
+
+
+class SignaturePipeline:
+    """
+    item 成功写入数据库后，记录其列表页签名（item["listing_signature"]），
+    之后列表页上签名未变的房源不再重新渲染详情页。需要放在 DBRealEstatePipeline 之后：
+    只有它确认写入（item["db_persisted"]）的房源才记录签名，未入库的房源下次仍会被抓取。
+    """
+
+    def process_item(self, item, spider):
+        signature = item.pop("listing_signature", None)
+        persisted = item.pop("db_persisted", False)
+        signatures = getattr(spider, "listing_signatures", None)
+        if not persisted:
+            if signature:
+                spider.crawler.stats.inc_value("incremental/not_persisted")
+            return item
+        if signature and signatures is not None and item.get("external_id"):
+            signatures.store(item["external_id"], signature)
+            spider.crawler.stats.inc_value("incremental/stored")
+        return item
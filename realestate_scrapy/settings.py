@@ -11,6 +11,8 @@ BOT_NAME = "realestate_scrapy"
 
 SPIDER_MODULES = ["realestate_scrapy.spiders"]
 NEWSPIDER_MODULE = "realestate_scrapy.spiders"
+# 自定义命令：scrapy reextract、snapshots、seed、launch、render_service、dupefilter
+COMMANDS_MODULE = "realestate_scrapy.commands"
 
 
 # Crawl responsibly by identifying yourself (and your website) on the user-agent
@@ -54,9 +56,11 @@ LOG_LEVEL = "DEBUG"
 
 # Enable or disable downloader middlewares
 # See https://docs.scrapy.org/en/latest/topics/downloader-middleware.html
-#DOWNLOADER_MIDDLEWARES = {
+DOWNLOADER_MIDDLEWARES = {
 #    "realestate_scrapy.middlewares.RealestateScrapyDownloaderMiddleware": 543,
-#}
+    # meta["render"] 为 True 的请求由浏览器池渲染，返回渲染后的 DOM
+    "realestate_scrapy.browser.middleware.BrowserRenderMiddleware": 800,
+}
 
 # Enable or disable extensions
 # See https://docs.scrapy.org/en/latest/topics/extensions.html
@@ -73,6 +77,8 @@ ITEM_PIPELINES = {
     "realestate_scrapy.pipelines.images_pipeline.HlImagesPipeline": 12,
     "realestate_scrapy.pipelines.documents_pipeline.HlDocumentsPipeline": 13,
     "realestate_scrapy.pipelines.database_pipeline.DBRealEstatePipeline": 14,
+    # 入库后记录列表页签名，供增量抓取跳过未变化的房源
+    "realestate_scrapy.pipelines.signature_pipeline.SignaturePipeline": 15,
     # "realestate_scrapy.pipelines.RealestateScrapyPipeline": 300,
 }
 
@@ -110,17 +116,156 @@ IMAGES_STORE_GCS_ACL = "publicRead"
 
 SCHEDULER = "scrapy_redis.scheduler.Scheduler"
 # DUPEFILTER_CLASS = "scrapy_redis.dupefilter.RFPDupeFilter"
+# 指纹只保存 SHA1 摘要的前 N 个字节（二进制），代替 40 字符的十六进制串；0 保持旧格式。
+# 与已有的十六进制指纹不兼容，切换时应使用新的去重 key
+# DUPEFILTER_FINGERPRINT_BYTES = 16
+# 以 URL 末尾的房源 id 在 Redis 位图中去重（每个房源 1 bit，其余请求仍用指纹集合），
+# 启用前可用 scrapy dupefilter bootstrap 从 MySQL 预先写入已入库的房源
+# DUPEFILTER_CLASS = "scrapy_redis.dupefilter.BitmapDupeFilter"
+# DUPEFILTER_ID_PATTERN = r"/homes/[^/]+/(\d+)/?$"
+# 位图只记录不超过该值的房源 id（Redis 位图按最高位分配内存，1 亿约 12MB），更大的 id 改用指纹
+# DUPEFILTER_MAX_ID = 100000000
+# 非房源请求（搜索页、经纪人页等）的指纹改存可扩展布隆过滤器，内存固定、按容量自动扩展，
+# 过滤器数量、内存与估算误判率写入 crawl stats 的 dupefilter/bloom/*
+# DUPEFILTER_CLASS = "scrapy_redis.dupefilter.BitmapBloomDupeFilter"
+# DUPEFILTER_BLOOM_CAPACITY = 1000000
+# DUPEFILTER_BLOOM_ERROR_RATE = 0.001
+# 在 Redis 去重前加一层本进程的 LRU 近端缓存：各搜索页反复出现的同一房源直接在本地判重，
+# 命中率写入 crawl stats 的 dupefilter/near_cache/*；去重数据被清空时各进程在 SYNC_INTERVAL 秒内丢弃缓存
+# DUPEFILTER_CLASS = "scrapy_redis.dupefilter.NearCacheBitmapBloomDupeFilter"
+# DUPEFILTER_NEAR_CACHE_SIZE = 100000
+# DUPEFILTER_NEAR_CACHE_SYNC_INTERVAL = 10
 SCHEDULER_PERSIST = True
+# 调度器写缓冲：请求攒满一批（或等待超过 FLUSH_INTERVAL 秒、队列取空、爬虫空闲时）一次性去重并入队，
+# 一个列表页产出的几十个链接只需一次 Redis 往返；0 表示逐个写入
+SCHEDULER_ENQUEUE_BATCH_SIZE = 100
+SCHEDULER_ENQUEUE_FLUSH_INTERVAL = 1.0
 
 DOWNLOAD_DELAY = 1
-CONCURRENT_REQUESTS = 1
-CONCURRENT_REQUESTS_PER_DOMAIN = 1
-CONCURRENT_REQUESTS_PER_IP = 1
+# 浏览器渲染在独立线程池中进行，不再阻塞 reactor；渲染并发由 BROWSER_POOL_SIZE 限制，
+# 其余并发留给 HTTP 详情页、图片下载等
+CONCURRENT_REQUESTS = 8
+CONCURRENT_REQUESTS_PER_DOMAIN = 4
+CONCURRENT_REQUESTS_PER_IP = 4
 
 # which item to download image
 IMAGES_URLS_FIELD = "origin_images"
 FILES_URLS_FIELD = "origin_pdf_document"
 
+# Chrome / chromedriver 路径（macOS: "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome"）
+CHROME_PATH = "/usr/bin/google-chrome"
+CHROMEDRIVER_PATH = "/usr/local/bin/chromedriver"
+CHROME_HEADLESS = True
+# 打过 undetected_chromedriver 补丁的 chromedriver 缓存目录，跨运行复用（None 表示 ~/.cache/realestate_scrapy/chromedriver）
+CHROMEDRIVER_CACHE_DIR = None
+
+# 浏览器池：每次渲染借出一个 Chrome，用完归还
+BROWSER_POOL_SIZE = 1
+# 渲染多少页后回收重建浏览器
+BROWSER_MAX_PAGES = 50
+# Chrome 常驻内存（含子进程）超过该值（MB）后回收
+BROWSER_MAX_RSS_MB = 1024
+# 爬虫启动时在后台预热的浏览器数（不阻塞启动，与读取第一批 Redis 任务并行）；
+# 0 表示第一次渲染时才启动浏览器，不渲染的运行不会启动 Chrome
+BROWSER_PREWARM = 1
+# 第一次渲染后，后台预热一个备用浏览器，回收时直接替换
+BROWSER_WARM_SPARE = True
+# 等待可用浏览器的超时时间（秒）
+BROWSER_CHECKOUT_TIMEOUT = 120
+# 签出超过该时间（秒）的浏览器视为挂死并被强制结束
+BROWSER_HANG_TIMEOUT = 300
+# 巡检挂死/僵尸进程的间隔（秒）
+BROWSER_REAP_INTERVAL = 30
+# 执行 Selenium 调用的渲染线程数，0 表示与渲染并发（BROWSER_POOL_SIZE × BROWSER_TABS）相同
+BROWSER_RENDER_THREADS = 0
+# 每个 Chrome 打开的标签页数：大于 1 时流水线渲染，一个标签页抽取时其他标签页已在加载后续页面，
+# 渲染并发为 BROWSER_POOL_SIZE × BROWSER_TABS，标签页的内存开销远小于多开 Chrome
+BROWSER_TABS = 1
+# 创建浏览器的工厂函数；测试时可换成 "realestate_scrapy.browser.fake.create_fake_driver"（不启动 Chrome）
+BROWSER_DRIVER_FACTORY = "realestate_scrapy.browser.driver.create_driver"
+
+# 独立渲染服务（scrapy render_service）：为 True 时爬虫不启动浏览器，渲染任务经 Redis 交给渲染服务，
+# 多个爬虫进程共享同一组浏览器，两者容量分别伸缩
+RENDER_SERVICE_ENABLED = False
+RENDER_SERVICE_QUEUE = "render:jobs"
+# 等待渲染结果的超时（秒），超时的任务被服务端丢弃，请求按 TimeoutError 重试
+RENDER_SERVICE_TIMEOUT = 180
+# 同时等待中的渲染任务数（渲染线程数），BROWSER_RENDER_THREADS 为 0 时使用
+RENDER_SERVICE_CONCURRENCY = 16
+# 客户端已离开时结果在 Redis 中保留的时间（秒）
+RENDER_SERVICE_RESULT_TTL = 300
+
+# 页面就绪等待：网络空闲、DOM 静默、目标选择器出现、懒加载图片稳定
+READINESS_TIMEOUT = 20
+READINESS_POLL_INTERVAL = 0.1
+READINESS_NETWORK_IDLE_MS = 500
+READINESS_DOM_QUIET_MS = 500
+# 单个选择器的等待超时（秒），未列出的使用 READINESS_TIMEOUT
+READINESS_SELECTOR_TIMEOUTS = {
+    'section[aria-label="Property description"]': 20,
+    "div[aria-label='Vertical image gallery']": 10,
+}
+
+# 混合抓取：先从 HTTP 响应（内嵌 JSON / 结构化数据 / 服务端渲染的 HTML）抽取，
+# 缺少以下必填字段或遇到反爬验证时才使用浏览器渲染
+HYBRID_FETCH_ENABLED = True
+HYBRID_REQUIRED_FIELDS = ["address", "price_text", "agent_name", "agent_phone", "origin_images"]
+
+# 渲染详情页的抽取方式："script" 在浏览器内一次性抽取全部字段（只传回紧凑 JSON），
+# "dom" 传回完整 page_source 后用 XPath 抽取
+BROWSER_EXTRACT_MODE = "script"
+
+# 只抽取链接的列表页使用的 HTML 解析器："lxml"（默认）或 "selectolax"（可选，更快，需要安装 selectolax）
+LISTING_PARSER_BACKEND = "lxml"
+
+# gallery 图片使用的地址："src"（页面上的 src）或 "largest"（srcset 中最大的版本）
+GALLERY_IMAGE_VARIANT = "src"
+
+# 从浏览器网络日志（CDP）中捕获 gallery 背后的 XHR/fetch JSON，直接构造图片列表，
+# 省去点击 gallery 按钮、等待与滚动；JSON 中没有图片时才回退到点击 gallery
+BROWSER_NETWORK_CAPTURE = True
+
+# 只读取 URL 匹配该正则的 JSON 响应体（None 表示所有 XHR/fetch JSON 响应）
+NETWORK_CAPTURE_URL_PATTERN = None
+
+# 渲染浏览器的资源策略（CDP Network.setBlockedURLs）：只需要 DOM 与图片 URL，
+# 图片、字体、视频和第三方统计脚本一律拦截，图片由 HlImagesPipeline 另行下载。
+# 图片/字体/视频按 URL 扩展名识别（browser.resources.TYPE_EXTENSIONS），没有扩展名的 URL 不会被拦截
+RESOURCE_BLOCK_ENABLED = True
+RESOURCE_BLOCK_TYPES = ["image", "font", "media"]
+# 为空时使用 browser.resources.DEFAULT_DENY_DOMAINS
+RESOURCE_DENY_DOMAINS = []
+# 从拒绝列表中剔除的域名
+RESOURCE_ALLOW_DOMAINS = ["homely.com.au"]
+# gallery 中未取到照片时，被拦截图片中 URL 匹配该正则的作为房源图片（None 表示不使用）
+RESOURCE_GALLERY_IMAGE_PATTERN = None
+
+# 增量抓取：列表页卡片（价格、卧室/浴室/车位、照片数）签名未变化的房源不再抓取详情页，只更新 last_seen
+INCREMENTAL_CRAWL_ENABLED = True
+
+# 列表页分页抓取：每页在 Redis 中记录检查点（搜索 URL、页码、见过的最大 external_id）。
+# "exhaustive" 翻完全部结果页，中断后从检查点继续；"until_known" 遇到整页都是已知房源时停止，适合高频刷新最新房源
+LISTING_CRAWL_MODE = "exhaustive"
+LISTING_MAX_PAGES = 100
+LISTING_PAGE_PARAM = "page"
+
+# sitemap 发现（scrapy crawl homely_sitemap）：每批推入 homelyspider:start_urls 的详情页数量；
+# 开启 SITEMAP_USE_LASTMOD 时 lastmod 未变化的房源与子 sitemap 不再推送/解析
+SITEMAP_PUSH_BATCH_SIZE = 1000
+SITEMAP_USE_LASTMOD = True
+
+# 起始 URL 队列（RedisUrlQueue）入队去重：同一房源（external_id）或规范化 URL 在该时间窗口（秒）内
+# 只会被任一进程推送一次，去重在 Redis 端的 Lua 脚本中完成；0 表示永久去重
+URL_QUEUE_DEDUPE = True
+URL_QUEUE_DEDUPE_TTL = 86400
+
+# 页面归档：按 URL 采样，按内容寻址、zstd 压缩（可用 scrapy snapshots train 训练字典）后写入 SNAPSHOT_DIR，
+# scrapy reextract 用当前字段声明重新抽取归档页面并批量更新 HomeListing
+SNAPSHOT_ENABLED = True
+SNAPSHOT_DIR = "snapshots"
+SNAPSHOT_SAMPLE_RATE = 0.05
+SNAPSHOT_COMPRESSION_LEVEL = 10
+
 
 # ------------------------------- emacsvi.com ---------------------------------
 # emacsvi redis
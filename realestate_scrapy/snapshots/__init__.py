@@ -0,0 +1,2 @@
+"""页面归档：按内容寻址、压缩存储的采样 HTML 快照，供离线重新抽取使用。"""
+from .store import SnapshotStore  # NOQA
@@ -0,0 +1,237 @@
+import hashlib
+import json
+import logging
+import os
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+try:
+    import zstandard
+except ImportError:  # zstandard 为可选依赖，缺失时退化为 zlib 压缩
+    zstandard = None
+
+from realestate_scrapy.utils.common import extract_external_id
+
+logger = logging.getLogger('snapshots')
+
+# 采样按 URL 哈希决定，同一房源每次抓取要么总被归档、要么总不归档，便于对比历史
+SAMPLE_BUCKETS = 10000
+
+
+class SnapshotStore:
+    """
+    渲染/下载后页面 HTML 的归档，供离线重新抽取（``scrapy reextract``）使用。
+
+    目录结构::
+
+        <root>/objects/ab/<sha256>.html.zst   按内容寻址，相同页面只存一份
+        <root>/index/<YYYY-MM-DD>.jsonl      每次归档一行：url、external_id、sha256、kind、时间
+        <root>/dicts/<dict_id>.zdict          用 homely 页面训练的 zstd 字典，current 记录当前使用的字典
+
+    - 按 ``sample_rate`` 采样，写入在后台线程中进行，不阻塞回调；
+    - 对象先写临时文件再 ``os.replace``，多个爬虫进程同时写同一页面也不会产生半截文件；
+    - 训练字典后新对象使用字典压缩，旧对象仍可读取（frame 头中记录了字典 id）；
+    - 未安装 zstandard 时使用 zlib（``.html.z``）。
+    """
+
+    def __init__(self, root, sample_rate=0.05, level=10, stats=None):
+        self.root = root
+        self.sample_rate = sample_rate
+        self.level = level
+        self.stats = stats
+        self._executor = None
+        self._dicts = {}
+        self._compressor = None
+        self._current_dict_id = None
+        if zstandard is not None:
+            self._load_current_dict()
+
+    @classmethod
+    def from_settings(cls, settings, stats=None):
+        return cls(
+            settings.get("SNAPSHOT_DIR", "snapshots"),
+            sample_rate=settings.getfloat("SNAPSHOT_SAMPLE_RATE", 0.05) if settings.getbool("SNAPSHOT_ENABLED", True) else 0,
+            level=settings.getint("SNAPSHOT_COMPRESSION_LEVEL", 10),
+            stats=stats,
+        )
+
+    def _inc_stat(self, key, count=1):
+        if self.stats is not None:
+            self.stats.inc_value(f"snapshots/{key}", count)
+
+    # ------------------------------------------------------------------ writing
+
+    def sampled(self, url):
+        """该 URL 是否应被归档。"""
+        if self.sample_rate <= 0:
+            return False
+        return zlib.crc32(url.encode("utf-8")) % SAMPLE_BUCKETS < self.sample_rate * SAMPLE_BUCKETS
+
+    def save(self, url, html, kind="rendered"):
+        """采样命中时在后台线程中归档页面，返回是否提交了归档。"""
+        if not html or not self.sampled(url):
+            return False
+        if isinstance(html, str):
+            html = html.encode("utf-8")
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="snapshot-writer")
+        self._executor.submit(self._write, url, html, kind)
+        return True
+
+    def _write(self, url, html, kind):
+        try:
+            sha = hashlib.sha256(html).hexdigest()
+            path = self.object_path(sha)
+            if os.path.exists(path):
+                self._inc_stat("deduped")
+            else:
+                data = self.compress(html)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp = f"{path}.{os.getpid()}.tmp"
+                with open(tmp, "wb") as f:
+                    f.write(data)
+                os.replace(tmp, path)
+                self._inc_stat("saved")
+                self._inc_stat("bytes_raw", len(html))
+                self._inc_stat("bytes_stored", len(data))
+            self._append_index({
+                "url": url,
+                "external_id": extract_external_id(url),
+                "sha256": sha,
+                "kind": kind,
+                "ts": int(time.time()),
+            })
+        except Exception as e:
+            logger.error("Failed to save snapshot of %s: %s", url, e)
+            self._inc_stat("failed")
+
+    def _append_index(self, record):
+        index_dir = os.path.join(self.root, "index")
+        os.makedirs(index_dir, exist_ok=True)
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        # O_APPEND 下单次写入一行（远小于 PIPE_BUF），多进程追加不会交错
+        fd = os.open(os.path.join(index_dir, f"{datetime.utcnow():%Y-%m-%d}.jsonl"),
+                     os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line.encode("utf-8"))
+        finally:
+            os.close(fd)
+
+    def close(self):
+        """等待所有待写入的归档完成。"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    # ------------------------------------------------------------------ reading
+
+    def object_path(self, sha):
+        suffix = ".html.zst" if zstandard is not None else ".html.z"
+        return os.path.join(self.root, "objects", sha[:2], sha + suffix)
+
+    def load(self, sha):
+        """读取并解压一个归档对象，返回 bytes。"""
+        for suffix in (".html.zst", ".html.z"):
+            path = os.path.join(self.root, "objects", sha[:2], sha + suffix)
+            if os.path.exists(path):
+                with open(path, "rb") as f:
+                    return self.decompress(f.read(), zstd=suffix == ".html.zst")
+        raise FileNotFoundError(f"snapshot {sha} not found in {self.root}")
+
+    def records(self, since=None):
+        """
+        按时间顺序遍历索引记录。since 为 "YYYY-MM-DD" 时只读取该日期及之后的索引文件。
+        """
+        index_dir = os.path.join(self.root, "index")
+        if not os.path.isdir(index_dir):
+            return
+        for name in sorted(os.listdir(index_dir)):
+            if not name.endswith(".jsonl") or (since and name[:10] < since):
+                continue
+            with open(os.path.join(index_dir, name), encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue
+
+    def latest(self, since=None, kinds=("rendered", "http")):
+        """
+        每个房源一条归档记录：{external_id: record}。按 kinds 的顺序选择页面类型，
+        同一房源有多种归档时取排在前面的类型中最新的一条，不在 kinds 中的类型忽略。
+        """
+        rank = {kind: i for i, kind in enumerate(kinds)}
+        latest = {}
+        for record in self.records(since):
+            external_id, kind = record.get("external_id"), record.get("kind", "rendered")
+            if not external_id or kind not in rank:
+                continue
+            current = latest.get(external_id)
+            if current is None or rank[kind] <= rank[current.get("kind", "rendered")]:
+                latest[external_id] = record
+        return latest
+
+    # ------------------------------------------------------------------ compression
+
+    def compress(self, data):
+        if zstandard is None:
+            return zlib.compress(data, min(self.level, 9))
+        if self._compressor is None:
+            dict_data = self._dicts.get(self._current_dict_id)
+            self._compressor = zstandard.ZstdCompressor(level=self.level, dict_data=dict_data)
+        return self._compressor.compress(data)
+
+    def decompress(self, data, zstd=True):
+        if not zstd:
+            return zlib.decompress(data)
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read .zst snapshots")
+        dict_id = zstandard.get_frame_parameters(data).dict_id
+        dict_data = self._load_dict(dict_id) if dict_id else None
+        return zstandard.ZstdDecompressor(dict_data=dict_data).decompress(data)
+
+    def _dict_path(self, name):
+        return os.path.join(self.root, "dicts", name)
+
+    def _load_dict(self, dict_id):
+        if dict_id not in self._dicts:
+            with open(self._dict_path(f"{dict_id}.zdict"), "rb") as f:
+                self._dicts[dict_id] = zstandard.ZstdCompressionDict(f.read())
+        return self._dicts[dict_id]
+
+    def _load_current_dict(self):
+        try:
+            with open(self._dict_path("current")) as f:
+                dict_id = int(f.read().strip())
+            self._load_dict(dict_id)
+        except (OSError, ValueError) as e:
+            logger.debug("No snapshot dictionary loaded: %s", e)
+            return
+        self._current_dict_id = dict_id
+
+    def train_dictionary(self, samples=2000, dict_size=112640):
+        """
+        用最近归档的页面训练 zstd 字典并设为当前字典，返回字典 id。
+        homely 页面的大段 HTML/CSS 类名高度重复，字典可显著提高小页面的压缩率。
+        """
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to train a snapshot dictionary")
+        shas = list(dict.fromkeys(r["sha256"] for r in self.records()))[-samples:]
+        if not shas:
+            raise ValueError(f"no snapshots to train on in {self.root}")
+        dictionary = zstandard.train_dictionary(dict_size, [self.load(sha) for sha in shas])
+        dict_id = dictionary.dict_id()
+        os.makedirs(self._dict_path(""), exist_ok=True)
+        with open(self._dict_path(f"{dict_id}.zdict"), "wb") as f:
+            f.write(dictionary.as_bytes())
+        tmp = self._dict_path("current.tmp")
+        with open(tmp, "w") as f:
+            f.write(str(dict_id))
+        os.replace(tmp, self._dict_path("current"))
+        self._dicts[dict_id] = dictionary
+        self._current_dict_id = dict_id
+        self._compressor = None
+        logger.info("Trained snapshot dictionary %d from %d pages", dict_id, len(shas))
+        return dict_id
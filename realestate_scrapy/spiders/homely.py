@@ -1,19 +1,20 @@
 import logging
-import time
 import re
-from datetime import datetime
 
 import scrapy
-from scrapy.selector import Selector
+from lxml import etree
+from w3lib.url import add_or_replace_parameter
+from scrapy import signals
 from scrapy_redis.spiders import RedisSpider
 
-from selenium.webdriver.support.wait import WebDriverWait
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-import selenium.webdriver.support.expected_conditions as EC
-import undetected_chromedriver as uc
-
 from realestate_scrapy.cache import url_queue
+from realestate_scrapy.cache.listing_state import ListingCheckpoints, ListingSignatures, card_signature
+from realestate_scrapy.extractors import homely as homely_fields
+from realestate_scrapy.extractors.engine import ExtractionEngine, link_extractor, parse_html, tree_of
+from realestate_scrapy.extractors.gallery import extract_gallery, group_by_heading
+from realestate_scrapy.extractors.embedded import listing_from_state
+from realestate_scrapy.extractors.hybrid import CHALLENGE_STATUS, is_bot_challenge, merge_fields, missing_fields
+from realestate_scrapy.snapshots import SnapshotStore
 from realestate_scrapy.settings import REDIS_URL
 
 logger = logging.getLogger('homely')
@@ -26,6 +27,9 @@ class HomelySpider(RedisSpider):
     redis_key = "homelyspider:start_urls"
     redis_batch_size = 1
 
+    listing_card_selector = 'article[aria-label="Property Listing"]'
+    description_selector = 'section[aria-label="Property description"]'
+
     custom_settings = {
         'COOKIES_ENABLED': True,
         'USER_AGENT': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) '
@@ -35,25 +39,8 @@ class HomelySpider(RedisSpider):
 
     def __init__(self, *args, **kwargs):
         super(HomelySpider, self).__init__(*args, **kwargs)
-        # 配置 Chrome 和 Chromedriver 的路径（根据具体平台修改）
-        #chrome_path = "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome"
-        #chromedriver_path = "/usr/local/bin/chromedriver"
-
-        chrome_path = "/usr/bin/google-chrome"
-        chromedriver_path = "/usr/local/bin/chromedriver"
-        options = Options()
-        options.headless = True # 调试时可设置为 False，正式运行时可考虑 headless 模式
-        options.add_argument("--log-level=3")
-        options.add_argument("--silent")
-        self.driver = uc.Chrome(
-            options=options,
-            driver_executable_path=chromedriver_path,
-            browser_executable_path=chrome_path,
-            use_subprocess=False
-        )
-        self.wait = WebDriverWait(self.driver, 20)
-        # 定义页面滚动的 JavaScript 代码
-        self.js_scroll = "window.scrollTo(0, document.body.scrollHeight)"
+        # 浏览器会话中的 cookie，随后续请求合并进 Scrapy 的 cookie jar
+        self.browser_cookies = {}
         self.headers = {
             'Referer': 'https://www.homely.com.au/',
             'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) '
@@ -61,241 +48,256 @@ class HomelySpider(RedisSpider):
                           'Chrome/133.0.0.0 Safari/537.36'
         }
         self.url_queue = url_queue.RedisUrlQueue(self.name, REDIS_URL)
+        # 本轮已发起详情页请求的 external_id：同一房源出现在多个搜索结果页时只请求一次
+        self.requested_ids = set()
+
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super(HomelySpider, cls).from_crawler(crawler, *args, **kwargs)
+        spider.hybrid_enabled = crawler.settings.getbool("HYBRID_FETCH_ENABLED", True)
+        spider.extract_mode = crawler.settings.get("BROWSER_EXTRACT_MODE", "script")
+        spider.gallery_variant = crawler.settings.get("GALLERY_IMAGE_VARIANT", "src")
+        spider.network_capture = crawler.settings.getbool("BROWSER_NETWORK_CAPTURE", True)
+        pattern = crawler.settings.get("RESOURCE_GALLERY_IMAGE_PATTERN")
+        spider.gallery_image_pattern = re.compile(pattern) if pattern else None
+        spider.field_engine = ExtractionEngine("homely", homely_fields.FIELDS, stats=crawler.stats)
+        spider.snapshots = SnapshotStore.from_settings(crawler.settings, stats=crawler.stats)
+        crawler.signals.connect(spider.snapshots.close, signal=signals.spider_closed)
+        spider.listing_links = link_extractor(homely_fields.LISTING_LINK_CSS,
+                                              crawler.settings.get("LISTING_PARSER_BACKEND", "lxml"))
+        # 增量抓取：列表页卡片签名未变化的房源不再抓取详情页
+        spider.listing_signatures = None
+        if crawler.settings.getbool("INCREMENTAL_CRAWL_ENABLED", True):
+            spider.listing_signatures = ListingSignatures(spider.server, spider.name)
+            spider.listing_cards = etree.XPath(homely_fields.LISTING_CARD_XPATH)
+            spider.card_engine = ExtractionEngine("homely_card", homely_fields.CARD_FIELDS)
+        # 列表页分页："exhaustive" 翻完所有结果页；"until_known" 遇到整页都是已知房源时停止（需要增量抓取）
+        spider.listing_mode = crawler.settings.get("LISTING_CRAWL_MODE", "exhaustive")
+        spider.listing_max_pages = crawler.settings.getint("LISTING_MAX_PAGES", 100)
+        spider.listing_page_param = crawler.settings.get("LISTING_PAGE_PARAM", "page")
+        spider.listing_checkpoints = ListingCheckpoints(spider.server, spider.name)
+        spider.hybrid_required_fields = crawler.settings.getlist(
+            "HYBRID_REQUIRED_FIELDS", ["address", "price_text", "agent_name", "agent_phone", "origin_images"]
+        )
+        return spider
+
+    def make_request_from_data(self, data):
+        """
+        Redis 中的起始 URL：列表页总是由浏览器渲染；详情页在混合模式下先走 HTTP。
+        """
+        request = super(HomelySpider, self).make_request_from_data(data)
+        if not isinstance(request, scrapy.Request):
+            return request
+        if "/homes/" not in request.url:
+            return self.start_listing_request(request)
+        if not self.hybrid_enabled:
+            request.meta.update(self.render_meta(request.url))
+        else:
+            request.meta.update(self.http_meta())
+        return request
+
+    def start_listing_request(self, request):
+        """
+        搜索 URL 的第一个请求：exhaustive 模式下若上一轮在中途中断，从检查点的下一页继续。
+        """
+        search_url = request.url
+        page = 1
+        checkpoint = self.listing_checkpoints.get(search_url)
+        if self.listing_mode == "exhaustive" and checkpoint and not checkpoint.get("done"):
+            page = checkpoint["page"] + 1
+            logger.info("Resuming %s from page %d", search_url, page)
+        listing = self.listing_request(search_url, page, checkpoint.get("newest_id") if checkpoint else None)
+        listing.meta.update({k: v for k, v in request.meta.items() if k not in listing.meta})
+        return listing
+
+    def listing_request(self, search_url, page, newest_id=None):
+        url = search_url if page == 1 else add_or_replace_parameter(search_url, self.listing_page_param, str(page))
+        meta = self.render_meta(url)
+        meta.update({"search_url": search_url, "listing_page": page, "newest_id": newest_id})
+        # 结果页内容随时间变化，每轮都要重新抓取，不参与请求指纹去重
+        return scrapy.Request(url, callback=self.parse, meta=meta, cookies=self.browser_cookies, dont_filter=True)
+
+    def render_meta(self, url, dom=False):
+        """
+        构造交给 BrowserRenderMiddleware 的渲染参数。
+        dom 为 True 时强制传回完整 DOM（浏览器内抽取失败后的回退）。
+        """
+        if "/homes/" in url:
+            meta = {
+                "render": True,
+                "render_label": "property",
+                "render_wait_for": self.description_selector,
+                "render_scroll": True,
+                "render_actions": ["gallery"],
+            }
+            if self.extract_mode == "script" and not dom:
+                # 浏览器内一次性抽取全部字段，不再传输整个 page_source；
+                # 开启网络捕获时直接从 gallery 背后的 JSON 取图片，不点击、不滚动
+                action = "capture_gallery" if self.network_capture else "open_gallery"
+                # 被采样归档的页面仍传回 page_source，供离线重新抽取
+                meta.update({"render_actions": [action], "render_extract": "homely",
+                             "render_body": self.snapshots.sampled(url)})
+            return meta
+        return {
+            "render": True,
+            "render_label": "listing",
+            "render_wait_for": self.listing_card_selector,
+            "render_scroll": True,
+        }
 
-    def __del__(self):
-        # 保证退出时关闭浏览器
-        self.driver.quit()
+    def http_meta(self):
+        """
+        混合模式下直接 HTTP 抓取详情页的参数：反爬验证常以 403/429/503 返回，需要让这些响应
+        到达 parse_property（否则被 HttpErrorMiddleware 丢弃），由其判定后改用浏览器渲染。
+        """
+        return {"handle_httpstatus_list": list(CHALLENGE_STATUS)}
+
+    def property_request(self, url, render=False, dom=False, signature=None):
+        meta = self.render_meta(url, dom=dom) if render or not self.hybrid_enabled else self.http_meta()
+        if signature:
+            # 列表页签名随请求传递，item 入库后由 SignaturePipeline 保存。
+            # 是否需要重新抓取已由签名决定：持久化的请求指纹（SCHEDULER_PERSIST）中早已有上一轮
+            # 抓取过的 URL，不能再经过去重，本轮内的重复由 changed_property_requests 排除
+            meta["listing_signature"] = signature
+        # 渲染回退请求与之前的 HTTP 请求 URL 相同，不能被去重过滤
+        return scrapy.Request(url, callback=self.parse_property, meta=meta,
+                              cookies=self.browser_cookies, dont_filter=render or bool(signature))
 
     def parse(self, response):
         """
-        加载列表页，提取每个房源详情链接。
+        加载列表页，提取每个房源详情链接，并按检查点继续请求下一页结果。
         """
-        # if property call parse_property
+        # if property call parse_property：响应已经是（渲染后的）详情页，直接解析，不再重复请求
         if "/homes/" in response.url:
-            yield scrapy.Request(response.url, callback=self.parse_property)
+            yield from self.parse_property(response)
         else:
             logger.info("Parse listing page: %s", response.url)
-            self.driver.get(response.url)
-            time.sleep(5)  # 等待页面加载（也可以改用更精准的显式等待）
-            self.driver.execute_script(self.js_scroll)
-            time.sleep(2)
-
-            page_source = self.driver.page_source
-            sel = Selector(text=page_source)
-            # 定位所有房产列表条目的链接
-            property_links = sel.css('article[aria-label="Property Listing"] a::attr(href)').getall()
-            logger.info("Found %d property links", len(property_links))
-            # 对每个链接发起新的请求，交由 parse_property 方法处理
-            for link in property_links:
-                yield response.follow(link, self.parse_property)
+            self.share_browser_cookies(response)
+            if self.listing_signatures is not None:
+                requests, seen, new = self.changed_property_requests(response)
+            else:
+                # 定位所有房产列表条目的链接（response 为浏览器渲染后的 DOM），只需要链接时使用更快的解析器
+                property_links = self.listing_links.links(response.body, "href")
+                logger.info("Found %d property links", len(property_links))
+                # 对每个链接发起新的请求，交由 parse_property 方法处理
+                requests = [self.property_request(response.urljoin(link)) for link in property_links]
+                seen = [self.extract_external_id(request.url) for request in requests]
+                new = None
+            yield from requests
+            yield from self.next_listing_page(response, seen, new)
+
+    def next_listing_page(self, response, seen, new):
+        """
+        记录检查点并请求下一页结果。没有房源卡片、达到 LISTING_MAX_PAGES，或在 until_known
+        模式下整页都是已知房源（new 为空）时停止翻页，并把该搜索标记为完成。
+        """
+        search_url = response.meta.get("search_url", response.url)
+        page = response.meta.get("listing_page", 1)
+        ids = [int(external_id) for external_id in seen if external_id]
+        newest_id = max(ids + [response.meta.get("newest_id") or 0]) or None
+
+        stop = None
+        if not ids:
+            stop = "last_page"
+        elif self.listing_mode == "until_known" and new is not None and not new:
+            stop = "known"
+        elif page >= self.listing_max_pages:
+            stop = "max_pages"
+        self.listing_checkpoints.save(search_url, page, newest_id, done=stop is not None)
+        self.crawler.stats.inc_value("listing/pages")
+        if stop:
+            logger.info("Stop paging %s at page %d: %s", search_url, page, stop)
+            self.crawler.stats.inc_value(f"listing/stop/{stop}")
+            return
+        yield self.listing_request(search_url, page + 1, newest_id)
+
+    def changed_property_requests(self, response):
+        """
+        增量抓取：从列表页卡片读取价格、卧室/浴室/车位、照片数计算签名，与 Redis 中
+        上次入库时的签名比较，只为新出现或有变化的房源发起详情页请求；其余只更新 last_seen。
+        本轮已在其他结果页请求过的房源不再重复请求。
+
+        返回 (详情页请求, 本页全部 external_id, 新出现的 external_id)。
+        """
+        signatures, urls = {}, {}
+        for card in self.listing_cards(tree_of(response)):
+            fields = self.card_engine.extract(card)
+            url = response.urljoin(fields["link"]) if fields["link"] else None
+            external_id = self.extract_external_id(url) if url else None
+            if external_id:
+                signatures[external_id] = card_signature(fields)
+                urls[external_id] = url
+        new, changed = self.listing_signatures.diff(signatures)
+
+        stats = self.crawler.stats
+        stats.inc_value("incremental/seen", len(signatures))
+        stats.inc_value("incremental/new", len(new))
+        stats.inc_value("incremental/changed", len(changed))
+        stats.inc_value("incremental/unchanged", len(signatures) - len(new) - len(changed))
+        logger.info("Found %d property links, %d new, %d changed", len(signatures), len(new), len(changed))
+        requests = []
+        for external_id in new + changed:
+            if external_id in self.requested_ids:
+                stats.inc_value("incremental/repeated")
+                continue
+            self.requested_ids.add(external_id)
+            requests.append(self.property_request(urls[external_id], signature=signatures[external_id]))
+        return requests, list(signatures), new
 
     def parse_property(self, response):
         """
-        解析房产详情页，提取基本信息和描述，接着模拟点击 gallery 按钮获取图片 URL。
+        解析房产详情页。
+
+        混合模式（HYBRID_FETCH_ENABLED）下先尝试直接从 HTTP 响应中抽取，
+        缺少必填字段或遇到反爬验证时再用浏览器渲染，并模拟点击 gallery 按钮获取图片 URL。
         """
         logger.info("Parse property detail page: %s", response.url)
-        self.driver.get(response.url)
-        time.sleep(5)
-        try:
-            # 等待房产描述部分加载出来
-            self.wait.until(
-                EC.presence_of_element_located(
-                    (By.CSS_SELECTOR, 'section[aria-label="Property description"]')
-                )
-            )
-        except Exception as e:
-            logger.error("Property description not found: %s", e)
-        self.driver.execute_script(self.js_scroll)
-        time.sleep(2)
-
-        page_source = self.driver.page_source
-
-        # debug
-        with open("p2.html", "w", encoding="utf-8") as f:
-            f.write(page_source)
-
-        sel = Selector(text=page_source)
-        header_sel = sel.xpath("//header")
-
-        # 提取地址、城市、价格等基本信息
-        address = header_sel.xpath('.//h1/text()').get()
-        city = header_sel.xpath('.//span[@class="inline"]/text()').get()
-        full_address = f"{address.strip()} {city.strip()}" if address and city else None
-        postcode = self.parse_postcode(city)
-
-        # 提取价格字符串
-        price_text = header_sel.xpath('.//section[@aria-label="Summary"]//h2/text()').get()
-        lower_price, upper_price = self.parse_price(price_text)
-
-        # 提取卧室、浴室、车位信息，先获取对应的文本，再转为整数
-        bedrooms_str = header_sel.xpath('//li[span[@aria-label="Bed"]]/text()[normalize-space()]').get()
-        bathrooms_str = header_sel.xpath('//li[span[@aria-label="Bath"]]/text()[normalize-space()]').get()
-        cars_str = header_sel.xpath('//li[span[@aria-label="Car"]]/text()[normalize-space()]').get()
-        area = header_sel.xpath('//li[span[@aria-label="Area"]]/text()[normalize-space()]').get(default='')
-        try:
-            bedrooms = int(bedrooms_str) if bedrooms_str else None
-        except Exception:
-            bedrooms = None
-        try:
-            bathrooms = int(bathrooms_str) if bathrooms_str else None
-        except Exception:
-            bathrooms = None
-        try:
-            car_spaces = int(cars_str) if cars_str else None
-        except Exception:
-            car_spaces = None
-
-        # try:
-        #     area = int(area_str) if area_str else None
-        # except Exception:
-        #     area = None
-
-        # 解释：
-        #
-        #     (//section[@aria-label="Summary"]//h3/span[contains(text(),"for sale")])[1]
-        #     这部分先查找 <section aria-label="Summary"> 下的所有 <h3> 内的 <span> 元素，且其文本包含 “for sale”，用 [1] 取第一个匹配项。
-        #
-        #     substring-before(..., " for sale")
-        #     这个函数会返回第一个参数文本中，在遇到 " for sale"（注意前面有一个空格）之前的部分，从而提取出 “Apartment” 或 “House”。
-        #
-        #     .get(default='house')
-        #     若没有匹配到任何结果，就返回默认值 'house'。
-        property_type = header_sel.xpath(
-            'substring-before((//section[@aria-label="Summary"]//h3/span[contains(text(),"for sale")])[1]/text(), " for sale")'
-        ).get(default='House')
-
-
-        # 提取详细描述
-        desc_sel = sel.xpath('//section[@aria-label="Property description"]')
-        # description = desc_sel.xpath('.//p//text()').getall()
-        description = desc_sel.xpath('.//p//text()').get(default='')
-
-        council_rates = response.xpath(
-            '//section[@aria-label="Property description"]//div[h3[contains(text(),"Council rates")]]/span/text()'
-        ).get(default='').strip()
-
-        # description = ' '.join([p.strip() for p in description_paragraphs if p.strip()])
-
-        # 使用 XPath 表达式定位并提取 Area 的值
-        # 这段代码的工作原理如下：
-        # Scrapy Cookbook
-        #
-        # //section[@aria-label="Property description"]：定位到具有aria-label属性为“Property description”的section元素。
-        # //div[h3[contains(text(), "Land details")]]：在上述section元素内，查找包含h3标题且其文本包含“Land details”的div元素。
-        # //div[contains(text(), "Area:")]/span/text()：在上述div元素内，查找包含文本“Area:”的div元素，并提取其子span元素的文本内容。
-        if area is None or area == '':
-            area = sel.xpath(
-                '//section[@aria-label="Property description"]'
-                # '//div[h3[contains(text(), "Land details")]]'
-                '//div[contains(text(), "Area:")]/span/text()'
-            ).get()
-
-        logger.info(f"Area: {area}")
-
-        if area is not None:
-            area_number = re.findall(r'\d+', area)
-            area_number = int(area_number[0]) if area_number else 0
+        signature = response.meta.get("listing_signature")
+        if not response.meta.get("render"):
+            if response.status == 200:
+                self.snapshots.save(response.url, response.body, kind="http")
+            item = self.extract_from_http(response) if self.hybrid_enabled else None
+            if item is not None:
+                self.inc_hybrid_stat("http")
+                item["listing_signature"] = signature
+                yield item
+            else:
+                # HTTP 抽取不完整，交给浏览器渲染
+                yield self.property_request(response.url, render=True, signature=signature)
+            return
+
+        if self.hybrid_enabled:
+            self.inc_hybrid_stat("browser")
+        self.share_browser_cookies(response)
+        render_data = response.meta.get("render_data", {})
+        # 打开 gallery 后的 DOM 最完整，优先归档
+        self.snapshots.save(response.url, render_data.get("gallery") or response.body, kind="rendered")
+
+        if response.meta.get("render_extract"):
+            # 浏览器内抽取：Python 端只做校验与类型转换
+            fields = self.validate_extracted(render_data.get("extract"))
+            if fields is None:
+                logger.warning("In-browser extraction invalid, re-rendering with DOM: %s", response.url)
+                self.crawler.stats.inc_value("extract/script/invalid")
+                yield self.property_request(response.url, render=True, dom=True, signature=signature)
+                return
+            self.crawler.stats.inc_value("extract/script/ok")
+            # 先不填默认值，让捕获的 JSON 能补全页面上缺失的字段
+            item = homely_fields.make_item(fields, response.url, name=self.name, defaults=False)
+            result = self.group_gallery(fields["gallery"])
+            captured = render_data.get("capture_gallery")
+            if captured:
+                result = self.merge_captured(item, captured, result)
+            homely_fields.apply_defaults(item)
         else:
-            area_number = 0
-        # 提取数字部分
-        # area_value = int(re.search(r'\d+', area).group()) if area else None
-        # print(f"Area (numeric): {area_value}")
-
-        # 提取 Documents 链接
-        document_link = sel.xpath(
-            '//section[@aria-label="Property description"]'
-            '//h3[text()="Documents"]/following-sibling::div[1]//a/@href'
-        ).get()
-
-        document_link = document_link.strip() if document_link else None
-        document_links = [document_link]
-
-        # //section[@aria-label="Property map"]//div[contains(@style, "background-image")]/@style
-        # 定位到包含背景图片 URL 的 div 的 style 属性。
-        #
-        # substring-after(..., "center=")
-        # 从 style 属性值中截取 "center=" 后的字符串。
-        #
-        # substring-before(..., "&")
-        # 从上一步的结果中截取第一个 & 前的部分，从而得到类似 "-37.7334201,144.7981836" 的字符串。
-        # 使用 XPath 提取包含背景图片 URL 的 style 属性值，并截取出 center 参数的内容
-        center_coordinates = sel.xpath(
-            'substring-before(substring-after(//section[@aria-label="Property map"]//div[contains(@style, "background-image")]/@style, "center="), "&")'
-        ).get()
-
-        # 如果成功提取到了坐标字符串，拆分为纬度和经度
-        if center_coordinates:
-            latitude, longitude = center_coordinates.split(",")
-            print("纬度:", latitude)  # 输出 -37.7334201
-            print("经度:", longitude)  # 输出 144.7981836
-        else:
-            print("未能提取坐标信息")
-
-        # Agent information
-        # 提取 Agent 的姓名（h3 标签内的文字）
-        agent_name = sel.xpath('//section[@aria-label="Contact the real estate agent"]//article//h3/text()').get()
-        agent_name = agent_name.strip() if agent_name else None
-
-        # 提取 Agent 的所属机构（h4 标签内的文字）
-        agent_office = sel.xpath('//section[@aria-label="Contact the real estate agent"]//article//h4/text()').get()
-        agent_office = agent_office.strip() if agent_office else None
-
-        # 提取 Agent 的个人主页链接（profile），从 <a> 标签的 href 属性中提取
-        agent_profile = sel.xpath(
-            '//section[@aria-label="Contact the real estate agent"]//article//a[@aria-label][1]/@href').get()
-        agent_profile = agent_profile.strip() if agent_profile else None
-
-        # 修改电话号码提取方式：选择所有带有 href 且 href 属性以 "tel:" 开头的元素（不局限于 a 标签）
-        agent_phone_href = sel.xpath(
-            '//section[@aria-label="Contact the real estate agent"]//*[@href][starts-with(@href, "tel:")]/@href').get()
-        agent_phone = agent_phone_href.replace("tel:", "").strip() if agent_phone_href else None
-
-        # 输出结果
-        print("Agent Name:", agent_name)
-        print("Agent Office:", agent_office)
-        print("Agent Profile URL:", agent_profile)
-        print("Agent Phone:", agent_phone)
-
-        # 构造初始 item，对应数据库模型中的各字段
-        item = {
-            "name": self.name,
-            "url": response.url,
-            "external_id": self.extract_external_id(response.url),
-            "address": full_address,
-            "title": full_address,
-            "suburb": city,
-            "state": city, # TODO:
-            "postcode": postcode,
-            "price_text": price_text,
-            "lower_price": lower_price if lower_price else 0,
-            "upper_price": upper_price if upper_price else 0,
-            "bedrooms": bedrooms,
-            "bathrooms": bathrooms,
-            "car_spaces": car_spaces,
-            "property_type": property_type,
-            "description": description,
-            "council_rates": council_rates,
-            "land_area": area_number,
-            "pdf_document": [],
-            "origin_pdf_document": document_links,
-            "latitude": latitude if latitude else 0,
-            "longitude": longitude if longitude else 0,
-            # 后续将 gallery 中获取的图片 URL 列表填入此字段，Pipeline 负责下载及映射构造
-            "images": [],
-            "origin_images": [],
-            "floor_plan": [],
-            "origin_floor_plan": [],
-            "publish_date": datetime.utcnow(),
-
-            # agent
-            "agent_name": agent_name,
-            "agent_phone": agent_phone,
-            "agent_agency": agent_office,
-            "agent_profile_url": agent_profile,
-        }
+            item = self.build_item(response, response.url)
+
+            # BrowserRenderMiddleware 已执行 gallery 动作（模拟点击 gallery 按钮），这里解析图片 URL
+            result = self.parse_gallery(render_data.get("gallery"))
 
-        # 调用 parse_gallery 模拟点击 gallery 按钮并获取图片 URL
-        result = self.parse_gallery()
+        if result and not result[0]:
+            # gallery 中没有取到照片时，使用渲染时被拦截的 listing 图片 URL
+            result = (self.blocked_gallery_images(render_data), result[1])
 
         if result and len(result) == 2:
             # item["images"], item["floor_plan"] = result
@@ -307,76 +309,121 @@ class HomelySpider(RedisSpider):
             # item["images"], item["floor_plan"] = [], []
 
         if item["external_id"] is not None:
+            item["listing_signature"] = signature
             yield item
         else:
             logger.error(f"No external id found: {response.url}")
 
-    def parse_gallery(self):
-        """
-        模拟点击 Gallery 按钮，等待 AJAX 加载出图片数据，然后返回图片 URL 列表。
-        """
-        try:
-            # 定位 Gallery 按钮（假设选择第一个按钮即可）
-            gallery_button = self.wait.until(
-                EC.element_to_be_clickable(
-                    (By.CSS_SELECTOR, "div[aria-label='Gallery button bar'] button:first-of-type")
-                )
-            )
-            # 滚动使按钮可见后点击（先尝试常规点击，失败后使用 JavaScript 点击）
-            self.driver.execute_script("arguments[0].scrollIntoView(true);", gallery_button)
-            time.sleep(5)
-            try:
-                gallery_button.click()
-                logger.info("Clicked Gallery button successfully.")
-            except Exception as click_exception:
-                logger.warning("Standard click failed, using JavaScript click. Error: %s", click_exception)
-                self.driver.execute_script("arguments[0].click();", gallery_button)
-                logger.info("JavaScript click on Gallery button succeeded.")
-            # 等待页面 AJAX 加载出图片展示区域
-            self.wait.until(
-                EC.presence_of_element_located(
-                    (By.CSS_SELECTOR, "div[aria-label='Vertical image gallery']")
-                )
-            )
-            time.sleep(2)  # 保证数据加载完全
-        except Exception as e:
-            logger.error("Error clicking or loading gallery: %s", e)
-            return [],[]
-
-        # 滚动到页面底部确保图片全部加载
-        self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight)")
-        time.sleep(2)
-
-        # 利用 Selector 解析加载后的页面
-        page_source = self.driver.page_source
-
-        # debug
-        with open("p3.html", "w", encoding="utf-8") as f:
-            f.write(page_source)
-
-        sel = Selector(text=page_source)
-
-        # 限定在垂直图库区域中查找
-        gallery = sel.xpath('//div[@aria-label="Vertical image gallery"]')
-
-        images = []
-        floorplan = []
-
-        for img in gallery.xpath('.//img'):
-            src = img.xpath('./@src').get()
-            if not src:
+    def extract_from_http(self, response):
+        """
+        直接从 Scrapy 下载的原始 HTML 中抽取房源：先跑与渲染页相同的 XPath，
+        再用内嵌 JSON 状态 / 结构化数据补全。必填字段齐全时返回 item，否则返回 None。
+        """
+        if is_bot_challenge(response):
+            logger.info("Bot challenge detected, falling back to browser: %s", response.url)
+            self.inc_hybrid_stat("challenge")
+            return None
+
+        item = homely_fields.extract_listing(response, self.field_engine, name=self.name)
+        missing = missing_fields(item, self.hybrid_required_fields)
+        if item["external_id"] is None or missing:
+            for field in missing:
+                self.inc_hybrid_stat(f"missing/{field}")
+            logger.debug("HTTP extraction incomplete for %s, missing: %s", response.url, missing)
+            return None
+        return homely_fields.apply_defaults(item)
+
+    def share_browser_cookies(self, response):
+        """把渲染时浏览器会话中的 cookie 同步给 Scrapy 的 cookie jar，使后续纯 HTTP 抓取也能通过校验。"""
+        cookies = response.meta.get("browser_cookies")
+        if cookies:
+            self.browser_cookies = cookies
+
+    def inc_hybrid_stat(self, key):
+        stats = self.crawler.stats
+        stats.inc_value(f"hybrid/{key}")
+        if key in ("http", "browser"):
+            http = stats.get_value("hybrid/http", 0)
+            total = http + stats.get_value("hybrid/browser", 0)
+            stats.set_value("hybrid/http_hit_rate_pct", int(http * 100 / total))
+
+    def build_item(self, sel, url):
+        """
+        用 XPath 从页面（渲染后的 DOM 或原始 HTTP 响应）中抽取房源字段，构造 item。
+        gallery 图片由调用方填入。
+        """
+        return homely_fields.make_item(self.select_fields(sel), url, name=self.name)
+
+    def select_fields(self, sel):
+        """
+        用预编译的字段声明（extractors.homely.FIELDS）在已解析的树上抽取各字段，
+        键与浏览器内抽取脚本的返回值一致。
+        """
+        return self.field_engine.extract(tree_of(sel))
+
+    def validate_extracted(self, data):
+        """
+        校验浏览器内抽取脚本的返回值：必须是 dict，文本字段为 str 或 None，gallery 为
+        {标题: [{"src": ..., "srcset": ...}]}。页面结构不符（没有 header）时返回 None。
+        """
+        if not isinstance(data, dict) or not data.get("address"):
+            return None
+        fields = {}
+        for key, value in data.items():
+            if key == "gallery":
                 continue
-            # 获取当前 img 元素之前的所有 h2 元素
-            preceding_h2s = img.xpath('preceding::h2')
-            if preceding_h2s:
-                # 获取最近的一个 h2 元素的文本
-                last_h2_text = preceding_h2s[-1].xpath('normalize-space()').get()
-                if last_h2_text:
-                    if "Floor plan" in last_h2_text:
-                        floorplan.append(src)
-                    elif "Photo" in last_h2_text or "Photos" in last_h2_text:
-                        images.append(src)
+            fields[key] = value if isinstance(value, str) else None
+        gallery = data.get("gallery")
+        fields["gallery"] = {
+            str(heading): [img for img in imgs if isinstance(img, dict) and isinstance(img.get("src"), str)]
+            for heading, imgs in gallery.items() if isinstance(imgs, list)
+        } if isinstance(gallery, dict) else {}
+        return fields
+
+    def merge_captured(self, item, captured, result):
+        """
+        使用渲染时从 XHR/fetch JSON 中捕获的数据：gallery 中有照片时优先于 DOM 抽取的结果，
+        JSON 中同一房源的字段用于补全 item 中缺失的值。
+        """
+        merge_fields(item, listing_from_state(captured.get("payloads", []), item["external_id"]))
+        gallery = captured.get("gallery") or {}
+        if gallery.get("photo"):
+            self.crawler.stats.inc_value("gallery/network")
+            return self.gallery_sources(gallery)
+        self.crawler.stats.inc_value("gallery/dom")
+        return result
+
+    def blocked_gallery_images(self, render_data):
+        """渲染时被拦截的图片中，匹配 RESOURCE_GALLERY_IMAGE_PATTERN 的即为房源图片。"""
+        if self.gallery_image_pattern is None:
+            return []
+        blocked = render_data.get("resources", {}).get("blocked_images", [])
+        return list(dict.fromkeys(url for url in blocked if self.gallery_image_pattern.search(url)))
+
+    def group_gallery(self, gallery):
+        """把浏览器内抽取脚本按标题分组的 gallery 归类为 (images, floorplan)，规则与 parse_gallery 一致。"""
+        return self.gallery_sources(group_by_heading(gallery))
+
+    def parse_gallery(self, page_source):
+        """
+        从打开 gallery 后的页面 HTML 中解析图片 URL，返回 (images, floorplan)。
+        """
+        if not page_source:
+            return [], []
+
+        # 单次按文档顺序遍历，同时得到照片、平面图、视频、3D 看房
+        return self.gallery_sources(extract_gallery(parse_html(page_source)))
 
+    def gallery_sources(self, categories):
+        """
+        取出照片与平面图的 URL。GALLERY_IMAGE_VARIANT 为 "largest" 时使用 srcset 中最大的版本。
+        """
+        key = "largest" if self.gallery_variant == "largest" else "src"
+        other = {k: len(v) for k, v in categories.items() if k not in ("photo", "floor_plan") and v}
+        if other:
+            logger.debug("Gallery has other media: %s", other)
+        images = [entry[key] for entry in categories["photo"]]
+        floorplan = [entry[key] for entry in categories["floor_plan"]]
         return images, floorplan
 
     def extract_external_id(self, url):
@@ -390,113 +437,3 @@ class HomelySpider(RedisSpider):
         if match:
             return match.group(1)
         return None
-
-    def parse_price(self, price_text):
-        """
-        解析价格字符串，返回 (price_low, price_high) 元组。
-
-        支持的价格样式包括：
-          1. 区间价格，使用“-”作为分隔符：
-             "$1,460,000 - $1,600,000"
-          2. 区间价格，使用 "to" 作为分隔符：
-             "$770,000 to $820,000"
-          3. 单一价格（只有一个数值）：
-             "$249,500"
-          4. 带有状态前缀（例如“For Sale - $1,799,000”）：
-             "For Sale - $1,799,000"
-          5. 带有状态前缀，但无连接符：
-             "For Sale $1,800,000"
-          6. 带有额外描述和区间的：
-             "Expressions of Interest | $3,900,000 - $4,290,000"
-
-        对于单一价格，将 lower 与 upper 都设为相同数值；对于区间价格，
-        将两个数字分别赋值给 price_low 和 price_high。
-
-        测试：
-            # 示例测试各个价格样式
-            examples = [
-                "$1,460,000 - $1,600,000",  # 区间价格，用 - 分隔
-                "$770,000 to $820,000",  # 区间价格，用 "to" 分隔
-                "$249,500",  # 单一价格
-                "For Sale - $1,799,000",  # 带状态前缀和 - 的单一价格
-                "For Sale $1,800,000",  # 带状态前缀（无连接符）的单一价格
-                "Expressions of Interest | $3,900,000 - $4,290,000"  # 带描述和区间价格
-            ]
-
-            for example in examples:
-                low, high = parse_price(example)
-                print(f"原始字符串: {example}\n解析结果: price_low={low}, price_high={high}\n")
-        """
-
-
-        if not price_text:
-            return None, None
-
-        # 去除首尾空格
-        price_text = price_text.strip()
-
-        # 如果有额外的描述信息，例如：
-        #   "For Sale - $1,799,000" 或 "Expressions of Interest | $3,900,000 - $4,290,000"
-        # 则去除描述，保留美元符号开始的部分
-        # 这里查找第一个 "$" 出现的位置，从该位置截取子串
-        dollar_index = price_text.find('$')
-        if dollar_index != -1:
-            price_text = price_text[dollar_index:]
-
-        # 注：此时 price_text 可能是以下格式之一：
-        #   "$1,460,000 - $1,600,000"
-        #   "$770,000 to $820,000"
-        #   "$249,500"
-        #   "$1,799,000"
-        #   "$1,800,000"
-        #   "$3,900,000 - $4,290,000"
-
-        # 优先尝试匹配价格区间，支持 "-" 或 "to" 作为分隔符
-        range_pattern = re.compile(r'\$?([\d,]+)\s*(?:-|to)\s*\$?([\d,]+)', re.IGNORECASE)
-        range_match = range_pattern.search(price_text)
-        if range_match:
-            try:
-                lower_price = int(range_match.group(1).replace(',', '').strip())
-                upper_price = int(range_match.group(2).replace(',', '').strip())
-                return lower_price, upper_price
-            except ValueError as e:
-                print("价格转换错误:", e)
-                return None, None
-
-        # 如果未匹配到区间格式，则尝试匹配单一价格格式
-        single_pattern = re.compile(r'\$([\d,]+)')
-        single_match = single_pattern.search(price_text)
-        if single_match:
-            try:
-                price = int(single_match.group(1).replace(',', '').strip())
-                # 单一价格，下限和上限均为相同数值
-                return price, price
-            except ValueError as e:
-                print("价格转换错误:", e)
-                return None, None
-
-        # 若上述均不匹配，则返回 (None, None)
-        return None, None
-
-    def parse_postcode(self, address_text):
-        """
-        解析地址中的 postcode（邮政编码）。
-
-        支持格式包括：
-          1. 地址文本中可能包含城市、州以及邮政编码，例如 "Abbotsford VIC 3067"
-          2. 邮政编码通常为 4 位数字（如 3067）
-
-        参数:
-          address_text (str): 从网页中提取的地址详情，例如 "Abbotsford VIC 3067"
-
-        返回:
-          str 或 None: 如果能匹配到 4 位数字，则返回该邮政编码；否则返回 None。
-        """
-        if not address_text:
-            return None
-
-        # 使用正则表达式匹配 4 位数字，\b 用于确保匹配边界
-        match = re.search(r'\b\d{4}\b', address_text)
-        if match:
-            return match.group()
-        return None
\ No newline at end of file
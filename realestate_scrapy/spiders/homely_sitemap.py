@@ -0,0 +1,112 @@
+import logging
+
+import scrapy
+
+from realestate_scrapy.cache import url_queue
+from realestate_scrapy.extractors.sitemap import iter_sitemap
+from realestate_scrapy.settings import REDIS_URL
+from realestate_scrapy.utils.common import extract_external_id
+
+logger = logging.getLogger('homely')
+
+
+class HomelySitemapSpider(scrapy.Spider):
+    """
+    通过 sitemap 发现房源，不使用浏览器：
+
+        scrapy crawl homely_sitemap
+
+    流式解析 sitemap 索引与子 sitemap（支持 .xml.gz），只保留 /homes/ 详情页，
+    按 lastmod 跳过未变化的房源与子 sitemap，新的详情页 URL 批量推入 homelyspider:start_urls，
+    由 homely 爬虫抓取。
+    """
+
+    name = "homely_sitemap"
+    allowed_domains = ["homely.com.au"]
+    start_urls = ["https://www.homely.com.au/sitemap.xml"]
+
+    custom_settings = {
+        # 只下载 XML，不需要浏览器渲染与 item pipeline
+        "DOWNLOADER_MIDDLEWARES": {"realestate_scrapy.browser.middleware.BrowserRenderMiddleware": None},
+        "ITEM_PIPELINES": {},
+        "SCHEDULER": "scrapy.core.scheduler.Scheduler",
+        "DUPEFILTER_CLASS": "scrapy.dupefilters.RFPDupeFilter",
+        # 大 sitemap 超过默认 32MB 是正常的，不再告警
+        "DOWNLOAD_WARNSIZE": 0,
+    }
+
+    def __init__(self, *args, **kwargs):
+        super(HomelySitemapSpider, self).__init__(*args, **kwargs)
+        self.url_queue = None
+        # 上次推送时的 lastmod：房源 external_id / 子 sitemap URL -> lastmod
+        self.listing_lastmod_key = "homely:sitemap:listing_lastmod"
+        self.sitemap_lastmod_key = "homely:sitemap:sitemap_lastmod"
+
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super(HomelySitemapSpider, cls).from_crawler(crawler, *args, **kwargs)
+        spider.batch_size = crawler.settings.getint("SITEMAP_PUSH_BATCH_SIZE", 1000)
+        spider.use_lastmod = crawler.settings.getbool("SITEMAP_USE_LASTMOD", True)
+        # 与其他发现进程（scrapy seed、其他 sitemap 爬虫）共用队列端去重
+        spider.url_queue = url_queue.RedisUrlQueue(
+            "homely", REDIS_URL,
+            dedupe=crawler.settings.getbool("URL_QUEUE_DEDUPE", True),
+            dedupe_ttl=crawler.settings.getint("URL_QUEUE_DEDUPE_TTL", 86400),
+        )
+        return spider
+
+    def parse(self, response, lastmod=None):
+        stats = self.crawler.stats
+        stats.inc_value("sitemap/files")
+        batch = []
+        for kind, loc, modified in iter_sitemap(response.body):
+            if kind == "sitemap":
+                if self.sitemap_changed(loc, modified):
+                    yield scrapy.Request(loc, callback=self.parse, cb_kwargs={"lastmod": modified})
+                else:
+                    stats.inc_value("sitemap/sitemaps_unchanged")
+                continue
+            stats.inc_value("sitemap/urls")
+            if "/homes/" not in loc:
+                continue
+            external_id = extract_external_id(loc)
+            if external_id:
+                batch.append((external_id, loc, modified))
+            if len(batch) >= self.batch_size:
+                self.push(batch)
+                batch = []
+        if batch:
+            self.push(batch)
+        if lastmod and self.use_lastmod:
+            # 子 sitemap 处理完后再记录其 lastmod，中途失败的 sitemap 下次会重新解析
+            self.url_queue.redis_client.hset(self.sitemap_lastmod_key, response.url, lastmod)
+
+    def sitemap_changed(self, loc, lastmod):
+        if not (lastmod and self.use_lastmod):
+            return True
+        return self.url_queue.redis_client.hget(self.sitemap_lastmod_key, loc) != lastmod
+
+    def push(self, batch):
+        """
+        一批房源：一次 HMGET 取出上次的 lastmod，lastmod 未变化的跳过，
+        其余批量推入起始 URL 队列，并只为实际入队的房源更新 lastmod。
+        """
+        stats = self.crawler.stats
+        stats.inc_value("sitemap/listings", len(batch))
+        if self.use_lastmod:
+            redis_client = self.url_queue.redis_client
+            known = redis_client.hmget(self.listing_lastmod_key, [external_id for external_id, _, _ in batch])
+            changed = [entry for entry, old in zip(batch, known) if entry[2] is None or old != entry[2]]
+            stats.inc_value("sitemap/unchanged", len(batch) - len(changed))
+            batch = changed
+        tasks = [{"url": loc, "meta": {"source": "sitemap", "lastmod": lastmod}} for _, loc, lastmod in batch]
+        queued = self.url_queue.push_each(tasks, batch_size=self.batch_size) if tasks else []
+        pushed = sum(queued)
+        if self.use_lastmod:
+            # 只记录实际入队的房源：被去重窗口拒绝的变化下次运行时仍会被发现并推送
+            lastmods = {external_id: lastmod for (external_id, _, lastmod), ok in zip(batch, queued)
+                        if ok and lastmod}
+            if lastmods:
+                self.url_queue.redis_client.hset(self.listing_lastmod_key, mapping=lastmods)
+        stats.inc_value("sitemap/pushed", pushed)
+        stats.inc_value("sitemap/duplicate", len(tasks) - pushed)
@@ -0,0 +1,208 @@
+"""Scalable Bloom filters: a Redis-backed one for the dupefilter and an
+in-memory one with the same interface for tests."""
+import hashlib
+import math
+
+from . import defaults
+
+# Check every filter of the chain and insert into the newest one, in one call.
+#
+# KEYS[1] meta hash (fields "filters" and "count:<i>"), KEYS[2..] filter bitmaps
+# ARGV[1] capacity of the newest filter, then per filter: k, k bit offsets
+# Returns {seen (0/1, or -1 if the caller's chain is stale), number of filters}.
+ADD_SCRIPT = """
+local nfilters = #KEYS - 1
+local current = tonumber(redis.call("HGET", KEYS[1], "filters") or "1")
+if current > nfilters then
+  return {-1, current}
+end
+local capacity = tonumber(ARGV[1])
+local pos = 2
+for f = 1, nfilters do
+  local k = tonumber(ARGV[pos])
+  local present = true
+  for j = 1, k do
+    if redis.call("GETBIT", KEYS[f + 1], ARGV[pos + j]) == 0 then
+      present = false
+      break
+    end
+  end
+  if present then
+    return {1, current}
+  end
+  if f == nfilters then
+    for j = 1, k do
+      redis.call("SETBIT", KEYS[f + 1], ARGV[pos + j], 1)
+    end
+    if redis.call("HINCRBY", KEYS[1], "count:" .. (f - 1), 1) >= capacity then
+      current = current + 1
+      redis.call("HSET", KEYS[1], "filters", current)
+    end
+  end
+  pos = pos + k + 1
+end
+return {0, current}
+"""
+
+
+def bloom_parameters(capacity, error_rate):
+    """Returns ``(bits, hashes)`` of a Bloom filter holding ``capacity`` items
+    at ``error_rate`` false positives."""
+    bits = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+    hashes = max(1, round(bits / capacity * math.log(2)))
+    return bits, hashes
+
+
+def bloom_offsets(item, bits, hashes):
+    """Returns the ``hashes`` bit offsets of ``item`` (double hashing)."""
+    if isinstance(item, str):
+        item = item.encode()
+    digest = hashlib.blake2b(item, digest_size=16).digest()
+    h1 = int.from_bytes(digest[:8], "little")
+    h2 = int.from_bytes(digest[8:], "little") | 1
+    return [(h1 + i * h2) % bits for i in range(hashes)]
+
+
+class ScalableBloomFilter:
+    """Chain of Bloom filters that grows when the newest one is full.
+
+    Filter ``i`` holds ``capacity * growth**i`` items at an error rate of
+    ``error_rate * (1 - tightening) * tightening**i``, so the false-positive
+    rate of the whole chain stays below ``error_rate`` however far it grows.
+
+    Subclasses store the bits and implement ``add`` and ``counts``.
+
+    """
+
+    # Redis bitmaps are limited to 2**32 bits.
+    MAX_BITS = 2 ** 32
+
+    def __init__(self, capacity=defaults.DUPEFILTER_BLOOM_CAPACITY, error_rate=defaults.DUPEFILTER_BLOOM_ERROR_RATE,
+                 growth=defaults.DUPEFILTER_BLOOM_GROWTH, tightening=defaults.DUPEFILTER_BLOOM_TIGHTENING):
+        if capacity < 1 or not 0 < error_rate < 1 or growth < 1 or not 0 < tightening < 1:
+            raise ValueError("invalid Bloom filter parameters")
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.growth = growth
+        self.tightening = tightening
+        self._params = []
+
+    def filter_params(self, index):
+        """Returns ``(capacity, bits, hashes)`` of filter ``index`` of the chain."""
+        while len(self._params) <= index:
+            i = len(self._params)
+            capacity = int(self.capacity * self.growth ** i)
+            bits, hashes = bloom_parameters(
+                capacity, self.error_rate * (1 - self.tightening) * self.tightening ** i)
+            if bits > self.MAX_BITS:
+                raise ValueError(f"Bloom filter {i} needs {bits} bits, more than a Redis bitmap holds")
+            self._params.append((capacity, bits, hashes))
+        return self._params[index]
+
+    def add(self, item):
+        """Adds ``item``; returns True if it was (probably) already present."""
+        raise NotImplementedError
+
+    def counts(self):
+        """Returns the number of items inserted into each filter of the chain."""
+        raise NotImplementedError
+
+    def stats(self):
+        """Returns the size of the chain, its memory and estimated false-positive rate."""
+        counts = self.counts()
+        memory = 0
+        miss = 1.0
+        for i, count in enumerate(counts):
+            _, bits, hashes = self.filter_params(i)
+            memory += bits // 8 + 1
+            # Probability that a new item hits k set bits in this filter.
+            miss *= 1 - (1 - math.exp(-hashes * count / bits)) ** hashes
+        return {
+            "filters": len(counts),
+            "items": sum(counts),
+            "memory_bytes": memory,
+            "error_rate": 1 - miss,
+        }
+
+
+class MemoryScalableBloomFilter(ScalableBloomFilter):
+    """In-process scalable Bloom filter with the same behaviour as
+    ``RedisScalableBloomFilter``, for tests and single-process crawls."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._filters = []
+        self._counts = []
+        self._grow()
+
+    def _grow(self):
+        _, bits, _ = self.filter_params(len(self._filters))
+        self._filters.append(bytearray(bits // 8 + 1))
+        self._counts.append(0)
+
+    def add(self, item):
+        last = len(self._filters) - 1
+        for i, bitmap in enumerate(self._filters):
+            capacity, bits, hashes = self.filter_params(i)
+            offsets = bloom_offsets(item, bits, hashes)
+            if all(bitmap[o >> 3] & (1 << (o & 7)) for o in offsets):
+                return True
+            if i == last:
+                for o in offsets:
+                    bitmap[o >> 3] |= 1 << (o & 7)
+                self._counts[i] += 1
+                if self._counts[i] >= capacity:
+                    self._grow()
+        return False
+
+    def counts(self):
+        return list(self._counts)
+
+    def clear(self):
+        self._filters = []
+        self._counts = []
+        self._grow()
+
+
+class RedisScalableBloomFilter(ScalableBloomFilter):
+    """Scalable Bloom filter stored in Redis bitmaps ``<key>:<i>`` with the
+    chain length and per-filter counts in the hash ``<key>``.
+
+    Each ``add`` computes the bit offsets locally and runs one server-side
+    script that checks every filter and sets the bits in the newest one, so
+    concurrent crawlers sharing the key never race between check and set.
+
+    """
+
+    def __init__(self, server, key, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.server = server
+        self.key = key
+        self._filters = 1
+        self._add = server.register_script(ADD_SCRIPT)
+
+    def add(self, item):
+        while True:
+            keys = [self.key]
+            args = [self.filter_params(self._filters - 1)[0]]
+            for i in range(self._filters):
+                _, bits, hashes = self.filter_params(i)
+                keys.append(f"{self.key}:{i}")
+                args.append(hashes)
+                args.extend(bloom_offsets(item, bits, hashes))
+            seen, filters = self._add(keys=keys, args=args)
+            self._filters = int(filters)
+            # -1: another process grew the chain, retry with the new filter included.
+            if seen != -1:
+                return seen == 1
+
+    def counts(self):
+        meta = self.server.hgetall(self.key)
+        meta = {k.decode() if isinstance(k, bytes) else k: int(v) for k, v in meta.items()}
+        self._filters = max(self._filters, meta.get("filters", 1))
+        return [meta.get(f"count:{i}", 0) for i in range(self._filters)]
+
+    def clear(self):
+        self.counts()
+        self.server.delete(self.key, *(f"{self.key}:{i}" for i in range(self._filters)))
+        self._filters = 1
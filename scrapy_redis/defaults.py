@@ -22,6 +22,24 @@ SCHEDULER_QUEUE_KEY = "%(spider)s:requests"
 SCHEDULER_QUEUE_CLASS = "scrapy_redis.queue.PriorityQueue"
 SCHEDULER_DUPEFILTER_KEY = "%(spider)s:dupefilter"
 SCHEDULER_DUPEFILTER_CLASS = "scrapy_redis.dupefilter.RFPDupeFilter"
+# Bytes of the binary digest stored per fingerprint; 0 keeps 40-char hex.
+DUPEFILTER_FINGERPRINT_BYTES = 0
+# BitmapDupeFilter: numeric id captured from request URLs (first group), and
+# the largest id kept in the bitmap (a bitmap allocates up to its highest bit:
+# 10**8 ids is 12MB); larger ids fall back to fingerprints.
+DUPEFILTER_ID_PATTERN = r"/homes/[^/]+/(\d+)/?$"
+DUPEFILTER_MAX_ID = 10 ** 8
+# BloomDupeFilter: items per filter before the chain grows, target
+# false-positive rate of the whole chain, capacity growth and error tightening
+# ratio of each added filter.
+DUPEFILTER_BLOOM_CAPACITY = 1000000
+DUPEFILTER_BLOOM_ERROR_RATE = 0.001
+DUPEFILTER_BLOOM_GROWTH = 2
+DUPEFILTER_BLOOM_TIGHTENING = 0.5
+# NearCacheDupeFilter: fingerprints kept in the local LRU cache, and seconds
+# between checks of the generation key that invalidates it.
+DUPEFILTER_NEAR_CACHE_SIZE = 100000
+DUPEFILTER_NEAR_CACHE_SYNC_INTERVAL = 10
 SCHEDULER_PERSIST = False
 START_URLS_KEY = "%(name)s:start_urls"
 START_URLS_AS_SET = False
@@ -1,14 +1,14 @@
-import hashlib
-import json
 import logging
+import re
 import time
+from collections import OrderedDict
 
 from scrapy.dupefilters import BaseDupeFilter
-from scrapy.utils.python import to_unicode
-from w3lib.url import canonicalize_url
 
 from . import defaults
+from .bloom import RedisScalableBloomFilter
 from .connection import get_redis_from_settings
+from .fingerprint import request_fingerprint
 
 logger = logging.getLogger(__name__)
 
@@ -23,7 +23,11 @@ class RFPDupeFilter(BaseDupeFilter):
 
     logger = logger
 
-    def __init__(self, server, key, debug=False):
+    # True when ``request_seen`` is exactly "SADD the fingerprint to ``key``":
+    # the scheduler may then dedupe and enqueue a batch in one Redis script.
+    fingerprint_set = True
+
+    def __init__(self, server, key, debug=False, fingerprint_size=0):
         """Initialize the duplicates filter.
 
         Parameters
@@ -34,11 +38,15 @@ class RFPDupeFilter(BaseDupeFilter):
             Redis key Where to store fingerprints.
         debug : bool, optional
             Whether to log filtered requests.
+        fingerprint_size : int, optional
+            Store the first ``fingerprint_size`` bytes of the binary digest
+            instead of the 40-character hex digest (0).
 
         """
         self.server = server
         self.key = key
         self.debug = debug
+        self.fingerprint_size = fingerprint_size
         self.logdupes = True
 
     @classmethod
@@ -67,7 +75,19 @@ class RFPDupeFilter(BaseDupeFilter):
         # TODO: Use SCRAPY_JOB env as default and fallback to timestamp.
         key = defaults.DUPEFILTER_KEY % {"timestamp": int(time.time())}
         debug = settings.getbool("DUPEFILTER_DEBUG")
-        return cls(server, key=key, debug=debug)
+        return cls(server, key=key, debug=debug, **cls.settings_kwargs(settings))
+
+    @classmethod
+    def settings_kwargs(cls, settings):
+        """Returns extra constructor arguments read from settings.
+
+        Subclasses extend it (cooperatively, via ``super()``) so that
+        ``from_settings`` and ``from_spider`` need not be overridden.
+
+        """
+        return {
+            "fingerprint_size": settings.getint("DUPEFILTER_FINGERPRINT_BYTES", defaults.DUPEFILTER_FINGERPRINT_BYTES),
+        }
 
     @classmethod
     def from_crawler(cls, crawler):
@@ -102,6 +122,20 @@ class RFPDupeFilter(BaseDupeFilter):
         added = self.server.sadd(self.key, fp)
         return added == 0
 
+    def requests_seen(self, requests):
+        """Batch version of ``request_seen``.
+
+        Parameters
+        ----------
+        requests : list of scrapy.http.Request
+
+        Returns
+        -------
+        list of bool
+
+        """
+        return [self.request_seen(request) for request in requests]
+
     def request_fingerprint(self, request):
         """Returns a fingerprint for a given request.
 
@@ -111,16 +145,11 @@ class RFPDupeFilter(BaseDupeFilter):
 
         Returns
         -------
-        str
+        str or bytes
+            The hex digest, or ``fingerprint_size`` bytes of the binary digest.
 
         """
-        fingerprint_data = {
-            "method": to_unicode(request.method),
-            "url": canonicalize_url(request.url),
-            "body": (request.body or b"").hex(),
-        }
-        fingerprint_json = json.dumps(fingerprint_data, sort_keys=True)
-        return hashlib.sha1(fingerprint_json.encode()).hexdigest()
+        return request_fingerprint(request, self.fingerprint_size)
 
     @classmethod
     def from_spider(cls, spider):
@@ -131,7 +160,7 @@ class RFPDupeFilter(BaseDupeFilter):
         )
         key = dupefilter_key % {"spider": spider.name}
         debug = settings.getbool("DUPEFILTER_DEBUG")
-        return cls(server, key=key, debug=debug)
+        return cls(server, key=key, debug=debug, **cls.settings_kwargs(settings))
 
     def close(self, reason=""):
         """Delete data on close. Called by Scrapy's scheduler.
@@ -167,3 +196,385 @@ class RFPDupeFilter(BaseDupeFilter):
             )
             self.logger.debug(msg, {"request": request}, extra={"spider": spider})
             self.logdupes = False
+
+
+class BitmapDupeFilter(RFPDupeFilter):
+    """Redis bitmap duplicates filter for URLs that end in a numeric id.
+
+    GET requests whose URL matches ``id_pattern`` (``DUPEFILTER_ID_PATTERN``,
+    by default a listing detail page ``/homes/<slug>/<digits>``) are tracked
+    by a single bit at offset ``<id>`` in ``<key>:bits``: one ``SETBIT`` per
+    request, O(1), and the whole id space of a site fits in a few megabytes.
+    Redis allocates a bitmap up to its highest set bit, so ids above
+    ``max_id`` (``DUPEFILTER_MAX_ID``) are not put in the bitmap. Every other
+    request falls back to the fingerprint set at ``key``, exactly like
+    ``RFPDupeFilter``.
+
+    Enable with ``DUPEFILTER_CLASS = "scrapy_redis.dupefilter.BitmapDupeFilter"``.
+
+    """
+
+    # Redis bitmaps are limited to 2**32 bits (512MB).
+    MAX_ID = 2 ** 32 - 1
+
+    fingerprint_set = False
+
+    def __init__(self, server, key, debug=False, id_pattern=defaults.DUPEFILTER_ID_PATTERN,
+                 max_id=defaults.DUPEFILTER_MAX_ID, **kwargs):
+        """Initialize the duplicates filter.
+
+        Parameters
+        ----------
+        server : redis.StrictRedis
+            The redis server instance.
+        key : str
+            Redis key where to store fingerprints; the bitmap is ``<key>:bits``.
+        debug : bool, optional
+            Whether to log filtered requests.
+        id_pattern : str, optional
+            Regular expression whose first group captures the numeric id.
+        max_id : int, optional
+            Largest id tracked in the bitmap, at most ``MAX_ID``.
+
+        """
+        super().__init__(server, key, debug=debug, **kwargs)
+        self.bits_key = f"{key}:bits"
+        self.id_pattern = re.compile(id_pattern)
+        self.max_id = min(int(max_id), self.MAX_ID)
+
+    @classmethod
+    def settings_kwargs(cls, settings):
+        kwargs = super().settings_kwargs(settings)
+        kwargs["id_pattern"] = settings.get("DUPEFILTER_ID_PATTERN", defaults.DUPEFILTER_ID_PATTERN)
+        kwargs["max_id"] = settings.getint("DUPEFILTER_MAX_ID", defaults.DUPEFILTER_MAX_ID)
+        return kwargs
+
+    def request_id(self, request):
+        """Returns the numeric id tracked in the bitmap, or None to use a fingerprint."""
+        if request.method != "GET" or request.body:
+            return None
+        match = self.id_pattern.search(request.url)
+        if not match:
+            return None
+        request_id = int(match.group(1))
+        return request_id if request_id <= self.max_id else None
+
+    def request_seen(self, request):
+        request_id = self.request_id(request)
+        if request_id is None:
+            return super().request_seen(request)
+        # SETBIT returns the previous bit.
+        return self.server.setbit(self.bits_key, request_id, 1) == 1
+
+    def requests_seen(self, requests):
+        """Batch version of ``request_seen``: all bits in one pipelined round trip."""
+        ids = [self.request_id(request) for request in requests]
+        others = iter(super().requests_seen([r for r, i in zip(requests, ids) if i is None]))
+        pipe = self.server.pipeline(transaction=False)
+        for request_id in ids:
+            if request_id is not None:
+                pipe.setbit(self.bits_key, request_id, 1)
+        bits = iter(pipe.execute())
+        return [next(others) if request_id is None else next(bits) == 1 for request_id in ids]
+
+    def mark_ids(self, ids, batch_size=10000):
+        """Marks ids as seen, one pipelined round trip per batch.
+
+        Parameters
+        ----------
+        ids : iterable of int
+        batch_size : int, optional
+
+        Returns
+        -------
+        tuple
+            ``(marked, new)``: ids processed and ids that were not yet set.
+
+        """
+        marked = new = 0
+        pipe = self.server.pipeline(transaction=False)
+        for request_id in ids:
+            if not 0 <= request_id <= self.max_id:
+                continue
+            pipe.setbit(self.bits_key, request_id, 1)
+            marked += 1
+            if marked % batch_size == 0:
+                new += pipe.execute().count(0)
+        new += pipe.execute().count(0)
+        return marked, new
+
+    def clear(self):
+        """Clears the bitmap and fingerprints data."""
+        super().clear()
+        self.server.delete(self.bits_key)
+
+
+class BloomDupeFilter(RFPDupeFilter):
+    """Redis scalable Bloom filter duplicates filter.
+
+    Fingerprints go into a ``RedisScalableBloomFilter`` at ``<key>:bloom``
+    instead of a set: memory is fixed by ``DUPEFILTER_BLOOM_CAPACITY`` and
+    ``DUPEFILTER_BLOOM_ERROR_RATE`` and grows by chaining a new filter only
+    when the current one is full. A false positive drops a request that was
+    never crawled, with probability below the configured error rate.
+
+    The chain size, memory and estimated false-positive rate are reported in
+    the crawl stats under ``dupefilter/bloom/``.
+
+    Enable with ``DUPEFILTER_CLASS = "scrapy_redis.dupefilter.BloomDupeFilter"``;
+    ``BitmapBloomDupeFilter`` keeps numeric-id URLs in a bitmap and the rest
+    in the Bloom filter.
+
+    """
+
+    # Refresh the reported stats every this many new requests.
+    stats_interval = 1000
+
+    fingerprint_set = False
+
+    def __init__(self, server, key, debug=False, bloom=None, capacity=defaults.DUPEFILTER_BLOOM_CAPACITY,
+                 error_rate=defaults.DUPEFILTER_BLOOM_ERROR_RATE, growth=defaults.DUPEFILTER_BLOOM_GROWTH,
+                 tightening=defaults.DUPEFILTER_BLOOM_TIGHTENING, **kwargs):
+        """Initialize the duplicates filter.
+
+        Parameters
+        ----------
+        server : redis.StrictRedis
+            The redis server instance.
+        key : str
+            Redis key prefix; the filter chain lives at ``<key>:bloom``.
+        debug : bool, optional
+            Whether to log filtered requests.
+        bloom : ScalableBloomFilter, optional
+            Filter to use instead of a Redis one (e.g. ``MemoryScalableBloomFilter``
+            in tests); the sizing arguments are then ignored.
+        capacity, error_rate, growth, tightening : optional
+            Sizing of the Redis filter chain, see ``ScalableBloomFilter``.
+
+        """
+        super().__init__(server, key, debug=debug, **kwargs)
+        if bloom is None:
+            bloom = RedisScalableBloomFilter(server, f"{key}:bloom", capacity=capacity, error_rate=error_rate,
+                                             growth=growth, tightening=tightening)
+        self.bloom = bloom
+        self.stats = None
+        self._added = 0
+
+    @classmethod
+    def settings_kwargs(cls, settings):
+        kwargs = super().settings_kwargs(settings)
+        kwargs.update(
+            capacity=settings.getint("DUPEFILTER_BLOOM_CAPACITY", defaults.DUPEFILTER_BLOOM_CAPACITY),
+            error_rate=settings.getfloat("DUPEFILTER_BLOOM_ERROR_RATE", defaults.DUPEFILTER_BLOOM_ERROR_RATE),
+            growth=settings.getfloat("DUPEFILTER_BLOOM_GROWTH", defaults.DUPEFILTER_BLOOM_GROWTH),
+            tightening=settings.getfloat("DUPEFILTER_BLOOM_TIGHTENING", defaults.DUPEFILTER_BLOOM_TIGHTENING),
+        )
+        return kwargs
+
+    @classmethod
+    def from_spider(cls, spider):
+        df = super().from_spider(spider)
+        crawler = getattr(spider, "crawler", None)
+        df.stats = getattr(crawler, "stats", None)
+        return df
+
+    def request_seen(self, request):
+        seen = self.bloom.add(self.request_fingerprint(request))
+        if not seen:
+            self._added += 1
+            if self._added % self.stats_interval == 1:
+                self.report_stats()
+        return seen
+
+    def report_stats(self):
+        """Copies the size, memory and estimated false-positive rate of the
+        filter chain into the crawl stats."""
+        if self.stats is None:
+            return
+        for name, value in self.bloom.stats().items():
+            self.stats.set_value(f"dupefilter/bloom/{name}", value)
+
+    def close(self, reason=""):
+        self.report_stats()
+        super().close(reason)
+
+    def clear(self):
+        """Clears the filter chain and any fingerprints data."""
+        super().clear()
+        self.bloom.clear()
+
+
+class BitmapBloomDupeFilter(BitmapDupeFilter, BloomDupeFilter):
+    """Numeric-id URLs in a bitmap (``BitmapDupeFilter``), every other
+    request in a scalable Bloom filter (``BloomDupeFilter``): no part of the
+    dupefilter grows without bound."""
+
+
+class NearCacheDupeFilter(RFPDupeFilter):
+    """Duplicates filter with a local near cache in front of Redis.
+
+    Fingerprints this process has already sent to Redis (whether they were
+    new or not) are kept in a bounded LRU cache and answered locally: the same
+    listing cards repeated across search pages are then filtered without a
+    round trip. Fingerprints are never removed from Redis except by
+    ``clear``, so a cached entry can only go stale when the filter is
+    cleared. ``clear`` increments the ``<key>:generation`` counter, and every
+    process re-reads it at most every ``sync_interval`` seconds and drops its
+    cache when it changed.
+
+    Cache hits, misses and the hit rate are reported in the crawl stats under
+    ``dupefilter/near_cache/``.
+
+    Enable with ``DUPEFILTER_CLASS = "scrapy_redis.dupefilter.NearCacheDupeFilter"``;
+    combine it with another filter by putting it first in the bases, e.g.
+    ``NearCacheBitmapBloomDupeFilter``.
+
+    """
+
+    # Hits must not reach Redis: the scheduler goes through ``requests_seen``.
+    fingerprint_set = False
+
+    def __init__(self, server, key, debug=False, cache_size=defaults.DUPEFILTER_NEAR_CACHE_SIZE,
+                 sync_interval=defaults.DUPEFILTER_NEAR_CACHE_SYNC_INTERVAL, **kwargs):
+        """Initialize the duplicates filter.
+
+        Parameters
+        ----------
+        server : redis.StrictRedis
+            The redis server instance.
+        key : str
+            Redis key where to store fingerprints.
+        debug : bool, optional
+            Whether to log filtered requests.
+        cache_size : int, optional
+            Maximum number of fingerprints in the local cache.
+        sync_interval : float, optional
+            Seconds between checks of the generation key.
+
+        """
+        super().__init__(server, key, debug=debug, **kwargs)
+        if cache_size < 1:
+            raise ValueError("near cache size must be >= 1")
+        self.generation_key = f"{key}:generation"
+        self.cache_size = cache_size
+        self.sync_interval = sync_interval
+        self.stats = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._cache = OrderedDict()
+        self._generation = 0
+        self._synced_at = None
+        # Set while the batch path asks the filter behind the cache, whose
+        # ``requests_seen`` may call back into ``request_seen``.
+        self._behind_cache = False
+
+    @classmethod
+    def settings_kwargs(cls, settings):
+        kwargs = super().settings_kwargs(settings)
+        kwargs.update(
+            cache_size=settings.getint("DUPEFILTER_NEAR_CACHE_SIZE", defaults.DUPEFILTER_NEAR_CACHE_SIZE),
+            sync_interval=settings.getfloat("DUPEFILTER_NEAR_CACHE_SYNC_INTERVAL",
+                                            defaults.DUPEFILTER_NEAR_CACHE_SYNC_INTERVAL),
+        )
+        return kwargs
+
+    @classmethod
+    def from_spider(cls, spider):
+        df = super().from_spider(spider)
+        crawler = getattr(spider, "crawler", None)
+        df.stats = getattr(crawler, "stats", None)
+        return df
+
+    def sync(self):
+        """Drops the local cache if the filter was cleared since the last sync."""
+        generation = int(self.server.get(self.generation_key) or 0)
+        if self._synced_at is not None and generation != self._generation:
+            self._cache.clear()
+            self.invalidations += 1
+            self.logger.info("Dupefilter %s was cleared, dropped the near cache", self.key)
+        self._generation = generation
+        self._synced_at = time.monotonic()
+        self.report_stats()
+
+    def _maybe_sync(self):
+        if self._synced_at is None or time.monotonic() - self._synced_at >= self.sync_interval:
+            self.sync()
+
+    def _cached(self, fp):
+        if fp in self._cache:
+            self._cache.move_to_end(fp)
+            self.hits += 1
+            return True
+        self.misses += 1
+        return False
+
+    def _remember(self, fp):
+        self._cache[fp] = None
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def request_seen(self, request):
+        if self._behind_cache:
+            return super().request_seen(request)
+        self._maybe_sync()
+        fp = self.request_fingerprint(request)
+        if self._cached(fp):
+            return True
+        seen = super().request_seen(request)
+        # Seen or not, the fingerprint is in Redis now.
+        self._remember(fp)
+        return seen
+
+    def requests_seen(self, requests):
+        """Batch version of ``request_seen``: only cache misses go to Redis."""
+        self._maybe_sync()
+        fps = [self.request_fingerprint(request) for request in requests]
+        cached = [self._cached(fp) for fp in fps]
+        self._behind_cache = True
+        try:
+            misses = iter(super().requests_seen([r for r, hit in zip(requests, cached) if not hit]))
+        finally:
+            self._behind_cache = False
+        seen = []
+        for fp, hit in zip(fps, cached):
+            if hit:
+                seen.append(True)
+                continue
+            # A fingerprint repeated in the batch was answered by Redis in order.
+            seen.append(next(misses))
+            self._remember(fp)
+        return seen
+
+    def report_stats(self):
+        """Copies the near cache counters into the crawl stats."""
+        if self.stats is None:
+            return
+        # Also refreshes the stats of the filter behind the cache, if any.
+        super_report = getattr(super(), "report_stats", None)
+        if super_report is not None:
+            super_report()
+        lookups = self.hits + self.misses
+        self.stats.set_value("dupefilter/near_cache/hits", self.hits)
+        self.stats.set_value("dupefilter/near_cache/misses", self.misses)
+        self.stats.set_value("dupefilter/near_cache/hit_rate", self.hits / lookups if lookups else 0.0)
+        self.stats.set_value("dupefilter/near_cache/size", len(self._cache))
+        self.stats.set_value("dupefilter/near_cache/invalidations", self.invalidations)
+
+    def close(self, reason=""):
+        lookups = self.hits + self.misses
+        if lookups:
+            self.logger.info("Dupefilter near cache: %d of %d lookups answered locally (%.1f%%)",
+                             self.hits, lookups, 100.0 * self.hits / lookups)
+        self.report_stats()
+        super().close(reason)
+
+    def clear(self):
+        """Clears fingerprints data and invalidates the near cache of every process."""
+        super().clear()
+        self._cache.clear()
+        self._generation = self.server.incr(self.generation_key)
+
+
+class NearCacheBitmapBloomDupeFilter(NearCacheDupeFilter, BitmapBloomDupeFilter):
+    """``BitmapBloomDupeFilter`` behind a local near cache."""
@@ -5,10 +5,40 @@ except ImportError:
 
 from . import picklecompat
 
+# Push a batch of encoded requests in one call, optionally testing each
+# fingerprint against the dupefilter set first (atomically with the push).
+#
+# KEYS[1] queue, KEYS[2] dupefilter set
+# ARGV[1] "zadd" | "lpush", then (fingerprint or "" for no check, data, score) triples
+# Returns one flag per request: 1 if queued, 0 if it was a duplicate.
+PUSH_MANY_SCRIPT = """
+local zadd = ARGV[1] == "zadd"
+local queued = {}
+for i = 2, #ARGV, 3 do
+  local fresh = 1
+  if ARGV[i] ~= "" then
+    fresh = redis.call("SADD", KEYS[2], ARGV[i])
+  end
+  if fresh == 1 then
+    if zadd then
+      redis.call("ZADD", KEYS[1], ARGV[i + 2], ARGV[i + 1])
+    else
+      redis.call("LPUSH", KEYS[1], ARGV[i + 1])
+    end
+  end
+  queued[#queued + 1] = fresh
+end
+return queued
+"""
+
 
 class Base:
     """Per-spider base queue class"""
 
+    # How ``push_many`` inserts requests: "zadd" or "lpush"; None means the
+    # queue has no batch support and ``push_many`` falls back to ``push``.
+    push_mode = None
+
     def __init__(self, server, spider, key, serializer=None):
         """Initialize per-spider redis queue.
 
@@ -41,6 +71,7 @@ class Base:
         self.spider = spider
         self.key = key % {"spider": spider.name}
         self.serializer = serializer
+        self._push_many = server.register_script(PUSH_MANY_SCRIPT)
 
     def _encode_request(self, request):
         """Encode a request object"""
@@ -63,6 +94,44 @@ class Base:
         """Push a request"""
         raise NotImplementedError
 
+    def push_many(self, requests, fingerprints=None, dupefilter_key=None):
+        """Push many requests in one round trip.
+
+        Parameters
+        ----------
+        requests : list of Request
+        fingerprints : list, optional
+            One fingerprint per request (empty for requests that must not be
+            filtered). Each is added to the ``dupefilter_key`` set and the
+            request is only queued if it was not a member yet, atomically
+            for the whole batch.
+        dupefilter_key : str, optional
+            Redis set holding the fingerprints.
+
+        Returns
+        -------
+        list of bool
+            Whether each request was queued (False: duplicate).
+
+        """
+        if self.push_mode is None:
+            if fingerprints is not None:
+                raise NotImplementedError(f"{type(self).__name__} cannot dedupe while pushing")
+            for request in requests:
+                self.push(request)
+            return [True] * len(requests)
+        if not requests:
+            return []
+        args = [self.push_mode]
+        for i, request in enumerate(requests):
+            args.extend((fingerprints[i] if fingerprints else "", self._encode_request(request),
+                         self._score(request)))
+        queued = self._push_many(keys=[self.key, dupefilter_key or self.key], args=args)
+        return [flag == 1 for flag in queued]
+
+    def _score(self, request):
+        return 0
+
     def pop(self, timeout=0):
         """Pop a request"""
         raise NotImplementedError
@@ -75,6 +144,8 @@ class Base:
 class FifoQueue(Base):
     """Per-spider FIFO queue"""
 
+    push_mode = "lpush"
+
     def __len__(self):
         """Return the length of the queue"""
         return self.server.llen(self.key)
@@ -98,6 +169,8 @@ class FifoQueue(Base):
 class PriorityQueue(Base):
     """Per-spider priority queue abstraction using redis' sorted set"""
 
+    push_mode = "zadd"
+
     def __len__(self):
         """Return the length of the queue"""
         return self.server.zcard(self.key)
@@ -111,6 +184,9 @@ class PriorityQueue(Base):
         # kwargs only accepts strings, not bytes.
         self.server.execute_command("ZADD", self.key, score, data)
 
+    def _score(self, request):
+        return -request.priority
+
     def pop(self, timeout=0):
         """
         Pop a request
@@ -128,6 +204,8 @@ class PriorityQueue(Base):
 class LifoQueue(Base):
     """Per-spider LIFO queue."""
 
+    push_mode = "lpush"
+
     def __len__(self):
         """Return the length of the stack"""
         return self.server.llen(self.key)
@@ -1,5 +1,7 @@
 import importlib
+import time
 
+from scrapy import signals
 from scrapy.utils.misc import load_object
 
 from . import connection, defaults
@@ -27,6 +29,11 @@ class Scheduler:
         Scheduler dupefilter class.
     SCHEDULER_SERIALIZER : str
         Scheduler serializer.
+    SCHEDULER_ENQUEUE_BATCH_SIZE : int (default: 0)
+        Buffer enqueued requests and write them in batches of this size
+        (write-behind); 0 writes every request immediately.
+    SCHEDULER_ENQUEUE_FLUSH_INTERVAL : float (default: 1.0)
+        Maximum seconds a buffered request waits before it is written.
 
     """
 
@@ -42,6 +49,8 @@ class Scheduler:
         dupefilter_cls=defaults.SCHEDULER_DUPEFILTER_CLASS,
         idle_before_close=0,
         serializer=None,
+        enqueue_batch_size=0,
+        enqueue_flush_interval=1.0,
     ):
         """Initialize scheduler.
 
@@ -65,6 +74,16 @@ class Scheduler:
             Importable path to the dupefilter class.
         idle_before_close : int
             Timeout before giving up.
+        enqueue_batch_size : int
+            Buffer up to this many requests and dedupe + enqueue them in one
+            round trip. With the default ``RFPDupeFilter`` and a built-in
+            queue the whole batch goes through a single Redis script that
+            tests the fingerprints and queues the new requests atomically.
+            0 disables buffering.
+        enqueue_flush_interval : float
+            Maximum seconds a request stays in the buffer. The buffer is
+            also flushed when the queue runs dry, when the spider goes idle
+            and on close.
 
         """
         if idle_before_close < 0:
@@ -81,9 +100,14 @@ class Scheduler:
         self.idle_before_close = idle_before_close
         self.serializer = serializer
         self.stats = None
+        self.crawler = None
+        self.enqueue_batch_size = enqueue_batch_size
+        self.enqueue_flush_interval = enqueue_flush_interval
+        self._buffer = []
+        self._buffered_at = 0
 
     def __len__(self):
-        return len(self.queue)
+        return len(self.queue) + len(self._buffer)
 
     @classmethod
     def from_settings(cls, settings):
@@ -91,6 +115,8 @@ class Scheduler:
             "persist": settings.getbool("SCHEDULER_PERSIST"),
             "flush_on_start": settings.getbool("SCHEDULER_FLUSH_ON_START"),
             "idle_before_close": settings.getint("SCHEDULER_IDLE_BEFORE_CLOSE"),
+            "enqueue_batch_size": settings.getint("SCHEDULER_ENQUEUE_BATCH_SIZE"),
+            "enqueue_flush_interval": settings.getfloat("SCHEDULER_ENQUEUE_FLUSH_INTERVAL", 1.0),
         }
 
         # If these values are missing, it means we want to use the defaults.
@@ -128,6 +154,7 @@ class Scheduler:
         instance = cls.from_settings(crawler.settings)
         # FIXME: for now, stats are only supported from this constructor
         instance.stats = crawler.stats
+        instance.crawler = crawler
         return instance
 
     def open(self, spider):
@@ -148,6 +175,9 @@ class Scheduler:
         if not self.df:
             self.df = load_object(self.dupefilter_cls).from_spider(spider)
 
+        if self.enqueue_batch_size and self.crawler is not None:
+            self.crawler.signals.connect(self.flush_enqueue_buffer, signal=signals.spider_idle)
+
         if self.flush_on_start:
             self.flush()
         # notice if there are requests already in the queue to resume the crawl
@@ -155,14 +185,25 @@ class Scheduler:
             spider.log(f"Resuming crawl ({len(self.queue)} requests scheduled)")
 
     def close(self, reason):
+        self.flush_enqueue_buffer()
         if not self.persist:
             self.flush()
 
     def flush(self):
+        self._buffer = []
         self.df.clear()
         self.queue.clear()
 
     def enqueue_request(self, request):
+        if self.enqueue_batch_size:
+            if not self._buffer:
+                self._buffered_at = time.monotonic()
+            self._buffer.append(request)
+            if len(self._buffer) >= self.enqueue_batch_size or self._flush_due():
+                self.flush_enqueue_buffer()
+            # Duplicates are only known at flush time; they are logged and
+            # reported through the request_dropped signal then.
+            return True
         if not request.dont_filter and self.df.request_seen(request):
             self.df.log(request, self.spider)
             return False
@@ -171,9 +212,55 @@ class Scheduler:
         self.queue.push(request)
         return True
 
+    def _flush_due(self):
+        return bool(self._buffer) and time.monotonic() - self._buffered_at >= self.enqueue_flush_interval
+
+    def flush_enqueue_buffer(self, spider=None):
+        """Writes the buffered requests: one dedupe-and-enqueue round trip.
+
+        Returns
+        -------
+        int
+            Number of requests queued (the rest were duplicates).
+
+        """
+        batch, self._buffer = self._buffer, []
+        if not batch:
+            return 0
+        if getattr(self.df, "fingerprint_set", False) and self.queue.push_mode is not None:
+            fingerprints = ["" if r.dont_filter else self.df.request_fingerprint(r) for r in batch]
+            queued = self.queue.push_many(batch, fingerprints=fingerprints, dupefilter_key=self.df.key)
+        else:
+            filtered = [r for r in batch if not r.dont_filter]
+            if hasattr(self.df, "requests_seen"):
+                seen = iter(self.df.requests_seen(filtered))
+            else:
+                seen = iter([self.df.request_seen(r) for r in filtered])
+            queued = [r.dont_filter or not next(seen) for r in batch]
+            self.queue.push_many([r for r, q in zip(batch, queued) if q])
+
+        enqueued = 0
+        for request, is_new in zip(batch, queued):
+            if is_new:
+                enqueued += 1
+                continue
+            self.df.log(request, self.spider)
+            if self.crawler is not None:
+                self.crawler.signals.send_catch_log(signals.request_dropped, request=request, spider=self.spider)
+        if self.stats and enqueued:
+            self.stats.inc_value("scheduler/enqueued/redis", enqueued, spider=self.spider)
+        return enqueued
+
     def next_request(self):
+        if self._flush_due():
+            self.flush_enqueue_buffer()
         block_pop_timeout = self.idle_before_close
-        request = self.queue.pop(block_pop_timeout)
+        # Do not block on an empty queue while requests wait in the buffer.
+        request = self.queue.pop(0 if self._buffer else block_pop_timeout)
+        if request is None and self._buffer:
+            # The queue ran dry while requests wait in the buffer.
+            self.flush_enqueue_buffer()
+            request = self.queue.pop(block_pop_timeout)
         if request and self.stats:
             self.stats.inc_value("scheduler/dequeued/redis", spider=self.spider)
         return request
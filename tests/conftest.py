@@ -0,0 +1,32 @@
+import os
+import uuid
+
+import pytest
+
+
+@pytest.fixture
+def redis_url():
+    return os.environ.get("REDIS_URL", "redis://localhost:6379")
+
+
+@pytest.fixture
+def redis_server(redis_url):
+    """REDIS_URL（默认本机）上的 Redis 连接，连不上时跳过测试。"""
+    redis = pytest.importorskip("redis")
+    server = redis.Redis.from_url(redis_url)
+    try:
+        server.ping()
+    except redis.ConnectionError:
+        pytest.skip("Redis is not available")
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def redis_key(redis_server):
+    """本测试独占的 key 前缀，测试结束后删除该前缀下的所有 key。"""
+    prefix = f"test:{uuid.uuid4().hex}"
+    yield prefix
+    keys = list(redis_server.scan_iter(f"{prefix}*"))
+    if keys:
+        redis_server.delete(*keys)
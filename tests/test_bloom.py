@@ -0,0 +1,72 @@
+"""Redis 可扩展布隆过滤器：ADD_SCRIPT 跨过滤器链检查、写入最新过滤器、满容量扩展，以及过期链长度的重试。"""
+import pytest
+
+pytest.importorskip("redis")
+
+from scrapy_redis.bloom import MemoryScalableBloomFilter, RedisScalableBloomFilter
+
+
+def redis_bloom(server, key, **kwargs):
+    kwargs.setdefault("capacity", 50)
+    kwargs.setdefault("error_rate", 0.01)
+    return RedisScalableBloomFilter(server, f"{key}:bloom", **kwargs)
+
+
+def test_grows_past_capacity_without_false_negatives(redis_server, redis_key):
+    bloom = redis_bloom(redis_server, redis_key)
+    items = [f"fp-{i}" for i in range(400)]
+    false_positives = sum(bloom.add(item) for item in items)
+    counts = bloom.counts()
+    # 50 + 100 + 200 < 400：链扩展到第 4 个过滤器
+    assert len(counts) == 4
+    assert counts[:3] == [50, 100, 200]
+    assert sum(counts) == len(items) - false_positives
+    assert false_positives <= 4
+    assert all(bloom.add(item) for item in items)
+    assert bloom.stats()["error_rate"] < 0.01
+
+
+def test_matches_memory_filter(redis_server, redis_key):
+    bloom = redis_bloom(redis_server, redis_key)
+    memory = MemoryScalableBloomFilter(capacity=50, error_rate=0.01)
+    items = [f"fp-{i % 300}" for i in range(600)]
+    assert [bloom.add(item) for item in items] == [memory.add(item) for item in items]
+    assert bloom.counts() == memory.counts()
+
+
+def test_stale_chain_length_is_retried(redis_server, redis_key):
+    first = redis_bloom(redis_server, redis_key, capacity=10)
+    second = redis_bloom(redis_server, redis_key, capacity=10)
+    assert not second.add("early")
+    # first 把链扩展到第二个过滤器，second 仍以为只有一个
+    for i in range(15):
+        first.add(f"fp-{i}")
+    assert first._filters == 2
+    assert second._filters == 1
+
+    calls = []
+    script = second._add
+
+    def spy(keys, args):
+        result = script(keys=keys, args=args)
+        calls.append(result[0])
+        return result
+
+    second._add = spy
+    # fp-14 只在第二个过滤器中
+    assert second.add("fp-14")
+    assert calls == [-1, 1]
+    assert second._filters == 2
+    assert second.add("early")
+    assert not second.add("late")
+    assert first.counts() == [10, 7]
+
+
+def test_clear_removes_every_filter(redis_server, redis_key):
+    bloom = redis_bloom(redis_server, redis_key, capacity=10)
+    for i in range(25):
+        bloom.add(f"fp-{i}")
+    bloom.clear()
+    assert not list(redis_server.scan_iter(f"{redis_key}:bloom*"))
+    assert not bloom.add("fp-0")
+    assert bloom.counts() == [1]
@@ -0,0 +1,89 @@
+"""Redis 去重：requests_seen 按请求顺序返回结果（批内重复只有第一个为新请求）。"""
+import pytest
+
+pytest.importorskip("scrapy")
+
+from scrapy import Request
+
+from scrapy_redis.bloom import MemoryScalableBloomFilter
+from scrapy_redis.dupefilter import (
+    BitmapBloomDupeFilter, BitmapDupeFilter, BloomDupeFilter, NearCacheBitmapBloomDupeFilter,
+    NearCacheDupeFilter, RFPDupeFilter,
+)
+
+LISTING = "https://www.homely.com.au/homes/105-conrad-street-st-albans-vic-3021/%d"
+SEARCH = "https://www.homely.com.au/for-sale/st-albans-vic-3021/real-estate?page=%d"
+
+
+def listing(listing_id):
+    return Request(LISTING % listing_id)
+
+
+def search(page):
+    return Request(SEARCH % page)
+
+
+def memory_bloom():
+    return MemoryScalableBloomFilter(capacity=100, error_rate=0.001)
+
+
+@pytest.fixture(params=["rfp", "bitmap", "bloom", "bitmap_bloom", "near_cache", "near_cache_bitmap_bloom"])
+def dupefilter(request, redis_server, redis_key):
+    key = f"{redis_key}:dupefilter"
+    if request.param == "rfp":
+        return RFPDupeFilter(redis_server, key)
+    if request.param == "bitmap":
+        return BitmapDupeFilter(redis_server, key)
+    if request.param == "bloom":
+        return BloomDupeFilter(redis_server, key, bloom=memory_bloom())
+    if request.param == "bitmap_bloom":
+        return BitmapBloomDupeFilter(redis_server, key, bloom=memory_bloom())
+    if request.param == "near_cache":
+        return NearCacheDupeFilter(redis_server, key)
+    return NearCacheBitmapBloomDupeFilter(redis_server, key, bloom=memory_bloom())
+
+
+def test_requests_seen_keeps_order(dupefilter):
+    batch = [listing(1), search(1), listing(1), listing(2), search(1), search(2)]
+    assert dupefilter.requests_seen(batch) == [False, False, True, False, True, False]
+    assert dupefilter.requests_seen([search(2), listing(3), listing(2), search(3)]) == [True, False, True, False]
+    # 单个请求与批量接口共享同一份去重数据
+    assert dupefilter.request_seen(listing(3))
+    assert not dupefilter.request_seen(listing(4))
+
+
+def test_requests_seen_after_clear(dupefilter):
+    dupefilter.requests_seen([listing(1), search(1)])
+    dupefilter.clear()
+    if isinstance(dupefilter, NearCacheDupeFilter):
+        assert not dupefilter._cache
+    assert dupefilter.requests_seen([listing(1), search(1)]) == [False, False]
+
+
+def test_bitmap_tracks_listing_ids_only(redis_server, redis_key):
+    df = BitmapDupeFilter(redis_server, f"{redis_key}:dupefilter", max_id=1000)
+    assert df.request_id(listing(42)) == 42
+    # 其他以数字结尾的 URL、POST 请求和超过 max_id 的 id 走指纹集合
+    assert df.request_id(Request("https://www.homely.com.au/agents/123")) is None
+    assert df.request_id(Request(LISTING % 42, method="POST", body=b"{}")) is None
+    assert df.request_id(listing(1001)) is None
+    df.requests_seen([listing(42), listing(1001), search(1)])
+    assert redis_server.getbit(df.bits_key, 42) == 1
+    assert redis_server.scard(df.key) == 2
+
+
+def test_near_cache_answers_repeats_locally(redis_server, redis_key):
+    df = NearCacheDupeFilter(redis_server, f"{redis_key}:dupefilter", sync_interval=0)
+    assert df.requests_seen([search(1), search(1)]) == [False, True]
+    assert (df.hits, df.misses) == (0, 2)
+    assert df.requests_seen([search(1), search(2)]) == [True, False]
+    assert (df.hits, df.misses) == (1, 3)
+
+
+def test_near_cache_dropped_when_another_process_clears(redis_server, redis_key):
+    key = f"{redis_key}:dupefilter"
+    df = NearCacheDupeFilter(redis_server, key, sync_interval=0)
+    assert df.requests_seen([search(1)]) == [False]
+    NearCacheDupeFilter(redis_server, key).clear()
+    assert df.requests_seen([search(1)]) == [False]
+    assert df.invalidations == 1
@@ -0,0 +1,23 @@
+"""内嵌 JSON：window.__X_STATE__ 用 JSON 解码器读取，JSON-LD 只映射语义一致的字段。"""
+from realestate_scrapy.extractors.embedded import _window_states, listing_from_json_ld
+
+
+def test_window_state_stops_at_end_of_object():
+    script = ('window.__INITIAL_STATE__ = {"listing": {"id": 1, "title": "} ;"}, "tags": [1]};'
+              'window.dataLayer = [];\n'
+              'function track() { return {"event": "view"}; }\n'
+              'window.__APOLLO_STATE__={"Listing:1": {"bedrooms": 3}}')
+    assert list(_window_states(script)) == [
+        {"listing": {"id": 1, "title": "} ;"}, "tags": [1]},
+        {"Listing:1": {"bedrooms": 3}},
+    ]
+
+
+def test_window_state_skips_non_json():
+    assert list(_window_states("window.__INITIAL_STATE__ = {listing: 1};")) == []
+
+
+def test_number_of_rooms_is_not_bedrooms():
+    fields = listing_from_json_ld([{"@type": "House", "numberOfRooms": 7, "numberOfBathroomsTotal": 2}])
+    assert "bedrooms" not in fields
+    assert fields["bathrooms"] == 2
@@ -0,0 +1,48 @@
+"""request_fingerprint 必须与 RFPDupeFilter 一直写入 Redis 的指纹逐字节一致。"""
+import hashlib
+import json
+
+import pytest
+
+pytest.importorskip("scrapy")
+pytest.importorskip("w3lib")
+
+from scrapy import Request
+from scrapy.utils.python import to_unicode
+from w3lib.url import canonicalize_url
+
+from scrapy_redis.fingerprint import request_digest, request_fingerprint
+
+
+def legacy_fingerprint(request):
+    fingerprint_data = {
+        "method": to_unicode(request.method),
+        "url": canonicalize_url(request.url),
+        "body": (request.body or b"").hex(),
+    }
+    fingerprint_json = json.dumps(fingerprint_data, sort_keys=True)
+    return hashlib.sha1(fingerprint_json.encode()).hexdigest()
+
+
+REQUESTS = [
+    lambda: Request("https://www.homely.com.au/homes/1-some-street-suburb-vic-3000/10000001?b=2&a=1"),
+    lambda: Request("https://www.homely.com.au/homes/1-rue-d%C3%A9j%C3%A0-vu/10000002#photos"),
+    lambda: Request("https://www.homely.com.au/search?q=été&q2=\"quoted\""),
+    lambda: Request("https://www.homely.com.au/search", method="POST", body='{"page": 1}'),
+    lambda: Request("https://www.homely.com.au/search", method="POST"),
+    lambda: Request("https://www.homely.com.au/search", method="PUT", body=b"\x00\xff"),
+]
+
+
+@pytest.mark.parametrize("make", REQUESTS)
+def test_matches_legacy_fingerprint(make):
+    request = make()
+    assert request_fingerprint(request) == legacy_fingerprint(request)
+    # 第二次走缓存，结果不变
+    assert request_fingerprint(request) == legacy_fingerprint(request)
+
+
+def test_binary_fingerprint_is_digest_prefix():
+    request = REQUESTS[0]()
+    assert request_fingerprint(request, 16) == request_digest(request)[:16]
+    assert request_fingerprint(request, 16) == bytes.fromhex(legacy_fingerprint(request))[:16]
@@ -0,0 +1,64 @@
+"""gallery 分类：标题归类、单次遍历与逐图片 preceding::h2 结果一致、网络 JSON 构造 gallery。"""
+import pytest
+from lxml import html
+
+from realestate_scrapy.extractors.gallery import (
+    GALLERY_XPATH, classify_heading, extract_gallery, gallery_from_payloads, group_by_heading,
+)
+
+
+@pytest.mark.parametrize("heading, category", [
+    ("Photos", "photo"),
+    ("Photos & Video", "photo"),
+    ("Floor plan", "floor_plan"),
+    ("Floorplans", "floor_plan"),
+    ("Video", "video"),
+    ("3D tour", "tour"),
+    ("Virtual tour", "tour"),
+    ("Street view", "other"),
+    # 只从词首匹配
+    ("Telephoto lens", "other"),
+])
+def test_classify_heading(heading, category):
+    assert classify_heading(heading) == category
+
+
+def page(photos, floor_plans):
+    parts = ["<html><body><h2>About</h2><div>filler</div>",
+             '<div aria-label="Vertical image gallery"><h2>Photos</h2>']
+    parts.extend(f'<div><img src="https://img/{i}.jpg" srcset="https://img/{i}-640.jpg 640w, '
+                 f'https://img/{i}-1280.jpg 1280w"></div>' for i in range(photos))
+    parts.append("<h2>Floor plan</h2>")
+    parts.extend(f'<div><img src="https://img/fp{i}.jpg"></div>' for i in range(floor_plans))
+    parts.append("</div></body></html>")
+    return html.document_fromstring("".join(parts))
+
+
+def preceding_h2(root):
+    images, floorplan = [], []
+    for img in root.xpath(GALLERY_XPATH + "//img"):
+        text = img.xpath("preceding::h2")[-1].text_content()
+        (floorplan if "Floor plan" in text else images).append(img.get("src"))
+    return images, floorplan
+
+
+def test_single_walk_matches_preceding_h2():
+    root = page(12, 3)
+    gallery = extract_gallery(root)
+    assert ([e["src"] for e in gallery["photo"]], [e["src"] for e in gallery["floor_plan"]]) == preceding_h2(root)
+    assert gallery["photo"][0]["largest"] == "https://img/0-1280.jpg"
+
+
+def test_group_by_heading():
+    gallery = group_by_heading({"Photos & Video": [{"src": "a.jpg"}], "Floor plan": [{"src": "fp.jpg"}]})
+    assert [e["src"] for e in gallery["photo"]] == ["a.jpg"]
+    assert [e["src"] for e in gallery["floor_plan"]] == ["fp.jpg"]
+
+
+def test_gallery_from_payloads():
+    payload = {"listing": {"photos": ["https://img/1.jpg", {"url": "https://img/2.jpg", "type": "floorplan"}],
+                           "videos": [{"src": "https://video/1.mp4"}]}}
+    gallery = gallery_from_payloads([payload])
+    assert [e["src"] for e in gallery["photo"]] == ["https://img/1.jpg"]
+    assert [e["src"] for e in gallery["floor_plan"]] == ["https://img/2.jpg"]
+    assert [e["src"] for e in gallery["video"]] == ["https://video/1.mp4"]
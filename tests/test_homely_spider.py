@@ -0,0 +1,148 @@
+"""HomelySpider 列表页：增量抓取的详情页请求与去重、分页停止条件与检查点续抓。"""
+import pytest
+
+pytest.importorskip("scrapy")
+pytest.importorskip("redis")
+pytest.importorskip("selenium")
+
+from scrapy.http import HtmlResponse, Request
+from scrapy.utils.test import get_crawler
+
+from realestate_scrapy.cache.listing_state import ListingCheckpoints, ListingSignatures
+from realestate_scrapy.spiders.homely import HomelySpider
+from scrapy_redis.dupefilter import RFPDupeFilter
+from scrapy_redis.scheduler import Scheduler
+
+SEARCH_URL = "https://www.homely.com.au/for-sale/st-albans-vic-3021/real-estate"
+LISTING_URL = "https://www.homely.com.au/homes/%d-conrad-street-st-albans-vic-3021/%d"
+
+
+def card(listing_id, price="$700,000", beds=3):
+    return (f'<article aria-label="Property Listing"><a href="{LISTING_URL % (listing_id, listing_id)}">'
+            f'<span>{price}</span></a><ul><li><span aria-label="Bed"></span>{beds}</li></ul></article>')
+
+
+def listing_page(cards, page=1):
+    url = SEARCH_URL if page == 1 else f"{SEARCH_URL}?page={page}"
+    request = Request(url, meta={"search_url": SEARCH_URL, "listing_page": page, "render": True})
+    body = "<html><body>" + "".join(cards) + "</body></html>"
+    return HtmlResponse(url, body=body, encoding="utf-8", request=request)
+
+
+@pytest.fixture
+def spider(redis_server, redis_key):
+    crawler = get_crawler(HomelySpider)
+    spider = HomelySpider.from_crawler(crawler)
+    spider.server = redis_server
+    # 测试使用独占的 key 前缀
+    spider.listing_signatures = ListingSignatures(redis_server, redis_key)
+    spider.listing_checkpoints = ListingCheckpoints(redis_server, redis_key)
+    return spider
+
+
+def property_requests(spider, response):
+    return [r for r in spider.parse(response) if r.callback == spider.parse_property]
+
+
+def test_changed_listing_is_scheduled_despite_persisted_fingerprint(spider, redis_server, redis_key):
+    # 上一轮已抓取并入库：签名已保存，URL 也在持久化的指纹集合中
+    spider.listing_signatures.diff({"1": "old"})
+    spider.listing_signatures.store("1", "old")
+    df = RFPDupeFilter(redis_server, f"{redis_key}:dupefilter")
+    assert not df.request_seen(Request(LISTING_URL % (1, 1)))
+
+    scheduler = Scheduler(redis_server, persist=True, dupefilter=df, queue_key=f"{redis_key}:%(spider)s:requests")
+    scheduler.open(spider)
+    requests = property_requests(spider, listing_page([card(1, price="$650,000")]))
+    assert [r.url for r in requests] == [LISTING_URL % (1, 1)]
+    assert requests[0].meta["listing_signature"]
+    assert scheduler.enqueue_request(requests[0])
+    assert len(scheduler) == 1
+
+
+def test_listing_repeated_across_pages_is_requested_once(spider):
+    first = property_requests(spider, listing_page([card(1), card(2)]))
+    second = property_requests(spider, listing_page([card(2), card(3)], page=2))
+    assert [r.url for r in first] == [LISTING_URL % (1, 1), LISTING_URL % (2, 2)]
+    assert [r.url for r in second] == [LISTING_URL % (3, 3)]
+    assert spider.crawler.stats.get_value("incremental/repeated") == 1
+
+
+def listing_requests(spider, response):
+    return [r for r in spider.parse(response) if r.callback == spider.parse]
+
+
+def store_signatures(spider, requests):
+    # 模拟 SignaturePipeline：详情页入库后保存签名
+    for request in requests:
+        spider.listing_signatures.store(spider.extract_external_id(request.url), request.meta["listing_signature"])
+
+
+def test_listing_signatures_diff_splits_new_from_changed(spider, redis_server):
+    signatures = spider.listing_signatures
+    signatures.store("1", "aaaa")
+    signatures.store("2", "bbbb")
+    new, changed = signatures.diff({"1": "aaaa", "2": "cccc", "3": "dddd"})
+    assert (new, changed) == (["3"], ["2"])
+    assert sorted(redis_server.hkeys(signatures.last_seen_key)) == [b"1", b"2", b"3"]
+    assert signatures.diff({}) == ([], [])
+
+
+def test_listing_page_requests_next_page_and_saves_checkpoint(spider):
+    [request] = listing_requests(spider, listing_page([card(5), card(9)]))
+    assert request.url == f"{SEARCH_URL}?page=2"
+    assert (request.meta["listing_page"], request.meta["newest_id"]) == (2, 9)
+    checkpoint = spider.listing_checkpoints.get(SEARCH_URL)
+    assert (checkpoint["page"], checkpoint["newest_id"], checkpoint["done"]) == (1, 9, False)
+
+
+def test_empty_listing_page_stops_at_last_page(spider):
+    assert listing_requests(spider, listing_page([], page=3)) == []
+    checkpoint = spider.listing_checkpoints.get(SEARCH_URL)
+    assert (checkpoint["page"], checkpoint["done"]) == (3, True)
+    assert spider.crawler.stats.get_value("listing/stop/last_page") == 1
+
+
+def test_until_known_stops_on_page_of_known_listings(spider):
+    response = listing_page([card(1), card(2)])
+    store_signatures(spider, property_requests(spider, response))
+
+    spider.listing_mode = "until_known"
+    assert listing_requests(spider, listing_page([card(1), card(2)])) == []
+    assert spider.listing_checkpoints.get(SEARCH_URL)["done"] is True
+    assert spider.crawler.stats.get_value("listing/stop/known") == 1
+
+    # exhaustive 模式下已知房源不影响翻页
+    spider.listing_mode = "exhaustive"
+    assert len(listing_requests(spider, listing_page([card(1), card(2)]))) == 1
+
+
+def test_max_pages_stops_paging(spider):
+    spider.listing_max_pages = 2
+    assert len(listing_requests(spider, listing_page([card(1)]))) == 1
+    assert listing_requests(spider, listing_page([card(2)], page=2)) == []
+    checkpoint = spider.listing_checkpoints.get(SEARCH_URL)
+    assert (checkpoint["page"], checkpoint["done"]) == (2, True)
+    assert spider.crawler.stats.get_value("listing/stop/max_pages") == 1
+
+
+def test_start_listing_request_resumes_after_unfinished_checkpoint(spider):
+    spider.listing_checkpoints.save(SEARCH_URL, 3, newest_id=42)
+    request = spider.start_listing_request(Request(SEARCH_URL))
+    assert request.url == f"{SEARCH_URL}?page=4"
+    assert (request.meta["listing_page"], request.meta["newest_id"]) == (4, 42)
+
+
+@pytest.mark.parametrize("mode, done", [("exhaustive", True), ("until_known", False)])
+def test_start_listing_request_restarts_from_first_page(spider, mode, done):
+    spider.listing_mode = mode
+    spider.listing_checkpoints.save(SEARCH_URL, 3, newest_id=42, done=done)
+    request = spider.start_listing_request(Request(SEARCH_URL))
+    assert request.url == SEARCH_URL
+    assert request.meta["listing_page"] == 1
+
+
+def test_start_listing_request_without_checkpoint(spider):
+    request = spider.start_listing_request(Request(SEARCH_URL))
+    assert request.url == SEARCH_URL
+    assert (request.meta["listing_page"], request.meta["newest_id"]) == (1, None)
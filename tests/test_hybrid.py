@@ -0,0 +1,56 @@
+"""混合抓取：反爬验证判定、必填字段检查与 HTTP 详情页请求。"""
+from types import SimpleNamespace
+
+import pytest
+
+from realestate_scrapy.extractors.hybrid import CHALLENGE_STATUS, is_bot_challenge, merge_fields, missing_fields
+
+URL = "https://www.homely.com.au/homes/105-conrad-street-st-albans-vic-3021/11105399"
+
+
+def fake_response(status=200, text="<html><body><h1>1 Foo St</h1></body></html>"):
+    return SimpleNamespace(status=status, text=text)
+
+
+@pytest.mark.parametrize("status", CHALLENGE_STATUS)
+def test_challenge_status(status):
+    assert is_bot_challenge(fake_response(status))
+
+
+def test_challenge_marker():
+    assert is_bot_challenge(fake_response(text="<title>Just a moment...</title>"))
+
+
+def test_regular_page_is_not_a_challenge():
+    assert not is_bot_challenge(fake_response())
+
+
+def test_zero_is_not_missing():
+    item = {"bedrooms": 0, "address": "", "origin_images": [], "agent_name": "Jo"}
+    required = ["bedrooms", "address", "origin_images", "agent_name", "price_text"]
+    assert missing_fields(item, required) == ["address", "origin_images", "price_text"]
+
+
+def test_merge_keeps_zero_and_fills_missing():
+    item = merge_fields({"bedrooms": 0, "latitude": None}, {"bedrooms": 3, "latitude": "-37.1"})
+    assert item == {"bedrooms": 0, "latitude": "-37.1"}
+
+
+def test_http_detail_request_lets_challenge_statuses_through():
+    pytest.importorskip("scrapy")
+    homely = pytest.importorskip("realestate_scrapy.spiders.homely")
+    from scrapy.http import HtmlResponse
+    from scrapy.settings import Settings
+    from scrapy.spidermiddlewares.httperror import HttpErrorMiddleware
+
+    spider = homely.HomelySpider.__new__(homely.HomelySpider)
+    spider.hybrid_enabled = True
+    spider.browser_cookies = {}
+    request = spider.property_request(URL)
+    assert not request.meta.get("render")
+
+    middleware = HttpErrorMiddleware(Settings())
+    for status in CHALLENGE_STATUS:
+        response = HtmlResponse(URL, status=status, body=b"<html></html>", request=request)
+        # 不抛出 HttpError：响应会交给 parse_property，由其改用浏览器渲染
+        assert middleware.process_spider_input(response, spider) is None
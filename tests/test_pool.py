@@ -0,0 +1,120 @@
+"""浏览器池：签出/归还复用、按页数与损坏回收、等待者在归还或启动失败时被唤醒。"""
+import itertools
+import threading
+import time
+
+import pytest
+
+# browser 包的 __init__ 会导入 selenium / redis / scrapy
+pytest.importorskip("selenium")
+pytest.importorskip("redis")
+pytest.importorskip("scrapy")
+
+from realestate_scrapy.browser.fake import FakeDriver
+from realestate_scrapy.browser.pool import BrowserPool, PoolExhausted
+from realestate_scrapy.browser.service import ServiceStats
+
+
+def make_pool(factory=FakeDriver, **kwargs):
+    kwargs.setdefault("warm_spare", False)
+    kwargs.setdefault("prewarm", 0)
+    kwargs.setdefault("checkout_timeout", 5)
+    return BrowserPool(factory, **kwargs)
+
+
+def test_released_browser_is_reused():
+    stats = ServiceStats()
+    pool = make_pool(size=1, stats=stats)
+    with pool.checkout() as driver:
+        first = driver
+    with pool.checkout() as driver:
+        assert driver is first
+    assert stats.get_stats()["browser_pool/started"] == 1
+    assert stats.get_stats()["browser_pool/checkout"] == 2
+    pool.close()
+    assert first.quit_called
+
+
+def test_browser_recycled_after_max_pages():
+    pool = make_pool(size=1, max_pages=2)
+    drivers = []
+    for _ in range(3):
+        with pool.checkout() as driver:
+            drivers.append(driver)
+    assert drivers[0] is drivers[1]
+    assert drivers[2] is not drivers[0]
+    assert drivers[0].quit_called
+    pool.close()
+
+
+def test_broken_browser_recycled():
+    pool = make_pool(size=1)
+    with pytest.raises(RuntimeError):
+        with pool.checkout() as driver:
+            broken = driver
+            raise RuntimeError("tab crashed")
+    assert broken.quit_called
+    with pool.checkout() as driver:
+        assert driver is not broken
+    pool.close()
+
+
+def test_waiter_gets_released_browser():
+    pool = make_pool(size=1)
+    browser = pool.acquire()
+    got = []
+    waiter = threading.Thread(target=lambda: got.append(pool.acquire()))
+    waiter.start()
+    time.sleep(0.1)
+    assert not got
+    pool.release(browser)
+    waiter.join(1)
+    assert got == [browser]
+    pool.close()
+
+
+def test_checkout_times_out_when_pool_is_full():
+    pool = make_pool(size=1, checkout_timeout=0.1)
+    pool.acquire()
+    with pytest.raises(PoolExhausted):
+        pool.acquire()
+    pool.close()
+
+
+def test_failed_start_wakes_waiter():
+    starting, fail = threading.Event(), threading.Event()
+    calls = itertools.count()
+
+    def factory():
+        if next(calls) == 0:
+            starting.set()
+            fail.wait(2)
+            raise RuntimeError("chrome failed to start")
+        return FakeDriver()
+
+    pool = make_pool(factory, size=1, checkout_timeout=5)
+    errors, got = [], []
+
+    def first():
+        try:
+            pool.acquire()
+        except RuntimeError as e:
+            errors.append(e)
+
+    def second():
+        got.append(pool.acquire())
+
+    threads = [threading.Thread(target=first), threading.Thread(target=second)]
+    threads[0].start()
+    starting.wait(1)
+    # 第二个调用方在唯一的名额启动期间等待
+    threads[1].start()
+    time.sleep(0.1)
+    started = time.monotonic()
+    fail.set()
+    for thread in threads:
+        thread.join(2)
+    assert errors and got
+    # 被唤醒后立即补位启动，而不是等到 checkout_timeout
+    assert time.monotonic() - started < 1
+    pool.close()
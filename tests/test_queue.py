@@ -0,0 +1,44 @@
+"""push_many：去重与入队在同一个 Redis 脚本中完成，返回每个请求是否入队。"""
+import pytest
+
+pytest.importorskip("scrapy")
+
+from scrapy import Request, Spider
+
+from scrapy_redis.queue import FifoQueue, LifoQueue, PriorityQueue
+
+
+@pytest.fixture(params=[PriorityQueue, FifoQueue, LifoQueue])
+def queue(request, redis_server, redis_key):
+    return request.param(redis_server, Spider(name="homely"), f"{redis_key}:%(spider)s:requests")
+
+
+def test_push_many_dedupes_in_script(queue, redis_server, redis_key):
+    dupefilter_key = f"{redis_key}:dupefilter"
+    requests = [Request(f"https://www.homely.com.au/homes/a/{i}") for i in (1, 2, 1, 3)]
+    # 空指纹表示不过滤（dont_filter）
+    fingerprints = ["fp1", "fp2", "fp1", ""]
+    assert queue.push_many(requests, fingerprints=fingerprints, dupefilter_key=dupefilter_key) == \
+        [True, True, False, True]
+    assert len(queue) == 3
+    assert redis_server.smembers(dupefilter_key) == {b"fp1", b"fp2"}
+
+    again = [Request("https://www.homely.com.au/homes/a/2"), Request("https://www.homely.com.au/homes/a/4")]
+    assert queue.push_many(again, fingerprints=["fp2", "fp4"], dupefilter_key=dupefilter_key) == [False, True]
+    assert len(queue) == 4
+    urls = {queue.pop().url for _ in range(4)}
+    assert urls == {f"https://www.homely.com.au/homes/a/{i}" for i in (1, 2, 3, 4)}
+
+
+def test_push_many_without_fingerprints(queue):
+    requests = [Request(f"https://www.homely.com.au/homes/a/{i}") for i in (1, 2)]
+    assert queue.push_many(requests) == [True, True]
+    assert len(queue) == 2
+    assert queue.push_many([]) == []
+
+
+def test_priority_queue_orders_batch_by_priority(redis_server, redis_key):
+    queue = PriorityQueue(redis_server, Spider(name="homely"), f"{redis_key}:requests")
+    queue.push_many([Request("https://www.homely.com.au/low", priority=-1),
+                     Request("https://www.homely.com.au/high", priority=10)])
+    assert queue.pop().url == "https://www.homely.com.au/high"
@@ -0,0 +1,49 @@
+"""渲染服务：RenderClient 经 Redis 把任务交给 RenderService（FakeDriver 浏览器池）并取回结果。"""
+import threading
+
+import pytest
+
+pytest.importorskip("selenium")
+pytest.importorskip("scrapy")
+
+from realestate_scrapy.browser.fake import FakeDriver
+from realestate_scrapy.browser.pool import BrowserPool
+from realestate_scrapy.browser.readiness import ReadinessWaiter
+from realestate_scrapy.browser.renderer import Renderer
+from realestate_scrapy.browser.service import RenderClient, RenderService, RenderServiceError
+
+URL = "https://www.homely.com.au/homes/105-conrad-street-st-albans-vic-3021/11105399"
+PAGE = "<html><body><h1>105 Conrad Street</h1></body></html>"
+
+
+def job(**kwargs):
+    return dict({"url": URL, "label": "property", "wait_for": None, "scroll": False,
+                 "actions": [], "extract": None, "body": True}, **kwargs)
+
+
+@pytest.fixture
+def client(redis_server, redis_key):
+    pool = BrowserPool(lambda: FakeDriver(pages={URL: PAGE}), size=1, warm_spare=False, prewarm=0)
+    readiness = ReadinessWaiter(timeout=2, poll_interval=0.01, network_idle_ms=0, dom_quiet_ms=0)
+    queue_key = f"{redis_key}:jobs"
+    service = RenderService(Renderer(pool, readiness), redis_server, queue_key=queue_key, stats_interval=0.1)
+    thread = threading.Thread(target=service.run, daemon=True)
+    thread.start()
+    yield RenderClient(redis_server, queue_key=queue_key, timeout=5)
+    service.stop()
+    thread.join(5)
+    assert service.stats.get_stats()["render_service/rendered"] >= 1
+
+
+def test_round_trip(client):
+    result = client.render(job())
+    assert result["url"] == URL
+    assert result["body"] == PAGE
+    assert result["cookies"] == {}
+    assert "resources" in result["data"]
+
+
+def test_render_error_is_raised_by_client(client):
+    client.render(job())
+    with pytest.raises(RenderServiceError, match="KeyError"):
+        client.render(job(extract="no-such-script"))
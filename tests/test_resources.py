@@ -0,0 +1,34 @@
+"""浏览器资源策略：按扩展名与域名生成的拦截规则。"""
+import re
+
+import pytest
+
+# realestate_scrapy.browser 包导入时加载 selenium（页面动作）
+pytest.importorskip("selenium")
+
+from realestate_scrapy.browser.resources import ResourcePolicy  # noqa: E402
+
+
+def blocked(policy, url):
+    # setBlockedURLs 的通配符语义：只有 * 是通配符（匹配任意字符），规则匹配整个 URL
+    return any(re.fullmatch(".*".join(map(re.escape, pattern.split("*"))), url) for pattern in policy.patterns())
+
+
+def test_blocks_by_extension_at_end_of_path():
+    policy = ResourcePolicy(deny_domains=[])
+    assert blocked(policy, "https://cdn.homely.com.au/photo/1.jpg")
+    assert blocked(policy, "https://cdn.homely.com.au/photo/1.webp?w=800")
+    assert blocked(policy, "https://fonts.example.com/inter.woff2")
+
+
+def test_does_not_block_urls_merely_containing_an_extension():
+    policy = ResourcePolicy(deny_domains=[])
+    assert not blocked(policy, "https://www.homely.com.au/api/listing?thumb=1.jpg.json")
+    assert not blocked(policy, "https://www.homely.com.au/homes/1.png-street/123")
+
+
+def test_deny_and_allow_domains():
+    policy = ResourcePolicy(block_types=[], deny_domains=["doubleclick.net", "homely.com.au"],
+                            allow_domains=["homely.com.au"])
+    assert blocked(policy, "https://ad.doubleclick.net/x.js")
+    assert not blocked(policy, "https://www.homely.com.au/app.js")
@@ -0,0 +1,123 @@
+"""Scheduler 写缓冲（SCHEDULER_ENQUEUE_BATCH_SIZE）：何时写入 Redis，以及统计与 request_dropped 是否准确。"""
+import time
+
+import pytest
+
+pytest.importorskip("scrapy")
+
+from scrapy import Request, Spider, signals
+from scrapy.utils.test import get_crawler
+
+from scrapy_redis.dupefilter import BitmapDupeFilter, BloomDupeFilter, RFPDupeFilter
+from scrapy_redis.scheduler import Scheduler
+
+LISTING = "https://www.homely.com.au/homes/105-conrad-street-st-albans-vic-3021/%d"
+SEARCH = "https://www.homely.com.au/for-sale/st-albans-vic-3021/real-estate?page=%d"
+
+
+class DummySpider(Spider):
+    name = "homely"
+
+    def parse(self, response):
+        pass
+
+
+# rfp：整批在一个脚本中去重并入队（push_many 带指纹）；bitmap / bloom：先 requests_seen 再入队
+@pytest.fixture(params=["rfp", "bitmap", "bloom"])
+def make_scheduler(request, redis_server, redis_key):
+    schedulers = []
+
+    def make(batch_size=4, flush_interval=60):
+        key = f"{redis_key}:dupefilter"
+        if request.param == "rfp":
+            df = RFPDupeFilter(redis_server, key)
+        elif request.param == "bitmap":
+            df = BitmapDupeFilter(redis_server, key)
+        else:
+            df = BloomDupeFilter(redis_server, key, capacity=1000)
+        crawler = get_crawler(DummySpider)
+        spider = DummySpider.from_crawler(crawler)
+        scheduler = Scheduler(redis_server, persist=True, dupefilter=df, queue_key=f"{redis_key}:%(spider)s:requests",
+                              enqueue_batch_size=batch_size, enqueue_flush_interval=flush_interval)
+        scheduler.stats = crawler.stats
+        scheduler.crawler = crawler
+        scheduler.dropped = []
+        crawler.signals.connect(lambda request, spider: scheduler.dropped.append(request.url),
+                                signal=signals.request_dropped, weak=False)
+        scheduler.open(spider)
+        schedulers.append(scheduler)
+        return scheduler
+
+    yield make
+    for scheduler in schedulers:
+        scheduler.close("finished")
+
+
+def enqueued(scheduler):
+    return scheduler.stats.get_value("scheduler/enqueued/redis", 0)
+
+
+def test_flush_on_batch_size(make_scheduler):
+    scheduler = make_scheduler(batch_size=3)
+    scheduler.enqueue_request(Request(LISTING % 1))
+    scheduler.enqueue_request(Request(SEARCH % 1))
+    assert len(scheduler.queue) == 0
+    assert len(scheduler) == 2
+    scheduler.enqueue_request(Request(LISTING % 2))
+    assert len(scheduler.queue) == 3
+    assert len(scheduler) == 3
+    assert enqueued(scheduler) == 3
+
+
+def test_flush_on_interval(make_scheduler):
+    scheduler = make_scheduler(batch_size=100, flush_interval=0.05)
+    scheduler.enqueue_request(Request(LISTING % 1))
+    assert len(scheduler.queue) == 0
+    time.sleep(0.06)
+    scheduler.enqueue_request(Request(LISTING % 2))
+    assert len(scheduler.queue) == 2
+
+
+def test_flush_on_spider_idle(make_scheduler):
+    scheduler = make_scheduler(batch_size=100)
+    scheduler.enqueue_request(Request(LISTING % 1))
+    scheduler.crawler.signals.send_catch_log(signals.spider_idle, spider=scheduler.spider)
+    assert len(scheduler.queue) == 1
+    assert len(scheduler) == 1
+
+
+def test_flush_when_queue_runs_dry(make_scheduler):
+    scheduler = make_scheduler(batch_size=100)
+    scheduler.enqueue_request(Request(LISTING % 1))
+    scheduler.enqueue_request(Request(LISTING % 2))
+    assert len(scheduler) == 2
+    request = scheduler.next_request()
+    assert request is not None and request.url in {LISTING % 1, LISTING % 2}
+    assert len(scheduler) == 1
+    assert scheduler.next_request() is not None
+    assert scheduler.next_request() is None
+    assert scheduler.stats.get_value("scheduler/dequeued/redis") == 2
+
+
+def test_stats_and_dropped_are_exact(make_scheduler):
+    scheduler = make_scheduler(batch_size=4)
+    # 批内重复：第二个 LISTING 1 与 SEARCH 1
+    for url in (LISTING % 1, SEARCH % 1, LISTING % 1, SEARCH % 1):
+        scheduler.enqueue_request(Request(url))
+    assert enqueued(scheduler) == 2
+    assert scheduler.dropped == [LISTING % 1, SEARCH % 1]
+    # 跨批重复：LISTING 1 与 SEARCH 1 已在上一批写入；dont_filter 的请求不去重
+    for request in (Request(LISTING % 1), Request(SEARCH % 2), Request(SEARCH % 1, dont_filter=True),
+                    Request(LISTING % 3)):
+        scheduler.enqueue_request(request)
+    assert enqueued(scheduler) == 5
+    assert scheduler.dropped == [LISTING % 1, SEARCH % 1, LISTING % 1]
+    assert len(scheduler.queue) == 5
+
+
+def test_unbuffered_scheduler_writes_immediately(make_scheduler):
+    scheduler = make_scheduler(batch_size=0)
+    assert scheduler.enqueue_request(Request(LISTING % 1))
+    assert not scheduler.enqueue_request(Request(LISTING % 1))
+    assert len(scheduler.queue) == 1
+    assert enqueued(scheduler) == 1
@@ -0,0 +1,54 @@
+"""scrapy seed：限速时的批大小与有上限的本地去重。"""
+import pytest
+
+pytest.importorskip("scrapy")
+pytest.importorskip("w3lib")
+
+from realestate_scrapy.commands import seed  # noqa: E402
+
+
+class FakeQueue:
+    def __init__(self):
+        self.batches = []
+
+    def push_many(self, tasks, batch_size=1000):
+        self.batches.append(len(tasks))
+        return len(tasks)
+
+
+def tasks(count):
+    return ({"url": f"https://www.homely.com.au/homes/x/{i}"} for i in range(count))
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def test_rate_caps_batch_size(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(seed, "time", clock)
+    queue = FakeQueue()
+    counts = seed.Seeder(queue, ["homely.com.au"], batch_size=5000, rate=100).run(tasks(350))
+    assert counts["pushed"] == 350
+    assert queue.batches == [100, 100, 100, 50]
+    # 每批之后休眠约一秒，而不是 5000 条之后休眠 50 秒
+    assert max(clock.sleeps) <= 1.0
+    assert clock.now == pytest.approx(3.5)
+
+
+def test_local_dedupe_is_bounded():
+    seeder = seed.Seeder(FakeQueue(), ["homely.com.au"], seen_limit=10)
+    counts = seeder.run(list(tasks(100)) + list(tasks(100))[-5:])
+    assert len(seeder._seen) + len(seeder._seen_previous) <= 20
+    # 最近的 URL 仍在本地去重窗口内
+    assert counts["duplicate"] == 5
+    assert counts["pushed"] == 100
@@ -0,0 +1,40 @@
+"""增量抓取：只有确认写入数据库的房源才记录列表页签名。"""
+from types import SimpleNamespace
+
+from realestate_scrapy.pipelines.signature_pipeline import SignaturePipeline
+
+
+class Stats:
+    def __init__(self):
+        self.values = {}
+
+    def inc_value(self, key, count=1):
+        self.values[key] = self.values.get(key, 0) + count
+
+
+class Signatures:
+    def __init__(self):
+        self.stored = {}
+
+    def store(self, external_id, signature):
+        self.stored[external_id] = signature
+
+
+def make_spider():
+    return SimpleNamespace(listing_signatures=Signatures(), crawler=SimpleNamespace(stats=Stats()))
+
+
+def test_stores_signature_after_confirmed_write():
+    spider = make_spider()
+    item = SignaturePipeline().process_item(
+        {"external_id": "11105399", "listing_signature": "abc", "db_persisted": True}, spider)
+    assert spider.listing_signatures.stored == {"11105399": "abc"}
+    assert "listing_signature" not in item and "db_persisted" not in item
+
+
+def test_skips_signature_when_not_persisted():
+    spider = make_spider()
+    item = SignaturePipeline().process_item({"external_id": "11105399", "listing_signature": "abc"}, spider)
+    assert spider.listing_signatures.stored == {}
+    assert spider.crawler.stats.values == {"incremental/not_persisted": 1}
+    assert "listing_signature" not in item
@@ -0,0 +1,110 @@
+"""起始 URL 队列：入队时去重（按房源 id 或规范化 URL、带 TTL 窗口）、逐任务入队标记、批量出队。"""
+import pytest
+
+pytest.importorskip("redis")
+pytest.importorskip("w3lib")
+
+from realestate_scrapy.cache import url_queue
+from realestate_scrapy.cache.url_queue import RedisUrlQueue, dedupe_key
+
+LISTING = "https://www.homely.com.au/homes/105-conrad-street-st-albans-vic-3021/11105399"
+# 同一房源，地址 slug 不同
+LISTING_RENAMED = "https://www.homely.com.au/homes/105-conrad-st-st-albans-vic-3021/11105399"
+OTHER_LISTING = "https://www.homely.com.au/homes/7-main-road-st-albans-vic-3021/11105400"
+SEARCH = "https://www.homely.com.au/for-sale/st-albans-vic-3021/real-estate?page=2&sort=new"
+SEARCH_REORDERED = "https://www.homely.com.au/for-sale/st-albans-vic-3021/real-estate?sort=new&page=2"
+
+
+class FakeClock:
+    def __init__(self, now=1000):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def make_queue(redis_server, redis_url, redis_key):
+    def make(**kwargs):
+        return RedisUrlQueue(f"{redis_key}:homely", redis_url, **kwargs)
+    return make
+
+
+def tasks(*urls, **kwargs):
+    return [dict({"url": url}, **kwargs) for url in urls]
+
+
+def test_dedupe_key_by_id_or_canonical_url():
+    assert dedupe_key(LISTING) == dedupe_key(LISTING_RENAMED) == "id:11105399"
+    assert dedupe_key(SEARCH) == dedupe_key(SEARCH_REORDERED)
+    assert dedupe_key(SEARCH).startswith("url:")
+
+
+@pytest.mark.parametrize("zset", [False, True])
+def test_push_each_reports_every_task(make_queue, zset):
+    queue = make_queue(zset=zset, dedupe=True)
+    assert queue.push_each(tasks(LISTING, SEARCH, LISTING_RENAMED, SEARCH_REORDERED, OTHER_LISTING)) == \
+        [True, True, False, False, True]
+    assert queue.push_each(tasks(OTHER_LISTING, LISTING), batch_size=1) == [False, False]
+    assert queue.size() == 3
+    assert queue.push_many(tasks(LISTING, "https://www.homely.com.au/agents/1")) == 1
+
+
+def test_same_listing_not_queued_twice_across_queues(make_queue):
+    first, second = make_queue(dedupe=True), make_queue(dedupe=True)
+    assert first.push_each(tasks(LISTING)) == [True]
+    assert second.push_each(tasks(LISTING_RENAMED, OTHER_LISTING)) == [False, True]
+    assert first.size() == 2
+
+
+def test_dedupe_window_expires(make_queue, monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(url_queue, "time", clock)
+    queue = make_queue(dedupe=True, dedupe_ttl=60)
+    assert queue.push_each(tasks(LISTING)) == [True]
+    clock.now += 59
+    assert queue.push_each(tasks(LISTING)) == [False]
+    clock.now += 2
+    assert queue.push_each(tasks(LISTING)) == [True]
+    assert queue.size() == 2
+
+
+def test_without_dedupe_everything_is_queued(make_queue):
+    queue = make_queue()
+    assert queue.push_each(tasks(LISTING, LISTING)) == [True, True]
+    assert queue.size() == 2
+
+
+def test_zset_pops_highest_priority_first(make_queue):
+    queue = make_queue(zset=True)
+    queue.push_many([{"url": LISTING, "priority": 1}, {"url": OTHER_LISTING, "priority": 5},
+                     {"url": SEARCH, "priority": 3, "meta": {"lane": "search"}}])
+    assert [task["url"] for task in queue.pop_many(2)] == [OTHER_LISTING, SEARCH]
+    assert queue.pop() == {"url": LISTING, "meta": {}}
+    assert queue.pop_many(2) == []
+
+
+def test_list_pops_oldest_batch_first(make_queue):
+    queue = make_queue()
+    urls = [f"https://www.homely.com.au/homes/a/{i}" for i in range(5)]
+    queue.push_many(tasks(*urls))
+    assert [task["url"] for task in queue.pop_many(3)] == urls[:3]
+    assert queue.size() == 2
+    assert [task["url"] for task in queue.pop_many(10)] == urls[3:]
+    assert queue.pop_many(1) == []
+
+
+def test_sitemap_records_lastmod_only_for_queued_listings(make_queue, redis_server, redis_key):
+    pytest.importorskip("scrapy")
+    from scrapy.utils.test import get_crawler
+
+    from realestate_scrapy.spiders.homely_sitemap import HomelySitemapSpider
+
+    spider = HomelySitemapSpider.from_crawler(get_crawler(HomelySitemapSpider))
+    spider.url_queue = make_queue(dedupe=True)
+    spider.listing_lastmod_key = f"{redis_key}:sitemap:listing_lastmod"
+    # 另一个发现进程刚推送过 LISTING，去重窗口拒绝本次推送
+    make_queue(dedupe=True).push_each(tasks(LISTING))
+    spider.push([("11105399", LISTING, "2026-10-01"), ("11105400", OTHER_LISTING, "2026-10-02")])
+    assert redis_server.hgetall(spider.listing_lastmod_key) == {b"11105400": b"2026-10-02"}
+    assert spider.crawler.stats.get_value("sitemap/duplicate") == 1